@@ -1,5 +1,9 @@
 from krpc.connection import Connection
 from krpc.client import Client
+from krpc.options import Options
+from krpc.pool import DEFAULT_LANE
+from krpc.schemacache import SchemaCache
+from krpc.definitions import Definitions
 from krpc.encoder import Encoder
 from krpc.error import ConnectionError  # pylint: disable=redefined-builtin
 from krpc.decoder import Decoder
@@ -13,25 +17,74 @@ DEFAULT_STREAM_PORT = 50001
 
 
 def connect(name=None, address=DEFAULT_ADDRESS,
-            rpc_port=DEFAULT_RPC_PORT, stream_port=DEFAULT_STREAM_PORT):
+            rpc_port=DEFAULT_RPC_PORT, stream_port=DEFAULT_STREAM_PORT,
+            pool_size=1, lanes=None, **options):
     """
     Connect to a kRPC server on the specified IP address and port numbers.
     If stream_port is None, does not connect to the stream server.
     Optionally give the kRPC server the supplied name to identify the client.
+    pool_size is the number of RPC connections in the default lane, and
+    lanes is an optional dictionary mapping the names of additional lanes
+    to their number of RPC connections.
+    The remaining keyword arguments enable optional features of the client,
+    and are stored in a krpc.options.Options object:
+    If pipelined is true, multiple threads can have requests in flight
+    on the connection at the same time.
+    If schema_cache is true, the services provided by the server are stored
+    in a cache on disk, and loaded from it on subsequent connections to the
+    same server. It can also be the path of the cache directory.
+    If services is a list of service names, only those services are
+    made available by the client, along with the KRPC service.
+    If docs is false, the documentation for the services is discarded, to
+    save time and memory in clients that never read their docstrings.
+    definitions is the path of a service definitions file generated by
+    krpc-servicedefs, a directory containing such files, or a list of paths.
+    Calls to the services they define are addressed using numeric ids
+    instead of names, which makes the encoded calls smaller. If schema_cache
+    is given, the ids are stored in it and used on subsequent connections.
+    If lazy_decode is true, the values received for a stream are only
+    decoded when the stream is read, and each value is decoded at most once.
+    Values for streams with callbacks or a history are decoded when they
+    are received.
+    If callback_executor is None, stream callbacks are run on the thread
+    that receives stream updates. Otherwise they are run by an executor,
+    so that slow callbacks do not delay stream updates. It can be the number
+    of threads for the client to start, or an object with a submit method,
+    such as a concurrent.futures.ThreadPoolExecutor.
+    If stream_thread is false, no thread is started to receive stream
+    updates. Instead they are received when Client.poll_streams() or
+    Client.pump_streams() is called, or when waiting for a stream to update.
+    If auto_stream is a number, calls to property getters that are made more
+    than that many times per second are replaced with streams, and read from
+    the most recent stream value. The streams are removed when the calls
+    stop being made. Client.auto_streams lists the calls that were replaced.
+    If cache is true, the results of procedures whose values change rarely,
+    such as the names and radii of celestial bodies, are cached by the
+    client. It can also be a dictionary mapping 'Service.Procedure' names to
+    cache policies, which override the defaults in krpc.cache.
+    If numpy_arrays is true, results of procedures and streams that are
+    lists or tuples of doubles or floats, such as positions, velocities and
+    lists of vectors, are decoded into NumPy arrays. Requires NumPy.
     """
+    options = Options(**options)
+    sizes = dict(lanes or {})
+    if DEFAULT_LANE in sizes:
+        raise ValueError('Use pool_size to set the size of the default lane')
+    if pool_size < 1:
+        raise ValueError('pool_size must be at least 1')
+    for lane, size in sizes.items():
+        if size < 1:
+            raise ValueError('Lane \'%s\' must have at least 1 connection' %
+                             lane)
 
     # Connect to RPC server
-    rpc_connection = Connection(address, rpc_port)
-    rpc_connection.connect()
-    request = ConnectionRequest()
-    request.type = ConnectionRequest.RPC
-    if name is not None:
-        request.client_name = name
-    rpc_connection.send_message(request)
-    response = rpc_connection.receive_message(ConnectionResponse)
-    if response.status != ConnectionResponse.OK:
-        raise ConnectionError(response.message)
-    client_identifier = response.client_identifier
+    rpc_connection, client_identifier = _connect_rpc(address, rpc_port, name)
+
+    # Open additional RPC connections for the lanes
+    sizes[DEFAULT_LANE] = pool_size - 1
+    pool = dict((lane, [_connect_rpc(address, rpc_port, name)[0]
+                        for _ in range(size)])
+                for lane, size in sizes.items())
 
     # Connect to Stream server
     if stream_port is not None:
@@ -47,4 +100,33 @@ def connect(name=None, address=DEFAULT_ADDRESS,
     else:
         stream_connection = None
 
-    return Client(rpc_connection, stream_connection)
+    options.lanes = pool
+    if options.schema_cache is True:
+        options.schema_cache = SchemaCache()
+    elif options.schema_cache is False:
+        options.schema_cache = None
+    elif options.schema_cache is not None and not isinstance(
+            options.schema_cache, SchemaCache):
+        options.schema_cache = SchemaCache(options.schema_cache)
+
+    if options.definitions is not None and \
+       not isinstance(options.definitions, Definitions):
+        options.definitions = Definitions.load(options.definitions)
+
+    return Client(rpc_connection, stream_connection, options)
+
+
+def _connect_rpc(address, port, name):
+    """ Open a connection to the RPC server. Returns the
+        connection and the client identifier assigned to it. """
+    connection = Connection(address, port)
+    connection.connect()
+    request = ConnectionRequest()
+    request.type = ConnectionRequest.RPC
+    if name is not None:
+        request.client_name = name
+    connection.send_message(request)
+    response = connection.receive_message(ConnectionResponse)
+    if response.status != ConnectionResponse.OK:
+        raise ConnectionError(response.message)
+    return connection, response.client_identifier
@@ -0,0 +1,670 @@
+"""
+An asyncio based kRPC client. Requires Python 3.5 or later.
+
+Remote procedure calls made through a client created by :func:`connect`
+return awaitables, and streams support ``async for``. For example::
+
+    conn = await krpc.aio.connect()
+    vessel = await conn.space_center.active_vessel
+    flight = await vessel.flight()
+    altitude = await conn.add_stream(getattr, flight, 'mean_altitude')
+    async for value in altitude:
+        print(value)
+
+The request for a call is sent to the server as soon as the call is made,
+and its result can be awaited later. Responses are received by a task
+running on the event loop, so many calls can be in flight at once.
+Requests are sent in the order the calls are made, so a property setter
+has taken effect before any call made after it is executed.
+"""
+import asyncio
+import collections
+import krpc.batch
+import krpc.client
+import krpc.event
+import krpc.stream
+import krpc.streammanager
+from krpc.connection import frame_bounds, DEFAULT_BUFFER_SIZE
+from krpc.decoder import Decoder
+from krpc.encoder import Encoder
+from krpc.error import \
+    ConnectionError, RPCError, StreamError  # pylint: disable=redefined-builtin
+from krpc.expression import Expression
+from krpc import DEFAULT_ADDRESS, DEFAULT_RPC_PORT, DEFAULT_STREAM_PORT
+import krpc.schema.KRPC_pb2 as KRPC
+
+# Errors that stop the tasks receiving messages from the server. Includes
+# cancellation, so that waiting tasks fail when the client is closed.
+_RECEIVE_ERRORS = (asyncio.CancelledError, Exception)
+
+
+async def connect(name=None, address=DEFAULT_ADDRESS,
+                  rpc_port=DEFAULT_RPC_PORT, stream_port=DEFAULT_STREAM_PORT):
+    """
+    Connect to a kRPC server on the specified IP address and port numbers,
+    using asyncio streams. Returns a :class:`Client`.
+    If stream_port is None, does not connect to the stream server.
+    Optionally give the kRPC server the supplied name to identify the client.
+    """
+
+    # Connect to RPC server
+    request = KRPC.ConnectionRequest()
+    request.type = KRPC.ConnectionRequest.RPC
+    if name is not None:
+        request.client_name = name
+    rpc_connection = await _open_connection(address, rpc_port, request)
+    client_identifier = rpc_connection[2].client_identifier
+
+    # Connect to Stream server
+    if stream_port is not None:
+        request = KRPC.ConnectionRequest()
+        request.type = KRPC.ConnectionRequest.STREAM
+        request.client_identifier = client_identifier
+        stream_connection = await _open_connection(
+            address, stream_port, request)
+    else:
+        stream_connection = None
+
+    # Get the services here, as the client's constructor
+    # cannot wait for the response
+    services = await _get_services(*rpc_connection[:2])
+    return Client(rpc_connection[:2],
+                  stream_connection[:2] if stream_connection else None,
+                  services)
+
+
+async def _open_connection(address, port, request):
+    reader, writer = await asyncio.open_connection(address, port)
+    reader = _FrameReader(reader)
+    writer.write(Encoder.encode_message_with_size(request))
+    response = Decoder.decode_message(
+        await reader.receive(), KRPC.ConnectionResponse)
+    if response.status != KRPC.ConnectionResponse.OK:
+        writer.close()
+        raise ConnectionError(response.message)
+    return reader, writer, response
+
+
+async def _get_services(reader, writer):
+    """ Call KRPC.GetServices, and return the result without decoding it """
+    request = KRPC.Request()
+    call = request.calls.add()
+    call.service = 'KRPC'
+    call.procedure = 'GetServices'
+    writer.write(Encoder.encode_message_with_size(request))
+    response = Decoder.decode_message(await reader.receive(), KRPC.Response)
+    if response.HasField('error'):
+        raise RPCError(response.error.description)
+    if response.results[0].HasField('error'):
+        raise RPCError(response.results[0].error.description)
+    return response.results[0].value
+
+
+class _FrameReader(object):
+    """ Receives size-prefixed messages from an asyncio stream reader.
+        Data is read in large chunks, so that several messages can be
+        received with a single read. """
+
+    def __init__(self, reader):
+        self._reader = reader
+        # Received data is stored in _buffer[_start:]
+        self._buffer = b''
+        self._start = 0
+
+    async def receive(self):
+        """ Receive the data for the next message, without its size """
+        while True:
+            bounds = frame_bounds(
+                self._buffer, self._start, len(self._buffer))
+            if bounds is not None:
+                self._start = bounds[1]
+                return self._buffer[bounds[0]:bounds[1]]
+            data = await self._reader.read(DEFAULT_BUFFER_SIZE)
+            if not data:
+                raise ConnectionError('Connection closed')
+            self._buffer = self._buffer[self._start:] + data
+            self._start = 0
+
+
+def _complete(waiters, error=None):
+    """ Complete futures that are waiting for a stream update,
+        raising the given error if it is not None """
+    for waiter in waiters:
+        if not waiter.done():
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+
+
+class Batch(krpc.batch.Batch):
+    """ A batch of remote procedure calls, for an asyncio client """
+
+    async def execute(self):  # pylint: disable=invalid-overridden-method
+        """ Send the calls to the server and wait for the results.
+            Returns the list of futures for the calls. """
+        if self._executed:
+            raise RPCError('Batch has already been executed')
+        self._executed = True
+        if self._calls:
+            try:
+                await self._conn._invoke_many(
+                    self._calls, self._return_types, self._futures,
+                    self._mutates)
+            except BaseException as ex:
+                self._fail(ex)
+                raise
+        return self._futures
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, typ, value, traceback):
+        if typ is None:
+            await self.execute()
+        else:
+            self.__exit__(typ, value, traceback)
+
+
+class StreamImpl(krpc.streammanager.StreamImpl):
+    """ A stream, for an asyncio client. Requests to the server are
+        awaited, and waiting for an update awaits a future. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Futures that are completed when the stream is next updated
+        self._waiters = []
+
+    async def start(self):  # pylint: disable=invalid-overridden-method
+        if not self._started:
+            self._started = True
+            await self._manager._conn.krpc.start_stream(self.stream_id)
+
+    async def set_rate(self, value):
+        self._rate = value
+        await self._manager._conn.krpc.set_stream_rate(self.stream_id, value)
+
+    @property
+    def sequence(self):
+        """ The sequence number of the stream update message that the most
+            recent value was received in, or 0 if there is no value """
+        sample = self._sample
+        return sample.sequence if sample is not None else 0
+
+    def set_value(self, value, sequence, timestamp, encoded=None):
+        super().set_value(value, sequence, timestamp, encoded)
+        waiters = self._waiters
+        self._waiters = []
+        _complete(waiters)
+
+    def fail(self, error):
+        """ Raise an error in the tasks waiting for an update """
+        waiters = self._waiters
+        self._waiters = []
+        _complete(waiters, error)
+
+    async def wait(self, sequence=None):
+        # pylint: disable=invalid-overridden-method,arguments-renamed
+        """ Wait until an update after the given sequence number has been
+            received. Raises an error if updates are no longer received. """
+        if sequence is None:
+            sequence = self.sequence
+        while self.sequence <= sequence:
+            if self._manager.error is not None:
+                raise self._manager.error
+            waiter = self._manager._conn._loop.create_future()
+            self._waiters.append(waiter)
+            await waiter
+
+    async def remove(self):  # pylint: disable=invalid-overridden-method
+        await self._manager.remove_stream(self.stream_id)
+        self.set_removed()
+
+
+class StreamManager(krpc.streammanager.StreamManager):
+    """ The streams of an asyncio client. Stream update messages are
+        passed to it by a task running on the event loop. """
+
+    _stream_class = StreamImpl
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Futures that are completed when the next
+        # stream update message has been processed
+        self._waiters = []
+        # The error that stopped stream updates being received, if any
+        self._error = None
+
+    async def add_stream(self, return_type, call, auto=False):
+        # pylint: disable=invalid-overridden-method
+        stream_id = (await self._conn.krpc.add_stream(call, False)).id
+        return self.get_stream(return_type, stream_id, call, auto)
+
+    async def remove_stream(self, stream_id):
+        # pylint: disable=invalid-overridden-method
+        if stream_id in self._streams:
+            del self._streams[stream_id]
+            await self._conn.krpc.remove_stream(stream_id)
+
+    async def wait_for_update(self, timeout=None):
+        # pylint: disable=invalid-overridden-method
+        if self._error is not None:
+            raise self._error
+        waiter = self._conn._loop.create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def wait_until(self, predicates, timeout=None):
+        # pylint: disable=invalid-overridden-method
+        """ Wait until one of the predicates returns a true value, or a
+            timeout occurs. The predicates are evaluated again after each
+            stream update message. Returns a tuple of the index of the
+            predicate and its value, or None and the value of the last
+            predicate if the timeout occurs. """
+        loop = self._conn._loop
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            value = None
+            for i, predicate in enumerate(predicates):
+                value = predicate()
+                if value:
+                    return i, value
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return None, value
+            await self.wait_for_update(remaining)
+
+    def update(self, results, timestamp=None):
+        super().update(results, timestamp)
+        waiters = self._waiters
+        self._waiters = []
+        _complete(waiters)
+
+    @property
+    def error(self):
+        """ The error that stopped stream updates being received,
+            or None if they are still being received """
+        return self._error
+
+    def fail(self, error):
+        """ Stream updates are no longer received. Raise the given error in
+            the tasks waiting for updates, and in those that wait later. """
+        self._error = error
+        waiters = self._waiters
+        self._waiters = []
+        _complete(waiters, error)
+        for stream in list(self._streams.values()):
+            stream.fail(error)
+
+
+class Stream(krpc.stream.Stream):
+    """ A streamed remote procedure call, for an asyncio client. Calling
+        the stream returns its most recent value. Iterating over the stream
+        with 'async for' returns its value each time it is updated. """
+
+    @classmethod
+    async def from_call(cls, conn, return_type, call):
+        # pylint: disable=invalid-overridden-method
+        """ Create a stream from a remote procedure call """
+        return cls(await conn._stream_manager.add_stream(return_type, call))
+
+    async def start(self, wait=True):
+        # pylint: disable=invalid-overridden-method
+        """ Start the stream. If wait is true, waits
+            until the stream has received its first update. """
+        if self._stream.started:
+            return
+        await self._stream.start()
+        if wait:
+            await self._stream.wait(0)
+
+    @property
+    def rate(self):
+        """ The update rate for the stream in Hertz.
+            Zero if the rate is unlimited. """
+        return self._stream.rate
+
+    async def set_rate(self, value):
+        """ Set the update rate for the stream in Hertz.
+            Zero if the rate is unlimited. """
+        await self._stream.set_rate(value)
+
+    def __call__(self):
+        """ Get the most recent value for this stream. The stream must
+            have been started, and have received at least one update. """
+        if not self._stream.started:
+            raise StreamError('Stream has not been started')
+        return super().__call__()
+
+    def get_if_newer(self, sequence):
+        """ Get the most recent value for this stream, if it was received
+            after the given sequence number. The stream must have been
+            started. See krpc.stream.Stream.get_if_newer. """
+        if not self._stream.started:
+            raise StreamError('Stream has not been started')
+        return super().get_if_newer(sequence)
+
+    async def wait(self, timeout=None):
+        # pylint: disable=invalid-overridden-method
+        """ Wait until the next stream update or a timeout occurs. """
+        if not self._stream.started:
+            await self._stream.start()
+        try:
+            await asyncio.wait_for(self._stream.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def __aiter__(self):
+        return _StreamIterator(self)
+
+    async def remove(self):  # pylint: disable=invalid-overridden-method
+        """ Remove the stream """
+        await self._stream.remove()
+
+
+class _StreamIterator(object):
+    """ Returns the value of a stream each time it is updated.
+        If several updates arrive between iterations,
+        only the most recent value is returned. """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._sequence = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        impl = self._stream._stream
+        if not impl.started:
+            await impl.start()
+        await impl.wait(self._sequence)
+        self._sequence = impl.sequence
+        return self._stream()
+
+
+class _StreamContext(object):
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aenter__(self):
+        self._stream = await self._stream
+        return self._stream
+
+    async def __aexit__(self, typ, value, traceback):
+        await self._stream.remove()
+
+
+class Event(krpc.event.Event):
+    """ An event, for an asyncio client """
+
+    _stream_class = Stream
+
+    async def start(self):  # pylint: disable=invalid-overridden-method
+        """ Start the underlying stream for the event """
+        await self._stream.start(False)
+
+    async def wait(self, timeout=None):
+        # pylint: disable=invalid-overridden-method
+        """ Wait until the event is triggered or a timeout occurs.
+            Returns true if the event was triggered. """
+        async def wait_for_event():
+            async for value in self._stream:
+                if value:
+                    return
+        try:
+            await asyncio.wait_for(wait_for_event(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def remove(self):  # pylint: disable=invalid-overridden-method
+        """ Remove the event from the server """
+        await self._stream.remove()
+
+
+class Client(krpc.client.Client):
+    """
+    A kRPC client that uses asyncio. Instances should be obtained
+    by awaiting :func:`connect`. Procedures and property getters return
+    awaitables, and property setters send their request immediately.
+    Nothing awaits the result of a property setter, so if it fails, the
+    error is raised by the next call made after its response is received.
+    To wait for a setter, add it to a batch with Batch.add(setattr, ...).
+
+    Stream update messages are received by a task on the event loop, so
+    fileno, poll_streams and pump_streams are not supported. Neither are
+    lanes, stream groups, or events created from Expression objects.
+    """
+
+    _stream_manager_class = StreamManager
+    _event_class = Event
+
+    def __init__(self, rpc_connection, stream_connection, services):
+        self._loop = asyncio.get_event_loop()
+        self._rpc_connection = rpc_connection
+        self._pending = collections.deque()
+        self._error = None
+        # Error raised by a property setter, that has not been raised yet
+        self._setter_error = None
+        # The encoded KRPC.Services message, downloaded by connect()
+        self._services = services
+        # The base client is not given the connections, as the responses
+        # and stream updates are received by tasks on the event loop
+        super().__init__(None, None)
+        self._stream_connection = stream_connection
+        self._tasks = [self._loop.create_task(self._receive_responses())]
+        if stream_connection is not None:
+            self._tasks.append(self._loop.create_task(
+                self._receive_stream_updates(stream_connection[0])))
+
+    def _get_services(self, rpc_connection, schema_cache=None,
+                      definitions=None):
+        # pylint: disable=unused-argument
+        """ Get the services that were downloaded by connect() """
+        return self._services, definitions
+
+    async def close(self):  # pylint: disable=invalid-overridden-method
+        for task in self._tasks:
+            task.cancel()
+        self._rpc_connection[1].close()
+        if self._stream_connection is not None:
+            self._stream_connection[1].close()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, typ, value, traceback):
+        await self.close()
+
+    async def add_stream(self, func, *args, **kwargs):
+        # pylint: disable=invalid-overridden-method
+        """ Add a stream to the server """
+        if self._stream_connection is None:
+            raise StreamError('Not connected to stream server')
+        if func == setattr:
+            raise StreamError('Cannot stream a property setter')
+        return_type = self._get_return_type(func, *args, **kwargs)
+        call = self.get_call(func, *args, **kwargs)
+        return await Stream.from_call(self, return_type, call)
+
+    def stream(self, func, *args, **kwargs):
+        """ 'async with' support for add_stream """
+        return _StreamContext(self.add_stream(func, *args, **kwargs))
+
+    def batch(self):
+        """ Create a batch of remote procedure calls, that are sent to
+            the server in a single request. Can be used in an 'async with'
+            statement, which executes the batch at the end of the block. """
+        return Batch(self)
+
+    async def call_many(self, calls):
+        # pylint: disable=invalid-overridden-method
+        """ Execute several remote procedure calls in a single request.
+            calls is a sequence of tuples of the form (func, arg1, arg2...)
+            Returns a list of results. If any of the calls raised an
+            exception, the exception for the first of them is re-raised. """
+        batch = Batch(self)
+        for call in calls:
+            batch.add(*call)
+        return [future.result() for future in await batch.execute()]
+
+    def wait_for_stream_update(self, timeout=None):
+        """ Returns an awaitable that completes when the next stream update
+            message has finished being processed, or a timeout occurs. """
+        return self._stream_manager.wait_for_update(timeout)
+
+    async def wait_until(self, predicate, timeout=None):
+        # pylint: disable=invalid-overridden-method
+        """ Wait until predicate returns a true value, or a timeout occurs.
+            The predicate is called again after each stream update message.
+            Returns the value of the predicate, which is false if the
+            timeout occurs. """
+        return (await self._stream_manager.wait_until(
+            [predicate], timeout))[1]
+
+    async def wait_any(self, predicates, timeout=None):
+        # pylint: disable=invalid-overridden-method
+        """ Wait until one of the predicates returns a true value, or a
+            timeout occurs. Returns the index of the predicate, or None
+            if the timeout occurs. See wait_until. """
+        return (await self._stream_manager.wait_until(
+            predicates, timeout))[0]
+
+    async def add_event(self, expression):
+        # pylint: disable=invalid-overridden-method
+        """ Create an event from a KRPC.Expression object, created by
+            awaiting the KRPC.Expression constructors. Returns an Event. """
+        if isinstance(expression, Expression):
+            raise NotImplementedError(
+                'The asyncio client cannot compile expressions. '
+                'Use the KRPC.Expression constructors instead.')
+        return await self.krpc.add_event(expression)
+
+    async def call_array(self, call, out=None):
+        # pylint: disable=invalid-overridden-method
+        """ Execute a remote procedure call, and decode its result into a
+            NumPy array. See krpc.client.Client.call_array. """
+        request, decode = self._array_request(call)
+        response = await self._send_request(request)
+        # Check for errors
+        self._process_response(response, None)
+        return decode(response.results[0].value, out)
+
+    def stream_group(self, calls, names=None):
+        # pylint: disable=unused-argument
+        """ Not supported by the asyncio client """
+        raise NotImplementedError(
+            'Stream groups are not supported by the asyncio client')
+
+    def lane(self, name):  # pylint: disable=unused-argument
+        """ Not supported by the asyncio client, which sends all calls
+            over a single connection without waiting for responses """
+        raise NotImplementedError(
+            'Lanes are not supported by the asyncio client')
+
+    def fileno(self):
+        """ Not supported by the asyncio client, which receives stream
+            updates with a task on the event loop """
+        raise NotImplementedError(
+            'Stream updates are received by a task on the event loop')
+
+    def poll_streams(self):
+        """ Not supported by the asyncio client. See fileno. """
+        raise NotImplementedError(
+            'Stream updates are received by a task on the event loop')
+
+    def pump_streams(self, timeout=None):  # pylint: disable=unused-argument
+        """ Not supported by the asyncio client. See fileno. """
+        raise NotImplementedError(
+            'Stream updates are received by a task on the event loop')
+
+    def _invoke(self, service, procedure, args,
+                param_names, param_types, return_type):
+        """ Send an RPC. Returns a task for the result """
+        call = self._build_call(service, procedure, args,
+                                param_names, param_types, return_type)
+        request = KRPC.Request()
+        request.calls.extend([call])
+        return self._loop.create_task(self._receive_result(
+            self._send_request(request), return_type))
+
+    async def _receive_result(self, response, return_type):
+        return self._process_response(await response, return_type)
+
+    def _invoke_many(self, calls, return_types, futures,
+                     mutates=False):  # pylint: disable=unused-argument
+        """ Send multiple RPCs in a single request. Returns a task that
+            stores their results in the given futures. The asyncio client
+            does not cache results, so mutates is not used. """
+        request = KRPC.Request()
+        request.calls.extend(calls)
+        return self._loop.create_task(self._receive_results(
+            self._send_request(request), return_types, futures))
+
+    async def _receive_results(self, response, return_types, futures):
+        self._process_responses(await response, return_types, futures)
+
+    def _invoke_template(self, template, args):
+        """ Send an RPC, using a template compiled for the
+            procedure. Returns a task for the result """
+        task = self._loop.create_task(self._receive_result(
+            self._send_request_data(template.encode_request(args)),
+            template.return_type))
+        if template.setter:
+            task.add_done_callback(self._setter_done)
+        return task
+
+    def _setter_done(self, task):
+        """ Keep the error raised by a property setter, if any,
+            so that it is raised by the next call """
+        if not task.cancelled() and task.exception() is not None and \
+           self._setter_error is None:
+            self._setter_error = task.exception()
+
+    def _send_request_data(self, data, primary=False):
+        # pylint: disable=unused-argument
+        """ Send an encoded request message, prepended with its
+            size. Returns a future for the response """
+        if self._error is not None:
+            raise self._error
+        if self._setter_error is not None:
+            error = self._setter_error
+            self._setter_error = None
+            raise error
+        future = self._loop.create_future()
+        self._pending.append(future)
+        self._rpc_connection[1].write(data)
+        return future
+
+    async def _receive_responses(self):
+        reader = self._rpc_connection[0]
+        try:
+            while True:
+                response = Decoder.decode_message(
+                    await reader.receive(), KRPC.Response)
+                future = self._pending.popleft()
+                if not future.cancelled():
+                    future.set_result(response)
+        except _RECEIVE_ERRORS as ex:  # pylint: disable=broad-except
+            self._error = ConnectionError(str(ex) or 'Connection closed')
+            while self._pending:
+                future = self._pending.popleft()
+                if not future.cancelled():
+                    future.set_exception(self._error)
+            if isinstance(ex, asyncio.CancelledError):
+                raise
+
+    async def _receive_stream_updates(self, reader):
+        try:
+            while True:
+                self._stream_manager.receive(await reader.receive())
+        except _RECEIVE_ERRORS as ex:  # pylint: disable=broad-except
+            self._stream_manager.fail(
+                ConnectionError(str(ex) or 'Connection closed'))
+            if isinstance(ex, asyncio.CancelledError):
+                raise
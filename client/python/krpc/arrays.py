@@ -0,0 +1,141 @@
+import collections
+from krpc.types import ValueType, TupleType, ListType
+import krpc.schema.KRPC_pb2 as KRPC
+
+# For value types with a fixed size encoding, the little endian NumPy dtype
+# of the encoded values, the dtype of the arrays they are decoded into, and
+# the size of the encoded values
+_DTYPES = {
+    KRPC.Type.DOUBLE: ('<f8', 'float64', 8),
+    KRPC.Type.FLOAT: ('<f4', 'float32', 4)
+}
+
+# Tag for the items of a collection message (field 1, length delimited)
+_ITEM_TAG = 0x0a
+
+# The positions of the numbers in the encoding of a value with a fixed
+# size. The numbers form a strided array with the given shape, strides
+# and offset in bytes. header is a tuple of (position, byte) pairs, for
+# the tags and sizes of the items of the collection messages that the
+# encoding is made up of.
+_Layout = collections.namedtuple(
+    '_Layout', ['code', 'size', 'shape', 'strides', 'offset', 'header'])
+
+
+def _layout(typ):
+    """ Get the layout of the encoding of a value type with a fixed size,
+        or of a tuple of such values, or None if the encoding of values of
+        the type does not have a fixed layout """
+    if isinstance(typ, ValueType):
+        code = typ.protobuf_type.code
+        if code not in _DTYPES:
+            return None
+        return _Layout(code, _DTYPES[code][2], (), (), 0, ())
+    if isinstance(typ, TupleType):
+        items = [_layout(x) for x in typ.value_types]
+        item = items[0]
+        # The size of an item must fit in a single byte varint
+        if item is None or item.size > 127 or \
+           any(x != item for x in items[1:]):
+            return None
+        stride = item.size + 2
+        header = []
+        for i in range(len(items)):
+            start = i * stride
+            header.extend(((start, _ITEM_TAG), (start + 1, item.size)))
+            header.extend((start + 2 + pos, x) for pos, x in item.header)
+        return _Layout(item.code, stride * len(items),
+                       (len(items),) + item.shape,
+                       (stride,) + item.strides,
+                       item.offset + 2, tuple(header))
+    return None
+
+
+def compile_decoder(typ):
+    """ Build a function that decodes values of the given type into NumPy
+        arrays, or return None if the type is not supported. Lists and
+        tuples of doubles or floats, tuples of such tuples, and lists of
+        such tuples are supported. For example, a list of 3-tuples of
+        doubles is decoded into an array of shape (n, 3).
+
+        The function takes the encoded value and an optional array to
+        decode it into, and returns the array. The numbers are read
+        straight from the encoded value, without parsing the collection
+        messages item by item. """
+    if isinstance(typ, ListType):
+        item = _layout(typ.value_type)
+        if item is None or item.size > 127:
+            return None
+        # Each row is the encoding of an item, preceded by its tag and size
+        layout = _Layout(
+            item.code, item.size + 2, (None,) + item.shape,
+            (item.size + 2,) + item.strides, item.offset + 2,
+            ((0, _ITEM_TAG), (1, item.size)) +
+            tuple((pos + 2, x) for pos, x in item.header))
+        return _array_decoder(typ, layout)
+    if isinstance(typ, TupleType):
+        layout = _layout(typ)
+        if layout is None:
+            return None
+        return _array_decoder(typ, layout)
+    return None
+
+
+def _array_decoder(typ, layout):
+    """ Build a function that decodes values with the given layout. If
+        the first dimension of the layout's shape is None, the encoded
+        value is a list with a row of size layout.size for each item. """
+    # NumPy is optional, and only imported when it is used
+    import numpy  # pylint: disable=import-error
+    encoded_dtype, dtype, _ = _DTYPES[layout.code]
+    encoded_dtype = numpy.dtype(encoded_dtype)
+    dtype = numpy.dtype(dtype)
+    rows = layout.shape[0] is None
+    positions = numpy.array([pos for pos, _ in layout.header], dtype=int)
+    expected = numpy.array([x for _, x in layout.header], dtype=numpy.uint8)
+    decode_items = typ.decoder
+
+    def view(data):
+        """ Get a read-only view of the numbers in the encoded value, or
+            None if it is not laid out as expected """
+        if rows:
+            count, remainder = divmod(len(data), layout.size)
+            if remainder != 0:
+                return None
+            shape = (count,) + layout.shape[1:]
+            if count == 0:
+                return numpy.empty(shape, dtype=encoded_dtype)
+        else:
+            count = 1
+            shape = layout.shape
+            if len(data) != layout.size:
+                return None
+        if len(positions) > 0:
+            headers = numpy.frombuffer(data, dtype=numpy.uint8) \
+                           .reshape(count, layout.size)[:, positions]
+            if not (headers == expected).all():
+                return None
+        return numpy.ndarray(shape, dtype=encoded_dtype, buffer=data,
+                             offset=layout.offset, strides=layout.strides)
+
+    def decode(data, out=None):
+        if data == b'\x00':
+            return None
+        values = view(data)
+        if values is None:
+            values = numpy.array(decode_items(data), dtype=dtype)
+        if out is None:
+            return numpy.array(values, dtype=dtype)
+        if rows:
+            if len(out) < len(values) or out.shape[1:] != values.shape[1:]:
+                raise ValueError(
+                    'Array of shape %s cannot hold a value of shape %s' %
+                    (out.shape, values.shape))
+            out = out[:len(values)]
+        elif out.shape != values.shape:
+            raise ValueError(
+                'Array of shape %s cannot hold a value of shape %s' %
+                (out.shape, values.shape))
+        out[...] = values
+        return out
+    return decode
@@ -0,0 +1,193 @@
+import collections
+import threading
+from krpc.error import RPCError
+from krpc.platform import monotonic
+from krpc.stream import Stream
+
+# Number of seconds that an automatic stream can go unread before it is
+# removed, by default
+DEFAULT_IDLE_TIMEOUT = 5.0
+
+# Length of the window, in seconds, over which calls are counted
+_WINDOW = 1.0
+
+PromotedCall = collections.namedtuple(
+    'PromotedCall', ['service', 'procedure', 'call', 'reads', 'idle'])
+
+
+class _Promoted(object):
+    """ A call that has been replaced with a stream """
+
+    __slots__ = ('template', 'call', 'stream', 'reads', 'last_read')
+
+    def __init__(self, template, call, stream, now):
+        self.template = template
+        self.call = call
+        self.stream = stream
+        self.reads = 0
+        self.last_read = now
+
+
+class AutoStreams(object):
+    """ Replaces calls to property getters that are made frequently with
+        streams. When the same call, with the same encoded arguments, is
+        made more than rate times in a second, a stream is created for it
+        and the call returns the most recent value of the stream from
+        then on. Streams that are not read for idle_timeout seconds are
+        removed by a background thread, and the call goes back to being
+        sent to the server.
+
+        Values read from a stream can be up to one stream update old, so a
+        getter called straight after the matching setter can return the
+        previous value. """
+
+    def __init__(self, client, rate, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        if rate <= 0:
+            raise ValueError('Auto stream rate must be positive')
+        self._client = client
+        self._manager = client._stream_manager
+        self._rate = rate
+        self._idle_timeout = idle_timeout
+        # Lock for the state below, notified when the
+        # idle timeout changes or the streams are closed
+        self._lock = threading.Condition()
+        # Map from an encoded call to the start of its current
+        # window and the number of calls made in the window
+        self._counts = {}
+        # Map from an encoded call to its _Promoted object
+        self._promoted = {}
+        self._next_sweep = monotonic() + idle_timeout
+        self._closed = False
+        self._thread = threading.Thread(target=self._sweep_thread)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def rate(self):
+        """ The number of calls per second above
+            which a call is replaced with a stream """
+        return self._rate
+
+    @property
+    def idle_timeout(self):
+        """ The number of seconds that a stream can go
+            unread before it is removed """
+        return self._idle_timeout
+
+    @idle_timeout.setter
+    def idle_timeout(self, value):
+        with self._lock:
+            self._idle_timeout = value
+            self._next_sweep = min(self._next_sweep, monotonic() + value)
+            self._lock.notify_all()
+
+    @property
+    def promoted(self):
+        """ The calls that are currently served by streams, as a list of
+            PromotedCall tuples containing the service and procedure names,
+            the KRPC.ProcedureCall message, the number of times the stream
+            has been read and the number of seconds since it was last
+            read. """
+        now = monotonic()
+        with self._lock:
+            promoted = list(self._promoted.values())
+        return [PromotedCall(x.template.service, x.template.procedure,
+                             x.call, x.reads, now - x.last_read)
+                for x in promoted]
+
+    def invoke(self, template, args):
+        """ Execute a call to a property getter, from a stream if the
+            call is made often enough, otherwise by sending it to the
+            server """
+        call = template.encode_call(args)
+        now = monotonic()
+        promote = False
+        with self._lock:
+            promoted = self._promoted.get(call)
+            if promoted is not None:
+                promoted.reads += 1
+                promoted.last_read = now
+            else:
+                count = self._counts.get(call)
+                if count is None or now - count[0] >= _WINDOW:
+                    self._counts[call] = [now, 1]
+                else:
+                    count[1] += 1
+                    promote = count[1] > self._rate
+        if promoted is None and promote:
+            promoted = self._promote(template, call, now)
+        if promoted is not None:
+            stream = promoted.stream
+            if self._manager.has_stream(stream._stream.stream_id):
+                return stream()
+            # The stream was removed by its other user
+            with self._lock:
+                self._promoted.pop(call, None)
+        return self._client._invoke_template_call(template, call)
+
+    def remove(self):
+        """ Remove all of the streams, so that
+            the calls are sent to the server again """
+        with self._lock:
+            promoted = list(self._promoted.values())
+            self._promoted = {}
+            self._counts = {}
+        self._remove(promoted)
+
+    def close(self):
+        """ Stop removing idle streams. Called when the client is closed. """
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self._thread.join()
+
+    def _promote(self, template, call, now):
+        """ Create a stream for a call. Returns None
+            if the stream could not be created. """
+        message = template.build_call_from(call)
+        try:
+            stream = Stream(self._manager.add_stream(
+                template.return_type, message, auto=True))
+        except RPCError:
+            return None
+        promoted = _Promoted(template, message, stream, now)
+        with self._lock:
+            if call in self._promoted:
+                # Another thread promoted the call first
+                return self._promoted[call]
+            self._promoted[call] = promoted
+            self._counts.pop(call, None)
+        return promoted
+
+    def _sweep_thread(self):
+        """ Remove idle streams every idle_timeout seconds, even if
+            the calls they replaced are no longer being made """
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                now = monotonic()
+                if now < self._next_sweep:
+                    self._lock.wait(self._next_sweep - now)
+                    continue
+            self._sweep(now)
+
+    def _sweep(self, now):
+        """ Remove streams that have not been read recently, and
+            counts for calls that have not been made recently """
+        with self._lock:
+            self._next_sweep = now + self._idle_timeout
+            idle = [call for call, x in self._promoted.items()
+                    if now - x.last_read > self._idle_timeout]
+            idle = [self._promoted.pop(call) for call in idle]
+            for call in [call for call, count in self._counts.items()
+                         if now - count[0] >= _WINDOW]:
+                del self._counts[call]
+        self._remove(idle)
+
+    def _remove(self, promoted):
+        """ Remove the streams for promoted calls, unless they
+            were also added explicitly by the user """
+        streams = [x.stream._stream for x in promoted if x.stream._stream.auto]
+        if streams:
+            self._manager.remove_streams(streams)
@@ -0,0 +1,79 @@
+from krpc.error import RPCError
+from krpc.future import Future
+
+
+class Batch(object):
+    """ A batch of remote procedure calls, that are sent to the
+        server in a single request message when the batch is executed. """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._calls = []
+        self._return_types = []
+        self._futures = []
+        self._executed = False
+        # Whether any of the calls change the state of the game,
+        # so that the client must discard cached results
+        self._mutates = False
+
+    def add(self, func, *args, **kwargs):
+        """ Add a call to the batch. Returns a future that
+            holds the result once the batch has been executed.
+            Property setters are added as add(setattr, obj, name, value),
+            and their futures hold None. """
+        if self._executed:
+            raise RPCError('Batch has already been executed')
+        if func == setattr:
+            obj, name, value = args
+            setter = getattr(obj.__class__, name).fset
+            if setter is None:
+                raise AttributeError('Property %s cannot be set' % name)
+            self._calls.append(setter._build_call(obj, value))
+            self._return_types.append(None)
+            self._mutates = True
+        else:
+            self._calls.append(self._conn.get_call(func, *args, **kwargs))
+            self._return_types.append(
+                self._conn._get_return_type(func, *args, **kwargs))
+            self._mutates = self._mutates or self._conn._mutates(func, *args)
+        future = Future()
+        self._futures.append(future)
+        return future
+
+    def execute(self):
+        """ Send the calls to the server and wait for the results.
+            Returns the list of futures for the calls. """
+        if self._executed:
+            raise RPCError('Batch has already been executed')
+        self._executed = True
+        if self._calls:
+            try:
+                self._conn._invoke_many(
+                    self._calls, self._return_types, self._futures,
+                    self._mutates)
+            except BaseException as ex:
+                self._fail(ex)
+                raise
+        return self._futures
+
+    def __len__(self):
+        return len(self._calls)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, value, traceback):
+        if typ is None:
+            self.execute()
+        elif not self._executed:
+            # The calls are not sent, so their futures will never
+            # receive a result from the server
+            self._executed = True
+            self._fail(RPCError('Batch was not executed'))
+
+    def _fail(self, error):
+        """ Complete the futures that have not received a result
+            with the given error """
+        for future in self._futures:
+            if not future.done():
+                future.set_exception(error)
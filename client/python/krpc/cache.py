@@ -0,0 +1,294 @@
+import collections
+import threading
+from krpc.platform import monotonic
+
+# Policies for caching the results of a procedure. A policy can also be a
+# number of seconds, for which a result is kept before it is fetched again.
+# The result never changes, so it is kept until the game scene changes.
+IMMUTABLE = 'immutable'
+# The result can only change when the game advances by a physics tick,
+# so it is kept until the universal time changes
+TICK = 'tick'
+# The result is never cached
+NEVER = 'never'
+# The result is never cached, and calls to the procedure change the state
+# of the game, so they discard all cached results apart from immutable ones
+INVALIDATE = 'invalidate'
+
+# Maximum number of results that are cached, by default
+DEFAULT_MAX_SIZE = 4096
+
+# Policies for procedures whose results are known to change rarely, keyed
+# by the name of the service and procedure separated by a dot
+DEFAULT_POLICIES = dict(
+    [('SpaceCenter.get_Bodies', IMMUTABLE)] +
+    [('SpaceCenter.CelestialBody_get_' + name, IMMUTABLE) for name in (
+        'Name', 'Satellites', 'Mass', 'GravitationalParameter',
+        'SurfaceGravity', 'RotationalPeriod', 'RotationalSpeed',
+        'InitialRotation', 'EquatorialRadius', 'SphereOfInfluence', 'Orbit',
+        'HasAtmosphere', 'AtmosphereDepth', 'HasAtmosphericOxygen',
+        'FlyingHighAltitudeThreshold', 'SpaceHighAltitudeThreshold',
+        'ReferenceFrame', 'NonRotatingReferenceFrame',
+        'OrbitalReferenceFrame')] +
+    [('SpaceCenter.CelestialBody_get_RotationAngle', TICK)] +
+    [('SpaceCenter.Part_get_' + name, IMMUTABLE) for name in (
+        'Name', 'Title', 'Cost', 'DryMass', 'Massless', 'RadiallyAttached',
+        'ImpactTolerance', 'MaxTemperature', 'MaxSkinTemperature',
+        'IsFuelLine', 'Modules')] +
+    [('SpaceCenter.Part_get_' + name, TICK) for name in (
+        'Mass', 'Temperature', 'SkinTemperature')] +
+    [('SpaceCenter.' + name, INVALIDATE) for name in (
+        'ClearTarget', 'LaunchVessel', 'LaunchVesselFromVAB',
+        'LaunchVesselFromSPH', 'Load', 'Quickload', 'WarpTo',
+        'AutoPilot_Engage', 'AutoPilot_Disengage',
+        'AutoPilot_TargetPitchAndHeading', 'Contract_Accept',
+        'Contract_Cancel', 'Contract_Decline', 'Control_ActivateNextStage',
+        'Control_AddNode', 'Control_RemoveNodes', 'Control_SetActionGroup',
+        'Control_ToggleActionGroup', 'Decoupler_Decouple',
+        'DockingPort_Undock', 'Engine_ToggleMode', 'Experiment_Dump',
+        'Experiment_Reset', 'Experiment_Run', 'Experiment_Transmit',
+        'Fairing_Jettison', 'Force_Remove', 'LaunchClamp_Release',
+        'Module_ResetField', 'Module_SetAction', 'Module_SetFieldFloat',
+        'Module_SetFieldInt', 'Module_SetFieldString',
+        'Module_TriggerEvent', 'Node_Remove', 'Parachute_Arm',
+        'Parachute_Deploy', 'Part_AddForce', 'Part_InstantaneousForce',
+        'ResourceConverter_Start', 'ResourceConverter_Stop',
+        'ResourceTransfer_static_Start', 'Vessel_Recover',
+        'Waypoint_Remove', 'WaypointManager_AddWaypointAtAltitude')])
+
+
+def _check_policy(policy):
+    if policy in (IMMUTABLE, TICK, NEVER, INVALIDATE):
+        return
+    if isinstance(policy, (int, float)) and not isinstance(policy, bool) \
+       and policy > 0:
+        return
+    raise ValueError('Invalid cache policy \'%s\'' % (policy,))
+
+
+class ResultCache(object):
+    """ Caches the results of remote procedure calls, keyed by the encoded
+        call, according to a policy for each procedure. The policies are
+        those in DEFAULT_POLICIES, updated with the given policies, which
+        are keyed by 'Service.Procedure' names.
+
+        Calls to property setters, and to procedures with the INVALIDATE
+        policy, change the state of the game, and discard all cached
+        results apart from immutable ones, as do batches containing such
+        calls. All cached results
+        are discarded when the game scene changes. The least recently used
+        results are discarded when there are more than max_size. """
+
+    def __init__(self, client, policies=None, max_size=DEFAULT_MAX_SIZE):
+        self._client = client
+        self._policies = dict(DEFAULT_POLICIES)
+        for policy in (policies or {}).values():
+            _check_policy(policy)
+        self._policies.update(policies or {})
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        # Map from an encoded call to a tuple of its encoded result, the
+        # policy, the generation it was stored in, and the universal time
+        # or expiry time for tick and time limited policies
+        self._entries = collections.OrderedDict()
+        # Map from call templates to their policies
+        self._template_policies = {}
+        # Incremented to invalidate results that are not immutable
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._game = _GameState(client)
+
+    @property
+    def hits(self):
+        """ The number of calls whose result was found in the cache """
+        return self._hits
+
+    @property
+    def misses(self):
+        """ The number of calls with a policy whose result
+            was not found in the cache """
+        return self._misses
+
+    @property
+    def size(self):
+        """ The number of results in the cache """
+        return len(self._entries)
+
+    @property
+    def max_size(self):
+        """ The maximum number of results in the cache """
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, value):
+        with self._lock:
+            self._max_size = value
+            self._evict()
+
+    def policy(self, name):
+        """ Get the policy for a procedure, given its 'Service.Procedure'
+            name, or None if it does not have a policy """
+        return self._policies.get(name)
+
+    def set_policy(self, name, policy):
+        """ Set the policy for a procedure, given its 'Service.Procedure'
+            name. If policy is None, the procedure no longer has a policy.
+            Results cached for the procedure are discarded. """
+        if policy is not None:
+            _check_policy(policy)
+        with self._lock:
+            if policy is None:
+                self._policies.pop(name, None)
+            else:
+                self._policies[name] = policy
+            self._template_policies = {}
+            self._entries.clear()
+
+    def clear(self):
+        """ Discard all cached results """
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self):
+        """ Discard all cached results apart from immutable ones """
+        with self._lock:
+            self._generation += 1
+
+    def invoke(self, template, args):
+        """ Execute a remote procedure call, returning
+            a cached result if there is one """
+        client = self._client
+        if template.primary:
+            return client._invoke_template_uncached(template, args)
+        policy = self._template_policy(template)
+        if template.setter or policy == INVALIDATE:
+            # Discard results both before and after the call, so that
+            # results fetched by other threads while it is in progress
+            # are not kept
+            self.invalidate()
+            try:
+                return client._invoke_template_uncached(template, args)
+            finally:
+                self.invalidate()
+        if policy in (False, NEVER):
+            return client._invoke_template_uncached(template, args)
+
+        if self._game.scene_changed():
+            self.clear()
+        now = monotonic()
+        stamp = None
+        if policy == TICK:
+            stamp = self._game.universal_time()
+            if stamp is None:
+                return client._invoke_template_uncached(template, args)
+        elif policy != IMMUTABLE:
+            stamp = now + policy
+
+        call = template.encode_call(args)
+        with self._lock:
+            entry = self._entries.get(call)
+            if entry is not None and self._valid(entry, now, stamp):
+                self._hits += 1
+                # Move the entry to the end, as the most recently used
+                del self._entries[call]
+                self._entries[call] = entry
+            else:
+                entry = None
+                self._misses += 1
+            generation = self._generation
+        if entry is not None:
+            return client._decode_result(entry[0], template.return_type)
+
+        response = client._send_request_data(
+            template.encode_request_for(call), template.primary)
+        result = client._process_response(response, template.return_type)
+        with self._lock:
+            self._entries.pop(call, None)
+            self._entries[call] = (
+                response.results[0].value, policy, generation, stamp)
+            self._evict()
+        return result
+
+    def mutates(self, template):
+        """ Whether calls to a procedure change the state of the game, so
+            they discard all cached results apart from immutable ones """
+        return template.setter or \
+            self._template_policy(template) == INVALIDATE
+
+    def _template_policy(self, template):
+        """ The policy for a call template, or False if
+            its procedure does not have a policy """
+        policy = self._template_policies.get(template)
+        if policy is None:
+            policy = self._policies.get(
+                template.service + '.' + template.procedure, False)
+            self._template_policies[template] = policy
+        return policy
+
+    def _valid(self, entry, now, ut):
+        """ Whether a cached result can be returned """
+        _, policy, generation, stamp = entry
+        if policy == IMMUTABLE:
+            return True
+        if generation != self._generation:
+            return False
+        if policy == TICK:
+            return stamp == ut
+        return now < stamp
+
+    def _evict(self):
+        """ Discard the least recently used results,
+            so that there are at most max_size """
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+
+class _GameState(object):
+    """ The universal time and game scene of a client, read from streams
+        that are created when they are first needed """
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+        # The streams, or False if they are not available
+        self._ut = None
+        self._scene = None
+        # The game scene when scene_changed was last called
+        self._scene_value = None
+
+    def universal_time(self):
+        """ The most recent universal time received from the
+            server, or None if it is not available """
+        with self._lock:
+            if self._ut is None:
+                self._ut = _add_stream(self._client, 'space_center', 'ut')
+        if self._ut is False:
+            return None
+        return self._ut()
+
+    def scene_changed(self):
+        """ Whether the game scene has changed since this was last called """
+        with self._lock:
+            if self._scene is None:
+                self._scene = _add_stream(
+                    self._client, 'krpc', 'current_game_scene')
+        if self._scene is False:
+            return False
+        scene = self._scene()
+        with self._lock:
+            changed = scene != self._scene_value
+            self._scene_value = scene
+        return changed
+
+
+def _add_stream(client, service, name):
+    """ Add a stream for a property of a service. Returns
+        False if the service or stream server is not available. """
+    if client._stream_connection is None:
+        return False
+    try:
+        service = getattr(client, service)
+    except AttributeError:
+        return False
+    return client.add_stream(getattr, service, name)
@@ -0,0 +1,141 @@
+# pylint: disable=import-error,no-name-in-module
+from google.protobuf.internal.encoder import _VarintBytes
+from krpc.attributes import Attributes
+from krpc.types import DefaultArgument
+import krpc.schema.KRPC_pb2 as KRPC
+
+
+class CallTemplate(object):
+    """ A remote procedure call to a particular procedure, compiled into
+        a form that can be encoded quickly. The encoded service and
+        procedure names are computed once, and each parameter has its own
+        encoder that remembers the encoding of the last value passed to it.
+
+        The encoding is built directly in the protocol buffer format
+        of a KRPC.Request message, without creating message objects.
+
+        If service_id and procedure_id are given, the call is addressed
+        using the ids instead of the names. """
+
+    def __init__(self, types, service, procedure, param_types, return_type,
+                 service_id=0, procedure_id=0):
+        self.service = service
+        self.procedure = procedure
+        self.param_types = param_types
+        self.return_type = return_type
+        # Calls to the KRPC service, and calls that create streams, must be
+        # sent over the primary connection, as streams belong to the
+        # connection that created them
+        self.primary = service == 'KRPC' or creates_stream(return_type)
+        # Whether the procedure is a property getter,
+        # whose calls can be replaced with streams
+        self.getter = not self.primary and return_type is not None and (
+            Attributes.is_a_property_getter(procedure) or
+            Attributes.is_a_class_property_getter(procedure))
+        # Whether the procedure is a property setter
+        self.setter = Attributes.is_a_property_setter(procedure) or \
+            Attributes.is_a_class_property_setter(procedure)
+        # The fields before and after the arguments, in field number order
+        header = KRPC.ProcedureCall()
+        trailer = KRPC.ProcedureCall()
+        if service_id and procedure_id:
+            trailer.service_id = service_id
+            trailer.procedure_id = procedure_id
+        else:
+            header.service = service
+            header.procedure = procedure
+        self._header = header.SerializeToString()
+        self._trailer = trailer.SerializeToString()
+        self._encoders = [
+            _ArgumentEncoder(types, service, procedure, position, typ)
+            for position, typ in enumerate(param_types)]
+
+    def encode_call(self, args):
+        """ Encode a KRPC.ProcedureCall message for the given arguments """
+        data = [self._header]
+        for encoder, value in zip(self._encoders, args):
+            if not isinstance(value, DefaultArgument):
+                data.append(encoder.encode(value))
+        data.append(self._trailer)
+        return b''.join(data)
+
+    def encode_request(self, args):
+        """ Encode a KRPC.Request message, prepended with its size,
+            containing a single call with the given arguments """
+        return self.encode_request_for(self.encode_call(args))
+
+    @staticmethod
+    def encode_request_for(call):
+        """ Encode a KRPC.Request message, prepended with its size,
+            containing a single encoded KRPC.ProcedureCall message """
+        # Field 1 (calls), length delimited
+        request = b'\x0a' + _VarintBytes(len(call)) + call
+        return _VarintBytes(len(request)) + request
+
+    def build_call(self, args):
+        """ Build a KRPC.ProcedureCall object for the given arguments """
+        return self.build_call_from(self.encode_call(args))
+
+    @staticmethod
+    def build_call_from(call):
+        """ Build a KRPC.ProcedureCall object from
+            an encoded KRPC.ProcedureCall message """
+        return KRPC.ProcedureCall.FromString(call)
+
+
+def creates_stream(return_type):
+    """ Whether calls to a procedure with the given return type create a
+        stream on the server. Procedures that return events do so. """
+    return return_type is not None and \
+        return_type.protobuf_type.code in (KRPC.Type.EVENT, KRPC.Type.STREAM)
+
+
+_IMMUTABLE_TYPE_CODES = frozenset((
+    KRPC.Type.DOUBLE, KRPC.Type.FLOAT, KRPC.Type.SINT32, KRPC.Type.SINT64,
+    KRPC.Type.UINT32, KRPC.Type.UINT64, KRPC.Type.BOOL, KRPC.Type.STRING,
+    KRPC.Type.BYTES, KRPC.Type.CLASS, KRPC.Type.ENUMERATION))
+
+
+class _ArgumentEncoder(object):
+    """ Encodes an argument for a parameter, as a KRPC.Argument message
+        embedded in the arguments field of a KRPC.ProcedureCall """
+
+    def __init__(self, types, service, procedure, position, typ):
+        self._types = types
+        self._service = service
+        self._procedure = procedure
+        self._position = position
+        self._typ = typ
+        # Field 1 (position) is omitted when zero, then field 2 (value)
+        if position == 0:
+            self._prefix = b'\x12'
+        else:
+            self._prefix = b'\x08' + _VarintBytes(position) + b'\x12'
+        # The last value encoded, and its encoding. Only scalar, class and
+        # enumeration values are remembered, as they cannot be modified in
+        # place, so that a value found here by identity is guaranteed to
+        # encode the same way. Collections and messages are mutable.
+        self._last = (None, None)
+        self._remember = typ.protobuf_type.code in _IMMUTABLE_TYPE_CODES
+
+    def encode(self, value):
+        last_value, last_data = self._last
+        if value is last_value and last_data is not None:
+            return last_data
+        typ = self._typ
+        original = value
+        if not isinstance(value, typ.python_type):
+            try:
+                value = self._types.coerce_to(value, typ)
+            except ValueError:
+                raise TypeError(
+                    '%s.%s() argument %d must be a %s, got a %s' %
+                    (self._service, self._procedure, self._position,
+                     typ.python_type, type(value)))
+        encoded = typ.encoder(value)
+        argument = self._prefix + _VarintBytes(len(encoded)) + encoded
+        # Field 3 (arguments), length delimited
+        data = b'\x1a' + _VarintBytes(len(argument)) + argument
+        if self._remember:
+            self._last = (original, data)
+        return data
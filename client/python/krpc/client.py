@@ -1,11 +1,21 @@
 from contextlib import contextmanager
 import sys
-import threading
 from krpc.error import StreamError
 from krpc.event import Event
+from krpc.expression import Expression
+from krpc.batch import Batch
+from krpc.pool import ConnectionPool, DEFAULT_LANE
+from krpc.calltemplate import creates_stream
 from krpc.types import Types, DefaultArgument
 from krpc.service import create_service
 from krpc.streammanager import StreamManager
+from krpc.streamgroup import StreamGroup
+from krpc.recorder import Recorder
+from krpc.autostream import AutoStreams
+from krpc.cache import ResultCache
+from krpc.registry import get_schema
+from krpc.options import Options
+from krpc.executor import CallbackExecutor, BLOCK
 from krpc.encoder import Encoder
 from krpc.decoder import Decoder
 from krpc.utils import snake_case
@@ -16,6 +26,9 @@ import krpc.schema.KRPC_pb2 as KRPC
 if sys.version_info < (3, 0):
     from future_builtins import zip  # noqa  # pylint: disable=redefined-builtin,import-error
 
+# Id of the KRPC service, used when calls are addressed by id
+KRPC_SERVICE_ID = 1
+
 
 class Client(object):
     """
@@ -23,41 +36,126 @@ class Client(object):
     Services provided by the server that the client connects
     to are automatically added. RPCs can be made using
     client.ServiceName.ProcedureName(parameter)
+
+    options is a krpc.options.Options object, holding the optional
+    features of the client:
+
+    If options.pipelined is true, requests are sent to the server without
+    waiting for the responses to requests made by other threads.
+
+    options.lanes is an optional dictionary mapping lane names to lists of
+    additional RPC connections. Connections listed for the default lane are
+    used alongside rpc_connection. See Client.lane.
+
+    If options.schema_cache is a SchemaCache, the services provided by the
+    server are loaded from it when possible, instead of being downloaded.
+
+    If options.services is not None, only the named services are added to
+    the client, along with the KRPC service.
+
+    If options.docs is false, the documentation for the services is
+    discarded, and their docstrings are None.
+
+    If options.definitions is a Definitions object, calls to the services
+    it has ids for are addressed using the ids instead of names. If a schema
+    cache is also given, the ids are stored in it, and are loaded from it
+    when there are no definitions.
+
+    If options.lazy_decode is true, stream values are decoded when they are
+    first read, instead of when they are received.
+
+    If options.callback_executor is not None, stream callbacks are run by it
+    instead of by the stream update thread. It is either the number of
+    threads for a CallbackExecutor owned by the client, or an object with a
+    submit method.
+
+    If options.stream_thread is false, stream updates are not received by a
+    thread. They are received by calling poll_streams() or pump_streams(),
+    for example when select() reports that the client is readable.
+
+    If options.auto_stream is not None, calls to property getters that are
+    made more than auto_stream times per second are replaced with streams.
+    See krpc.autostream.AutoStreams.
+
+    If options.cache is true, the results of calls to procedures that have
+    a cache policy are cached. It can also be a dictionary of policies, keyed
+    by 'Service.Procedure' names, that override the default policies.
+    See krpc.cache.ResultCache.
+
+    If options.numpy_arrays is true, results of procedures and streams that
+    are collections of numbers are decoded into NumPy arrays.
+    See krpc.arrays.
     """
 
-    def __init__(self, rpc_connection, stream_connection):
+    # Classes used for the client's stream manager, and for the
+    # events returned by procedures
+    _stream_manager_class = StreamManager
+    _event_class = Event
+
+    def __init__(self, rpc_connection, stream_connection, options=None):
+        if options is None:
+            options = Options()
+        self._options = options
         self._types = Types()
-        self._rpc_connection = rpc_connection
-        self._rpc_connection_lock = threading.Lock()
+        pool = dict(options.lanes or {})
+        pool[DEFAULT_LANE] = [rpc_connection] + pool.get(DEFAULT_LANE, [])
+        self._pool = ConnectionPool(pool, options.pipelined)
         self._stream_connection = stream_connection
-        self._stream_manager = StreamManager(self)
+        callback_executor = options.callback_executor
+        self._callback_executor = None
+        if isinstance(callback_executor, int):
+            callback_executor = CallbackExecutor(callback_executor)
+            self._callback_executor = callback_executor
+        self._stream_manager = self._stream_manager_class(
+            self, options, callback_executor)
+        self._auto_streams = None
+        self._cache = None
 
-        # Get the services
-        services = self._invoke('KRPC', 'GetServices', [], [], [],
-                                self._types.services_type).services
+        # Get the services. The schema, and the types that do not contain
+        # remote objects, are shared with other clients in the process
+        # that are connected to servers providing the same services. The
+        # service objects are built for this client.
+        data, definitions = self._get_services(
+            rpc_connection, options.schema_cache, options.definitions)
+        self._schema = get_schema(data, options.docs)
+        self._types.share(self._schema.types)
 
         # Set up services
-        for service in services:
-            setattr(self, snake_case(service.name),
-                    create_service(self, service))
+        self._add_services(self._schema.services.services, options.services,
+                           options.docs, definitions)
 
         # Set up stream update thread
-        if stream_connection is not None:
-            self._stream_thread_stop = threading.Event()
-            self._stream_thread = threading.Thread(
-                target=krpc.streammanager.update_thread,
-                args=(self._stream_manager, stream_connection,
-                      self._stream_thread_stop))
-            self._stream_thread.daemon = True
-            self._stream_thread.start()
-        else:
-            self._stream_thread = None
+        self._stream_thread = None
+        if stream_connection is not None and not options.stream_thread:
+            self._stream_manager.pump_from(stream_connection)
+        elif stream_connection is not None:
+            self._stream_thread = krpc.streammanager.UpdateThread(
+                self._stream_manager, stream_connection)
+
+        # Set up automatic streams, which need the stream update thread
+        # so that the values read from them are kept up to date
+        if options.auto_stream is not None:
+            if self._stream_thread is None:
+                raise StreamError(
+                    'Automatic streams require a stream update thread')
+            self._auto_streams = AutoStreams(self, options.auto_stream)
+
+        # Set up the result cache
+        if options.cache:
+            self._cache = ResultCache(
+                self, options.cache if isinstance(options.cache, dict)
+                else None)
 
     def close(self):
-        self._rpc_connection.close()
+        if self._auto_streams is not None:
+            self._auto_streams.close()
+        self._pool.close()
         if self._stream_thread is not None:
-            self._stream_thread_stop.set()
-            self._stream_thread.join()
+            self._stream_thread.stop()
+        elif self._stream_connection is not None:
+            self._stream_connection.close()
+        if self._callback_executor is not None:
+            self._callback_executor.shutdown()
 
     def __enter__(self):
         return self
@@ -84,6 +182,101 @@ class Client(object):
         finally:
             stream.remove()
 
+    def stream_group(self, calls, names=None):
+        """ Create a group of streams, whose values are read together as
+            consistent snapshots. calls is a sequence of tuples of the form
+            (func, arg1, arg2...), as for add_stream. names is an optional
+            list of names for the values, in which case the snapshots are
+            named tuples. The streams are added in a single request. """
+        if self._stream_connection is None:
+            raise StreamError('Not connected to stream server')
+        streams = []
+        for call in calls:
+            func, args = call[0], call[1:]
+            if func == setattr:
+                raise StreamError('Cannot stream a property setter')
+            streams.append((self._get_return_type(func, *args),
+                            self.get_call(func, *args)))
+        return StreamGroup(self, streams, names)
+
+    def record_streams(self, path):
+        """ Record the stream update messages received from the server
+            to a file, so that they can be played back using
+            krpc.recorder.Replay. Returns a krpc.recorder.Recorder. Close it,
+            or use it in a 'with' statement, to stop recording. """
+        if self._stream_connection is None:
+            raise StreamError('Not connected to stream server')
+        recorder = Recorder(path)
+        self._stream_manager.start_recording(recorder)
+        return recorder
+
+    def add_event(self, expression):
+        """ Create an event that is triggered when an expression, evaluated
+            by the server, returns true. expression is a
+            krpc.expression.Expression, which is created on the server by
+            calling the KRPC.Expression constructors. Returns a
+            krpc.event.Event. """
+        if isinstance(expression, Expression):
+            expression = expression.compile(self)
+        return self.krpc.add_event(expression)
+
+    def batch(self):
+        """ Create a batch of remote procedure calls, that are sent to
+            the server in a single request. Can be used in a 'with'
+            statement, which executes the batch at the end of the block. """
+        return Batch(self)
+
+    def call_many(self, calls):
+        """ Execute several remote procedure calls in a single request.
+            calls is a sequence of tuples of the form (func, arg1, arg2...)
+            Returns a list of results. If any of the calls raised an
+            exception, the exception for the first of them is re-raised. """
+        batch = Batch(self)
+        for call in calls:
+            batch.add(*call)
+        return [future.result() for future in batch.execute()]
+
+    def call_array(self, call, out=None):
+        """ Execute a remote procedure call, and decode its result into a
+            NumPy array. call is a tuple of the form (func, arg1, arg2...),
+            as for call_many. The result must be a list or tuple of doubles
+            or floats, or a list or tuple of such tuples. If out is a NumPy
+            array, the result is decoded into it, and the array is returned.
+            For lists, out can have more rows than the list has items, in
+            which case a view of the rows that were written is returned.
+            Requires NumPy. """
+        request, decode = self._array_request(call)
+        response = self._send_request(request)
+        # Check for errors
+        self._process_response(response, None)
+        return decode(response.results[0].value, out)
+
+    def _array_request(self, call):
+        """ Get the request message for call_array, and the function
+            that decodes its result into a NumPy array """
+        func, args = call[0], call[1:]
+        return_type = self._get_return_type(func, *args)
+        decode = return_type.array_decoder
+        if decode is None:
+            raise ValueError(
+                'Cannot decode values of type %s into NumPy arrays' %
+                return_type)
+        request = KRPC.Request()
+        request.calls.extend([self.get_call(func, *args)])
+        return request, decode
+
+    def lane(self, name):
+        """ Allows use of the with statement to send remote procedure
+            calls made by the calling thread over the named lane. Calls in
+            different lanes are sent over separate connections, so that a
+            slow call in one lane does not delay calls in another. """
+        return self._pool.lane(name)
+
+    @property
+    def lanes(self):
+        """ The names of the lanes that calls can be sent over """
+        return self._pool.lanes
+
     @property
     def stream_update_condition(self):
         """ Condition variable that is notified when
@@ -98,10 +291,73 @@ class Client(object):
             specifying the timeout in seconds for the operation. """
         self._stream_manager.wait_for_update(timeout)
 
-    def add_stream_update_callback(self, callback):
+    def fileno(self):
+        """ The file descriptor of the connection to the stream server.
+            Allows the client to be passed to select(), to wait until there
+            are stream updates to receive with poll_streams(). """
+        if self._stream_connection is None:
+            raise StreamError('Not connected to stream server')
+        return self._stream_connection.fileno()
+
+    def poll_streams(self):
+        """ Process the stream update messages that have been received,
+            without blocking. Can only be called when the client was created
+            without a stream update thread. Returns the number of messages
+            that were processed. """
+        return self.pump_streams(0)
+
+    def pump_streams(self, timeout=None):
+        """ Wait until a stream update message is received, or a timeout
+            occurs, then process all of the messages that have been received.
+            Can only be called when the client was created without a stream
+            update thread. Returns the number of messages that were processed.
+
+            When timeout is not None, it should be a floating point number
+            specifying the timeout in seconds for the operation. """
+        if self._stream_connection is None:
+            raise StreamError('Not connected to stream server')
+        return self._stream_manager.pump(timeout)
+
+    def wait_until(self, predicate, timeout=None):
+        """ Wait until predicate returns a true value, or a timeout occurs.
+            The streams that the predicate reads are recorded each time it
+            is called, and it is only called again when one of them is
+            updated. Returns the value of the predicate, which is false if
+            the timeout occurs.
+
+            When timeout is not None, it should be a floating point number
+            specifying the timeout in seconds for the operation. """
+        return self._stream_manager.wait_until([predicate], timeout)[1]
+
+    def wait_any(self, predicates, timeout=None):
+        """ Wait until one of the predicates returns a true value, or a
+            timeout occurs. Returns the index of the predicate, or None
+            if the timeout occurs. See wait_until. """
+        return self._stream_manager.wait_until(predicates, timeout)[0]
+
+    @property
+    def auto_streams(self):
+        """ The krpc.autostream.AutoStreams object that replaces frequent
+            calls to property getters with streams, or None if the client
+            was not created with auto_stream. Its promoted property lists
+            the calls that are currently served by streams. """
+        return self._auto_streams
+
+    @property
+    def cache(self):
+        """ The krpc.cache.ResultCache object that caches the results of
+            remote procedure calls, or None if the client was not created
+            with cache. """
+        return self._cache
+
+    def add_stream_update_callback(self, callback, policy=BLOCK,
+                                   queue_size=None):
         """ Add a callback that is invoked whenever
-            a stream update message has finished being processed. """
-        self._stream_manager.add_update_callback(callback)
+            a stream update message has finished being processed.
+            See Stream.add_callback for the meaning of policy and
+            queue_size. Returns a krpc.executor.Callback object. """
+        return self._stream_manager.add_update_callback(
+            callback, policy, queue_size)
 
     def remove_stream_update_callback(self, callback):
         """ Remove a stream update callback. """
@@ -142,6 +398,15 @@ class Client(object):
             # A class method
             return func._return_type
 
+    def _mutates(self, func, *args):
+        """ Whether a remote procedure call, given as for call_many,
+            must discard the cached results of other calls """
+        if self._cache is None:
+            return False
+        if func == getattr:
+            func = getattr(args[0].__class__, args[1]).fget
+        return self._cache.mutates(func._template)
+
     def _invoke(self, service, procedure, args,
                 param_names, param_types, return_type):
         """ Execute an RPC """
@@ -152,10 +417,103 @@ class Client(object):
         request = KRPC.Request()
         request.calls.extend([call])
 
-        # Send the request
-        with self._rpc_connection_lock:
-            self._rpc_connection.send_message(request)
-            response = self._rpc_connection.receive_message(KRPC.Response)
+        # Send the request and return the result
+        return self._process_response(
+            self._send_request(request, [return_type]), return_type)
+
+    def _invoke_template(self, template, args):
+        """ Execute an RPC, using a template compiled for the procedure """
+        if self._cache is not None:
+            return self._cache.invoke(template, args)
+        return self._invoke_template_uncached(template, args)
+
+    def _invoke_template_uncached(self, template, args):
+        """ Execute an RPC, without looking up its result in the cache """
+        if self._auto_streams is not None and template.getter:
+            return self._auto_streams.invoke(template, args)
+        return self._process_response(
+            self._send_request_data(
+                template.encode_request(args), template.primary),
+            template.return_type)
+
+    def _invoke_template_call(self, template, call):
+        """ Execute an RPC, given the encoded KRPC.ProcedureCall
+            message for a call to the template's procedure """
+        return self._process_response(
+            self._send_request_data(
+                template.encode_request_for(call), template.primary),
+            template.return_type)
+
+    def _invoke_many(self, calls, return_types, futures, mutates=False):
+        """ Execute multiple RPCs in a single request, and store their
+            results in the given futures. If mutates is true, some of the
+            calls change the state of the game, so cached results are
+            discarded before and after the request. """
+        cache = self._cache if mutates else None
+        if cache is not None:
+            cache.invalidate()
+        request = KRPC.Request()
+        request.calls.extend(calls)
+        try:
+            self._process_responses(
+                self._send_request(request, return_types),
+                return_types, futures)
+        finally:
+            if cache is not None:
+                cache.invalidate()
+
+    def _get_services(self, rpc_connection, schema_cache=None,
+                      definitions=None):
+        """ Get the encoded KRPC.Services message for the services provided
+            by the server, and the definitions containing their ids. Uses
+            the schema cache, if given, to avoid downloading the services,
+            and to store or load the ids. """
+        if schema_cache is None:
+            return self._get_services_data(), definitions
+        version = self._invoke('KRPC', 'GetStatus', [], [], [],
+                               self._types.status_type).version
+        key = (rpc_connection.address, rpc_connection.port, version)
+        if definitions is None:
+            definitions = schema_cache.load_definitions(*key)
+        else:
+            schema_cache.store_definitions(*(key + (definitions,)))
+        data = schema_cache.load(*key)
+        if data is not None:
+            return data, definitions
+        data = self._get_services_data()
+        schema_cache.store(*(key + (data,)))
+        return data, definitions
+
+    def _get_services_data(self):
+        """ Call KRPC.GetServices, and return the result without decoding
+            it, so that it only needs decoding if no other client in the
+            process is using the same services """
+        request = KRPC.Request()
+        request.calls.extend(
+            [self._build_call('KRPC', 'GetServices', [], [], [], None)])
+        response = self._send_request(request)
+        # Check for errors
+        self._process_response(response, None)
+        return response.results[0].value
+
+    def _add_services(self, services, names=None, docs=True,
+                      definitions=None):
+        """ Add services to the client, as attributes named using the
+            snake case service name. If names is not None, only the services
+            it names are added, along with the KRPC service. Names can be
+            given in camel case or snake case. If docs is false, the
+            services are created without docstrings. If definitions is not
+            None, calls are addressed using the ids it contains. """
+        for service in services:
+            name = snake_case(service.name)
+            if names is not None and service.name != 'KRPC' and \
+               service.name not in names and name not in names:
+                continue
+            ids = definitions.ids(service) if definitions else None
+            setattr(self, name, create_service(self, service, docs, ids))
+
+    def _process_response(self, response, return_type):
+        """ Get the result from a response to a single RPC """
 
         # Check for an error response
         if response.HasField('error'):
@@ -166,11 +524,54 @@ class Client(object):
             raise self._build_error(response.results[0].error)
 
         # Decode the response and return the (optional) result
-        result = None
-        if return_type is not None:
-            result = Decoder.decode(response.results[0].value, return_type)
-            if isinstance(result, KRPC.Event):
-                result = Event(self, result)
+        return self._decode_result(response.results[0].value, return_type)
+
+    def _process_responses(self, response, return_types, futures):
+        """ Store the results from a response to
+            multiple RPCs in the given futures """
+
+        # Check for an error response
+        if response.HasField('error'):
+            error = self._build_error(response.error)
+            for future in futures:
+                future.set_exception(error)
+            raise error
+
+        for result, return_type, future in zip(
+                response.results, return_types, futures):
+            if result.HasField('error'):
+                future.set_exception(self._build_error(result.error))
+            else:
+                future.set_result(
+                    self._decode_result(result.value, return_type))
+
+    def _send_request(self, request, return_types=()):
+        """ Send a request message and wait for the response. return_types
+            are the return types of the calls, if they are known. """
+        primary = any(call.service == 'KRPC' or
+                      call.service_id == KRPC_SERVICE_ID
+                      for call in request.calls) or \
+            any(creates_stream(typ) for typ in return_types)
+        return self._send_request_data(
+            Encoder.encode_message_with_size(request), primary)
+
+    def _send_request_data(self, data, primary=False):
+        """ Send an encoded request message, prepended with its size,
+            and wait for the response. If primary is true, the request
+            is sent over the primary connection. """
+        return self._pool.send(data, primary)
+
+    def _decode_result(self, value, return_type):
+        """ Decode the (optional) return value of a procedure """
+        if return_type is None:
+            return None
+        if self._options.numpy_arrays:
+            decode = return_type.array_decoder
+            if decode is not None:
+                return decode(value)
+        result = Decoder.decode(value, return_type)
+        if isinstance(result, KRPC.Event):
+            result = self._event_class(self, result)
         return result
 
     def _build_call(self, service, procedure, args,
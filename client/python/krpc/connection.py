@@ -2,20 +2,48 @@ import socket
 import select
 from krpc.encoder import Encoder
 from krpc.decoder import Decoder
+from krpc.error import EncodingError
+
+# Initial size of the receive buffer, in bytes. The buffer grows
+# when a message is received that does not fit into it.
+DEFAULT_BUFFER_SIZE = 65536
 
 
 class Connection(object):
-    def __init__(self, address, port):
+    def __init__(self, address, port, buffer_size=DEFAULT_BUFFER_SIZE):
         self._address = address
         self._port = port
         self._socket = None
+        # Received data is stored in _buffer[_start:_end]
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+
+    @property
+    def address(self):
+        return self._address
+
+    @property
+    def port(self):
+        return self._port
 
     def connect(self):
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._socket.connect((self._address, self._port))
 
+    def fileno(self):
+        """ The file descriptor of the socket """
+        return self._socket.fileno()
+
     def close(self):
         if self._socket is not None:
+            # Shut down the socket first, to wake up
+            # any threads blocked on receiving from it
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
             self._socket.close()
 
     def __del__(self):
@@ -27,20 +55,32 @@ class Connection(object):
 
     def receive_message(self, typ):
         """ Receive a protobuf message and decode it """
+        return Decoder.decode_message(self.receive_frame(), typ)
 
-        # Read the size and position of the response message
-        data = b''
-        while True:
-            try:
-                data += self.partial_receive(1)
-                size = Decoder.decode_message_size(data)
-                break
-            except IndexError:
-                pass
+    def receive_message_into(self, message, timeout=None):
+        """ Receive a protobuf message and decode it into the given message
+            object, replacing its contents. Returns the encoded message, or
+            None if timeout is not None and no message arrived within
+            timeout seconds. """
+        data = self.receive_frame(timeout)
+        if data is not None:
+            message.ParseFromString(data)
+        return data
 
-        # Read and decode the response message
-        data = self.receive(size)
-        return Decoder.decode_message(data, typ)
+    def receive_frame(self, timeout=None):
+        """ Receive the data for a size-prefixed message, without the size.
+            Multiple messages can be read from the socket in one go, and
+            are returned from subsequent calls without touching the socket.
+
+            When timeout is not None, returns None if no data arrives
+            within timeout seconds. """
+        while True:
+            data = self._next_frame()
+            if data is not None:
+                return data
+            if timeout is not None and not self._poll(timeout):
+                return None
+            self._fill()
 
     def send(self, data):
         """ Send data to the connection.
@@ -58,22 +98,87 @@ class Connection(object):
         if length == 0:
             return b''
         assert length > 0
-        data = b''
-        while len(data) < length:
-            remaining = length - len(data)
-            result = self._socket.recv(min(4096, remaining))
-            if not result:
-                raise socket.error("Connection closed")
-            data += result
-        return data
+        while self._end - self._start < length:
+            self._fill()
+        return self._consume(length)
 
     def partial_receive(self, length, timeout=0.01):
         """ Receive up to length bytes of data from the connection. """
         assert length > 0
+        if self._start < self._end:
+            return self._consume(min(length, self._end - self._start))
+        if self._poll(timeout):
+            return self._socket.recv(length)
+        return b''
+
+    def _poll(self, timeout):
+        """ Wait until the socket has data to read or a timeout occurs.
+            Returns true if the socket is readable. """
         try:
             ready = select.select([self._socket], [], [], timeout)
         except ValueError:
             raise socket.error("Connection closed")
-        if ready[0]:
-            return self._socket.recv(length)
-        return b''
+        return bool(ready[0])
+
+    def _fill(self):
+        """ Read as much data from the socket as will fit into the
+            buffer. Blocks until at least one byte has been read. """
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif self._end == len(self._buffer):
+            pending = self._end - self._start
+            if self._start > 0:
+                # Move pending data to the start of the buffer
+                self._buffer[:pending] = self._buffer[self._start:self._end]
+            else:
+                # Buffer is full of pending data, so increase its size
+                buf = bytearray(2 * len(self._buffer))
+                buf[:pending] = self._buffer
+                self._buffer = buf
+                self._view = memoryview(buf)
+            self._start = 0
+            self._end = pending
+        received = self._socket.recv_into(self._view[self._end:])
+        if not received:
+            raise socket.error("Connection closed")
+        self._end += received
+
+    def _consume(self, length):
+        """ Remove length bytes from the start of the buffer
+            and return them """
+        data = self._view[self._start:self._start + length].tobytes()
+        self._start += length
+        return data
+
+    def _next_frame(self):
+        """ Return the data for the next size-prefixed message in the
+            buffer, or None if the buffer does not contain it all yet """
+        bounds = frame_bounds(self._buffer, self._start, self._end)
+        if bounds is None:
+            return None
+        self._start = bounds[0]
+        return self._consume(bounds[1] - bounds[0])
+
+
+def frame_bounds(buffer, start, end):
+    """ Find the data for the size-prefixed message that starts at
+        buffer[start]. Returns the positions of the start and end of the
+        data, without the size, or None if buffer[start:end] does not
+        contain all of it yet. """
+    size = 0
+    shift = 0
+    pos = start
+    while True:
+        if pos == end:
+            return None
+        byte = buffer[pos]
+        pos += 1
+        size |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+        if shift >= 64:
+            raise EncodingError('Too many bytes when decoding varint')
+    if end - pos < size:
+        return None
+    return pos, pos + size
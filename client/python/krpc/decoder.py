@@ -1,4 +1,5 @@
 # pylint: disable=import-error,no-name-in-module
+import struct
 from google.protobuf.internal import decoder as protobuf_decoder
 # pylint: disable=import-error,no-name-in-module
 from google.protobuf.internal import wire_format as protobuf_wire_format
@@ -6,7 +7,7 @@ from krpc.error import EncodingError
 import krpc.platform
 from krpc.platform import hexlify
 from krpc.types import \
-    Types, ValueType, ClassType, EnumerationType, MessageType, TupleType, \
+    ValueType, ClassType, EnumerationType, MessageType, TupleType, \
     ListType, SetType, DictionaryType
 import krpc.schema.KRPC_pb2 as KRPC
 
@@ -17,8 +18,6 @@ class Decoder(object):
 
     GUID_LENGTH = 16
 
-    _types = Types()
-
     @classmethod
     def guid(cls, data):
         """ Decode a 16-byte GUID into a string """
@@ -29,43 +28,40 @@ class Decoder(object):
     @classmethod
     def decode(cls, data, typ):
         """ Given a python type, and serialized data, decode the value """
+        return typ.decoder(data)
+
+    @classmethod
+    def compile(cls, typ):
+        """ Build a function that decodes values of the given type. The
+            functions for the element types of a collection type are
+            called directly, without inspecting the types again. """
         if isinstance(typ, MessageType):
-            return cls.decode_message(data, typ.python_type)
+            python_type = typ.python_type
+            return lambda data: cls.decode_message(data, python_type)
         elif isinstance(typ, EnumerationType):
-            value = cls._decode_value(data, cls._types.sint32_type)
-            return typ.python_type(value)
+            decode_sint32 = _ValueDecoder.decode_sint32
+            # The python type of an enumeration is set after it is created
+            return lambda data: typ.python_type(decode_sint32(data))
         elif isinstance(typ, ValueType):
-            return cls._decode_value(data, typ)
+            return cls._value_decoder(typ.protobuf_type.code)
         elif isinstance(typ, ClassType):
-            object_id_typ = cls._types.uint64_type
-            object_id = cls._decode_value(data, object_id_typ)
-            return typ.python_type(object_id) if object_id != 0 else None
+            return _object_decoder(typ.python_type)
         elif isinstance(typ, ListType):
-            if data == b'\x00':
-                return None
-            msg = cls.decode_message(data, KRPC.List)
-            return [cls.decode(item, typ.value_type) for item in msg.items]
-        elif isinstance(typ, DictionaryType):
-            if data == b'\x00':
-                return None
-            msg = cls.decode_message(data, KRPC.Dictionary)
-            return dict((cls.decode(entry.key, typ.key_type),
-                         cls.decode(entry.value, typ.value_type))
-                        for entry in msg.entries)
+            return _collection_decoder(
+                KRPC.List, list, typ.value_type.decoder,
+                _fixed_width_format(typ.value_type))
         elif isinstance(typ, SetType):
-            if data == b'\x00':
-                return None
-            msg = cls.decode_message(data, KRPC.Set)
-            return set(cls.decode(item, typ.value_type) for item in msg.items)
+            return _collection_decoder(
+                KRPC.Set, set, typ.value_type.decoder)
+        elif isinstance(typ, DictionaryType):
+            return _dictionary_decoder(
+                typ.key_type.decoder, typ.value_type.decoder)
         elif isinstance(typ, TupleType):
-            if data == b'\x00':
-                return None
-            msg = cls.decode_message(data, KRPC.Tuple)
-            return tuple(cls.decode(item, value_type)
-                         for item, value_type
-                         in zip(msg.items, typ.value_types))
+            return _tuple_decoder(typ.value_types)
         else:
-            raise EncodingError('Cannot decode type %s' % str(typ))
+            def decode_invalid(data):  # pylint: disable=unused-argument
+                raise EncodingError('Cannot decode type %s' % str(typ))
+            return decode_invalid
 
     @classmethod
     def decode_message_size(cls, data):
@@ -78,29 +74,113 @@ class Decoder(object):
         return message
 
     @classmethod
-    def _decode_value(cls, data, typ):
-        if typ.protobuf_type.code == KRPC.Type.SINT32:
-            return _ValueDecoder.decode_sint32(data)
-        elif typ.protobuf_type.code == KRPC.Type.SINT64:
-            return _ValueDecoder.decode_sint64(data)
-        elif typ.protobuf_type.code == KRPC.Type.UINT32:
-            return _ValueDecoder.decode_uint32(data)
-        elif typ.protobuf_type.code == KRPC.Type.UINT64:
-            return _ValueDecoder.decode_uint64(data)
-        elif typ.protobuf_type.code == KRPC.Type.DOUBLE:
-            return _ValueDecoder.decode_double(data)
-        elif typ.protobuf_type.code == KRPC.Type.FLOAT:
-            return _ValueDecoder.decode_float(data)
-        elif typ.protobuf_type.code == KRPC.Type.BOOL:
-            return _ValueDecoder.decode_bool(data)
-        elif typ.protobuf_type.code == KRPC.Type.STRING:
-            return _ValueDecoder.decode_string(data)
-        elif typ.protobuf_type.code == KRPC.Type.BYTES:
-            return _ValueDecoder.decode_bytes(data)
+    def _value_decoder(cls, code):
+        if code == KRPC.Type.SINT32:
+            return _ValueDecoder.decode_sint32
+        elif code == KRPC.Type.SINT64:
+            return _ValueDecoder.decode_sint64
+        elif code == KRPC.Type.UINT32:
+            return _ValueDecoder.decode_uint32
+        elif code == KRPC.Type.UINT64:
+            return _ValueDecoder.decode_uint64
+        elif code == KRPC.Type.DOUBLE:
+            return _ValueDecoder.decode_double
+        elif code == KRPC.Type.FLOAT:
+            return _ValueDecoder.decode_float
+        elif code == KRPC.Type.BOOL:
+            return _ValueDecoder.decode_bool
+        elif code == KRPC.Type.STRING:
+            return _ValueDecoder.decode_string
+        elif code == KRPC.Type.BYTES:
+            return _ValueDecoder.decode_bytes
         else:
             raise EncodingError('Invalid type')
 
 
+def _object_decoder(python_type):
+    decode_varint = _ValueDecoder.decode_uint64
+
+    def decode(data):
+        object_id = decode_varint(data)
+        return python_type(object_id) if object_id != 0 else None
+    return decode
+
+
+# Struct formats for the items of a collection message, for value types
+# with a fixed size. Each item is preceded by a two byte header: the field
+# tag (field 1, length delimited) and the size of the value.
+_FIXED_WIDTH_FORMATS = {
+    KRPC.Type.DOUBLE: (b'\x08', 'xxd', 10),
+    KRPC.Type.FLOAT: (b'\x04', 'xxf', 6)
+}
+
+
+def _fixed_width_format(typ):
+    if not isinstance(typ, ValueType):
+        return None
+    return _FIXED_WIDTH_FORMATS.get(typ.protobuf_type.code)
+
+
+def _unpack_fixed_width(data, fixed_width, count=None):
+    """ Decode the items of a collection message containing fixed size
+        values, using a single call to struct.unpack. Returns None if
+        the data is not laid out as expected. """
+    size, fmt, stride = fixed_width
+    if len(data) % stride != 0:
+        return None
+    if count is None:
+        count = len(data) // stride
+    elif len(data) != count * stride:
+        return None
+    if data[0::stride] != b'\x0a' * count or \
+       data[1::stride] != size * count:
+        return None
+    return struct.unpack('<' + fmt * count, data)
+
+
+def _collection_decoder(message_type, python_type,
+                        decode_item, fixed_width=None):
+    def decode(data):
+        if data == b'\x00':
+            return None
+        if fixed_width is not None:
+            values = _unpack_fixed_width(data, fixed_width)
+            if values is not None:
+                return python_type(values)
+        msg = Decoder.decode_message(data, message_type)
+        return python_type(decode_item(item) for item in msg.items)
+    return decode
+
+
+def _tuple_decoder(value_types):
+    decoders = [t.decoder for t in value_types]
+    fixed_width = _fixed_width_format(value_types[0])
+    if any(_fixed_width_format(t) != fixed_width for t in value_types):
+        fixed_width = None
+
+    def decode(data):
+        if data == b'\x00':
+            return None
+        if fixed_width is not None:
+            values = _unpack_fixed_width(data, fixed_width, len(decoders))
+            if values is not None:
+                return values
+        msg = Decoder.decode_message(data, KRPC.Tuple)
+        return tuple(decode_item(item)
+                     for item, decode_item in zip(msg.items, decoders))
+    return decode
+
+
+def _dictionary_decoder(decode_key, decode_value):
+    def decode(data):
+        if data == b'\x00':
+            return None
+        msg = Decoder.decode_message(data, KRPC.Dictionary)
+        return dict((decode_key(entry.key), decode_value(entry.value))
+                    for entry in msg.entries)
+    return decode
+
+
 class _ValueDecoder(object):
     """ Routines for encoding values from
         the protocol buffer serialization format """
@@ -138,7 +218,6 @@ class _ValueDecoder(object):
 
     @classmethod
     def decode_double(cls, data):
-        import struct
         local_unpack = struct.unpack
 
         # We expect a 64-bit value in little-endian byte order.  Bit 1 is the
@@ -161,7 +240,6 @@ class _ValueDecoder(object):
 
     @classmethod
     def decode_float(cls, data):
-        import struct
         local_unpack = struct.unpack
 
         # We expect a 32-bit value in little-endian byte order.  Bit 1 is the
@@ -0,0 +1,145 @@
+import hashlib
+import io
+import json
+import os
+import krpc.schema.KRPC_pb2 as KRPC
+
+
+class Definitions(object):
+    """ The numeric ids of services and their procedures, loaded from
+        service definition files generated by krpc-servicedefs.
+
+        Calls to a procedure with a known id are addressed using the ids of
+        the service and procedure instead of their names, which makes the
+        encoded calls smaller. The ids for a service are only used if the
+        definitions contain the same procedures as the service provided by
+        the server, in the same order, and with the same parameter and
+        return types. Otherwise the definitions are assumed to be for a
+        different version of the service, and names are used. Definitions
+        without parameter and return types are only checked against the
+        names and order of the procedures. """
+
+    def __init__(self, defs=None):
+        # Map from service name to the id of the service, a map from
+        # procedure name to procedure id, and the fingerprint of the
+        # procedures' signatures or None if they are not known
+        self._services = {}
+        if defs is not None:
+            self.add(defs)
+
+    @classmethod
+    def load(cls, paths):
+        """ Load definitions from a JSON file, or all the JSON files in a
+            directory. paths can also be a list of files and directories. """
+        if not isinstance(paths, (list, tuple)):
+            paths = [paths]
+        definitions = cls()
+        for path in paths:
+            if os.path.isdir(path):
+                filenames = sorted(
+                    os.path.join(path, x) for x in os.listdir(path)
+                    if x.endswith('.json'))
+            else:
+                filenames = [path]
+            for filename in filenames:
+                with io.open(filename, 'r', encoding='utf-8') as handle:
+                    definitions.add(json.load(handle))
+        return definitions
+
+    def add(self, defs):
+        """ Add the ids from a dictionary of service definitions,
+            in the format generated by krpc-servicedefs """
+        for name, service in defs.items():
+            procedures = service.get('procedures', {})
+            procedure_ids = dict(
+                (str(procedure_name), int(procedure['id']))
+                for procedure_name, procedure in procedures.items())
+            fingerprint = service.get('fingerprint')
+            if fingerprint is None and all(
+                    'parameters' in x for x in procedures.values()):
+                fingerprint = _fingerprint(
+                    _json_signature(procedure_name, procedure)
+                    for procedure_name, procedure in sorted(
+                        procedures.items(), key=lambda x: int(x[1]['id'])))
+            self._services[str(name)] = (
+                int(service['id']), procedure_ids, fingerprint)
+
+    @property
+    def services(self):
+        """ The names of the services that there are definitions for """
+        return sorted(self._services.keys())
+
+    def ids(self, service):
+        """ Get the ids for a service, given its KRPC.Service message.
+            Returns a tuple containing the id of the service and a
+            dictionary mapping procedure names to ids, or None if there
+            are no matching definitions for the service. """
+        if service.name not in self._services:
+            return None
+        service_id, procedure_ids, fingerprint = \
+            self._services[service.name]
+        # The server lists the procedures in the order of their ids
+        names = [procedure.name for procedure in service.procedures]
+        if service_id == 0 or \
+           names != sorted(procedure_ids, key=procedure_ids.get):
+            return None
+        if fingerprint is not None and fingerprint != _fingerprint(
+                _protobuf_signature(x) for x in service.procedures):
+            return None
+        return service_id, procedure_ids
+
+    def to_json(self):
+        """ Get the ids as a dictionary of service definitions,
+            that can be passed to add() """
+        defs = {}
+        for name, (service_id, procedures, fingerprint) in \
+                self._services.items():
+            defs[name] = {
+                'id': service_id,
+                'procedures': dict(
+                    (procedure_name, {'id': procedure_id})
+                    for procedure_name, procedure_id in procedures.items())
+            }
+            if fingerprint is not None:
+                defs[name]['fingerprint'] = fingerprint
+        return defs
+
+
+def _fingerprint(signatures):
+    """ Get the fingerprint of a sequence of procedure signatures """
+    return hashlib.sha1(
+        '\n'.join(signatures).encode('utf-8')).hexdigest()
+
+
+def _json_signature(name, procedure):
+    """ Get the signature of a procedure from a service definition """
+    return '%s(%s)%s' % (
+        name, ','.join('%s:%s' % (x['name'], _json_type(x['type']))
+                       for x in procedure['parameters']),
+        _json_type(procedure.get('return_type')))
+
+
+def _json_type(typ):
+    """ Get the signature of a type from a service definition """
+    if typ is None:
+        return ''
+    return '%s(%s.%s)[%s]' % (
+        typ['code'], typ.get('service', ''), typ.get('name', ''),
+        ','.join(_json_type(x) for x in typ.get('types', [])))
+
+
+def _protobuf_signature(procedure):
+    """ Get the signature of a procedure from a KRPC.Procedure message """
+    return '%s(%s)%s' % (
+        procedure.name, ','.join('%s:%s' % (x.name, _protobuf_type(x.type))
+                                 for x in procedure.parameters),
+        _protobuf_type(procedure.return_type))
+
+
+def _protobuf_type(typ):
+    """ Get the signature of a type from a KRPC.Type message """
+    if typ.code == KRPC.Type.NONE:
+        return ''
+    return '%s(%s.%s)[%s]' % (
+        KRPC.Type.TypeCode.Name(typ.code), typ.service, typ.name,
+        ','.join(_protobuf_type(x) for x in typ.types))
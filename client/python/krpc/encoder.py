@@ -1,43 +1,30 @@
 # pylint: disable=import-error,no-name-in-module
+import struct
 import google.protobuf
 from google.protobuf.internal import encoder as protobuf_encoder
 # pylint: disable=import-error,no-name-in-module
 from google.protobuf.internal import wire_format as protobuf_wire_format
 from krpc.error import EncodingError
-from krpc.platform import bytelength
 import krpc.schema.KRPC_pb2 as KRPC
 from krpc.types import \
-    Types, ValueType, ClassType, EnumerationType, MessageType, TupleType, \
+    ValueType, ClassType, EnumerationType, MessageType, TupleType, \
     ListType, SetType, DictionaryType
 
 
 # The following unpacks the internal protobuf decoders, whose signature
 # depends on the version of protobuf installed
 # pylint: disable=invalid-name
-_pb_VarintEncoder = protobuf_encoder._VarintEncoder()
-_pb_SignedVarintEncoder = protobuf_encoder._SignedVarintEncoder()
-_pb_DoubleEncoder = protobuf_encoder.DoubleEncoder(1, False, False)
 _pb_FloatEncoder = protobuf_encoder.FloatEncoder(1, False, False)
 _pb_version = google.protobuf.__version__.split('.')
 if int(_pb_version[0]) >= 3 and int(_pb_version[1]) >= 4:
     # protobuf v3.4.0 and above
-    def _VarintEncoder(write, value):
-        return _pb_VarintEncoder(write, value, True)
-
-    def _SignedVarintEncoder(write, value):
-        return _pb_SignedVarintEncoder(write, value, True)
-
-    def _DoubleEncoder(write, value):
-        return _pb_DoubleEncoder(write, value, True)
-
     def _FloatEncoder(write, value):
         return _pb_FloatEncoder(write, value, True)
 else:
     # protobuf v3.3.0 and below
-    _VarintEncoder = _pb_VarintEncoder
-    _SignedVarintEncoder = _pb_SignedVarintEncoder
-    _DoubleEncoder = _pb_DoubleEncoder
     _FloatEncoder = _pb_FloatEncoder
+_VarintBytes = protobuf_encoder._VarintBytes
+_pack_double = struct.Struct('<d').pack
 # pylint: enable=invalid-name
 
 
@@ -45,50 +32,10 @@ class Encoder(object):
     """ Routines for encoding messages and values in
         the protocol buffer serialization format """
 
-    _types = Types()
-
     @classmethod
     def encode(cls, x, typ):
         """ Encode a message or value of the given protocol buffer type """
-        if isinstance(typ, MessageType):
-            return x.SerializeToString()
-        elif isinstance(typ, ValueType):
-            return cls._encode_value(x, typ)
-        elif isinstance(typ, EnumerationType):
-            return cls._encode_value(x.value, cls._types.sint32_type)
-        elif isinstance(typ, ClassType):
-            object_id = x._object_id if x is not None else 0
-            return cls._encode_value(object_id, cls._types.uint64_type)
-        elif isinstance(typ, ListType):
-            msg = KRPC.List()
-            msg.items.extend(cls.encode(item, typ.value_type) for item in x)
-            return msg.SerializeToString()
-        elif isinstance(typ, DictionaryType):
-            msg = KRPC.Dictionary()
-            entries = []
-            for key, value in sorted(x.items(), key=lambda i: i[0]):
-                entry = KRPC.DictionaryEntry()
-                entry.key = cls.encode(key, typ.key_type)
-                entry.value = cls.encode(value, typ.value_type)
-                entries.append(entry)
-            msg.entries.extend(entries)
-            return msg.SerializeToString()
-        elif isinstance(typ, SetType):
-            msg = KRPC.Set()
-            msg.items.extend(cls.encode(item, typ.value_type) for item in x)
-            return msg.SerializeToString()
-        elif isinstance(typ, TupleType):
-            msg = KRPC.Tuple()
-            if len(x) != len(typ.value_types):
-                raise EncodingError(
-                    'Tuple has wrong number of elements. ' +
-                    'Expected %d, got %d.' % (len(typ.value_types), len(x)))
-            msg.items.extend(cls.encode(item, value_type)
-                             for item, value_type in zip(x, typ.value_types))
-            return msg.SerializeToString()
-        else:
-            raise EncodingError(
-                'Cannot encode objects of type ' + str(type(x)))
+        return typ.encoder(x)
 
     @classmethod
     def encode_message_with_size(cls, message):
@@ -98,42 +45,111 @@ class Encoder(object):
         return size + data
 
     @classmethod
-    def _encode_value(cls, value, typ):
-        if typ.protobuf_type.code == KRPC.Type.SINT32:
-            return _ValueEncoder.encode_sint32(value)
-        elif typ.protobuf_type.code == KRPC.Type.SINT64:
-            return _ValueEncoder.encode_sint64(value)
-        elif typ.protobuf_type.code == KRPC.Type.UINT32:
-            return _ValueEncoder.encode_uint32(value)
-        elif typ.protobuf_type.code == KRPC.Type.UINT64:
-            return _ValueEncoder.encode_uint64(value)
-        elif typ.protobuf_type.code == KRPC.Type.DOUBLE:
-            return _ValueEncoder.encode_double(value)
-        elif typ.protobuf_type.code == KRPC.Type.FLOAT:
-            return _ValueEncoder.encode_float(value)
-        elif typ.protobuf_type.code == KRPC.Type.BOOL:
-            return _ValueEncoder.encode_bool(value)
-        elif typ.protobuf_type.code == KRPC.Type.STRING:
-            return _ValueEncoder.encode_string(value)
-        elif typ.protobuf_type.code == KRPC.Type.BYTES:
-            return _ValueEncoder.encode_bytes(value)
+    def compile(cls, typ):
+        """ Build a function that encodes values of the given type. The
+            functions for the element types of a collection type are
+            called directly, without inspecting the types again. """
+        if isinstance(typ, MessageType):
+            return _encode_message
+        elif isinstance(typ, ValueType):
+            return cls._value_encoder(typ.protobuf_type.code)
+        elif isinstance(typ, EnumerationType):
+            encode_sint32 = _ValueEncoder.encode_sint32
+            return lambda x: encode_sint32(x.value)
+        elif isinstance(typ, ClassType):
+            return _encode_object
+        elif isinstance(typ, (ListType, SetType)):
+            encode_item = typ.value_type.encoder
+            return lambda x: _encode_items([encode_item(item) for item in x])
+        elif isinstance(typ, DictionaryType):
+            return _dictionary_encoder(
+                typ.key_type.encoder, typ.value_type.encoder)
+        elif isinstance(typ, TupleType):
+            return _tuple_encoder([t.encoder for t in typ.value_types])
+        else:
+            def encode_invalid(x):
+                raise EncodingError(
+                    'Cannot encode objects of type ' + str(type(x)))
+            return encode_invalid
+
+    @classmethod
+    def _value_encoder(cls, code):
+        if code == KRPC.Type.SINT32:
+            return _ValueEncoder.encode_sint32
+        elif code == KRPC.Type.SINT64:
+            return _ValueEncoder.encode_sint64
+        elif code == KRPC.Type.UINT32:
+            return _ValueEncoder.encode_uint32
+        elif code == KRPC.Type.UINT64:
+            return _ValueEncoder.encode_uint64
+        elif code == KRPC.Type.DOUBLE:
+            return _ValueEncoder.encode_double
+        elif code == KRPC.Type.FLOAT:
+            return _ValueEncoder.encode_float
+        elif code == KRPC.Type.BOOL:
+            return _ValueEncoder.encode_bool
+        elif code == KRPC.Type.STRING:
+            return _ValueEncoder.encode_string
+        elif code == KRPC.Type.BYTES:
+            return _ValueEncoder.encode_bytes
         else:
             raise EncodingError('Invalid type')
 
 
+def _encode_message(x):
+    return x.SerializeToString()
+
+
+def _encode_object(x):
+    return _VarintBytes(x._object_id if x is not None else 0)
+
+
+def _encode_items(items):
+    """ Encode the items field of a KRPC.List, KRPC.Set or KRPC.Tuple """
+    # Field 1, length delimited
+    return b''.join(b'\x0a' + _VarintBytes(len(item)) + item
+                    for item in items)
+
+
+def _tuple_encoder(encoders):
+    size = len(encoders)
+
+    def encode(x):
+        if len(x) != size:
+            raise EncodingError(
+                'Tuple has wrong number of elements. ' +
+                'Expected %d, got %d.' % (size, len(x)))
+        return _encode_items(
+            [encode_item(item) for encode_item, item in zip(encoders, x)])
+    return encode
+
+
+def _dictionary_encoder(encode_key, encode_value):
+    def encode_entry(key, value):
+        # Fields 1 and 2 of a KRPC.DictionaryEntry, omitted when empty
+        key = encode_key(key)
+        value = encode_value(value)
+        entry = []
+        if key:
+            entry.append(b'\x0a' + _VarintBytes(len(key)) + key)
+        if value:
+            entry.append(b'\x12' + _VarintBytes(len(value)) + value)
+        return b''.join(entry)
+
+    def encode(x):
+        return _encode_items(
+            [encode_entry(key, value)
+             for key, value in sorted(x.items(), key=lambda i: i[0])])
+    return encode
+
+
 class _ValueEncoder(object):
     """ Routines for encoding values in the
         protocol buffer serialization format """
 
     @classmethod
     def encode_double(cls, value):
-        data = []
-
-        def write(x):
-            data.append(x)
-
-        _DoubleEncoder(write, value)
-        return b''.join(data[1:])  # strips the tag value
+        return _pack_double(value)
 
     @classmethod
     def encode_float(cls, value):
@@ -147,20 +163,11 @@ class _ValueEncoder(object):
 
     @classmethod
     def _encode_varint(cls, value):
-        data = []
-
-        def write(x):
-            data.append(x)
-
-        _VarintEncoder(write, value)
-        return b''.join(data)
+        return _VarintBytes(value)
 
     @classmethod
     def _encode_signed_varint(cls, value):
-        value = protobuf_wire_format.ZigZagEncode(value)
-        data = []
-        _SignedVarintEncoder(data.append, value)
-        return b''.join(data)
+        return _VarintBytes(protobuf_wire_format.ZigZagEncode(value))
 
     @classmethod
     def encode_sint32(cls, value):
@@ -188,10 +195,9 @@ class _ValueEncoder(object):
 
     @classmethod
     def encode_string(cls, value):
-        size = cls._encode_varint(bytelength(value))
         data = value.encode('utf-8')
-        return size + data
+        return _VarintBytes(len(data)) + data
 
     @classmethod
     def encode_bytes(cls, value):
-        return b''.join([cls._encode_varint(len(value)), value])
+        return _VarintBytes(len(value)) + value
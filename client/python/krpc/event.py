@@ -1,10 +1,15 @@
+from krpc.executor import BLOCK
 from krpc.stream import Stream
 
 
 class Event(object):
     """ An event. """
+
+    # Class of the underlying stream
+    _stream_class = Stream
+
     def __init__(self, conn, event):
-        self._stream = Stream.from_stream_id(
+        self._stream = self._stream_class.from_stream_id(
             conn, event.stream.id, conn._types.bool_type)
         self._conn = conn
         self._callback_mapping = {}
@@ -34,12 +39,12 @@ class Event(object):
                 # Value did not change, must have timed out
                 return
 
-    def add_callback(self, callback):
+    def add_callback(self, callback, policy=BLOCK, queue_size=None):
         def callback_wrapper(x):
             if x:
                 callback()
         self._callback_mapping[callback] = callback_wrapper
-        self._stream.add_callback(callback_wrapper)
+        return self._stream.add_callback(callback_wrapper, policy, queue_size)
 
     def remove_callback(self, callback):
         if callback in self._callback_mapping:
@@ -0,0 +1,161 @@
+import collections
+import threading
+import traceback
+
+# Policies for a callback whose queue of pending calls is full
+# Only the most recent call is kept. The queue size is always 1.
+LATEST = 'latest'
+# The oldest pending call is discarded to make room for the new call
+DROP_OLDEST = 'drop_oldest'
+# The stream update thread waits until there is room for the new call
+BLOCK = 'block'
+POLICIES = (LATEST, DROP_OLDEST, BLOCK)
+# The queue size used by the drop_oldest and block policies when none is
+# given, so that a slow callback cannot collect an unbounded backlog
+DEFAULT_QUEUE_SIZE = 100
+
+
+class CallbackExecutor(object):
+    """ Runs functions on a pool of daemon threads. Has the same submit()
+        and shutdown() methods as a concurrent.futures.Executor, so that
+        either can be used to run stream callbacks. """
+
+    def __init__(self, threads=1):
+        if threads < 1:
+            raise ValueError('An executor needs at least one thread')
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._threads = []
+        for _ in range(threads):
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args):
+        """ Run fn(*args) on one of the threads """
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('Executor has been shut down')
+            self._queue.append((fn, args))
+            self._condition.notify()
+
+    def shutdown(self, wait=True):
+        """ Stop the threads, after they have run the functions that
+            have already been submitted. If wait is true, blocks until
+            the threads have stopped. """
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._shutdown:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                fn, args = self._queue.popleft()
+            try:
+                fn(*args)
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc()
+
+
+class Callback(object):
+    """ A callback for a stream, with a queue of calls waiting to be run by
+        an executor. Calls for the same callback are run one at a time, in
+        the order the updates were received. When the queue is full, the
+        policy decides what happens to a new call. If queue_size is None,
+        the queue holds at most DEFAULT_QUEUE_SIZE calls. """
+
+    def __init__(self, executor, callback, policy=BLOCK, queue_size=None):
+        if policy not in POLICIES:
+            raise ValueError('Invalid callback policy \'%s\'' % policy)
+        if policy == LATEST:
+            queue_size = 1
+        elif queue_size is None:
+            queue_size = DEFAULT_QUEUE_SIZE
+        elif queue_size < 1:
+            raise ValueError('Callback queue size must be at least 1')
+        self._executor = executor
+        self._callback = callback
+        self._policy = policy
+        self._queue_size = queue_size
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+        self._scheduled = False
+        self._dropped = 0
+
+    @property
+    def callback(self):
+        """ The function that is called """
+        return self._callback
+
+    @property
+    def policy(self):
+        """ What happens to a new call when the queue is full """
+        return self._policy
+
+    @property
+    def queue_size(self):
+        """ The maximum number of pending calls """
+        return self._queue_size
+
+    @property
+    def pending(self):
+        """ The number of calls waiting to be run """
+        return len(self._queue)
+
+    @property
+    def dropped(self):
+        """ The number of calls that were discarded because
+            the queue was full """
+        return self._dropped
+
+    def __call__(self, *args):
+        """ Queue a call to the callback with the given arguments """
+        with self._condition:
+            while len(self._queue) >= self._queue_size:
+                if self._policy == BLOCK:
+                    self._condition.wait()
+                else:
+                    self._queue.popleft()
+                    self._dropped += 1
+            self._queue.append(args)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._executor.submit(self._run)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._queue:
+                    self._scheduled = False
+                    return
+                args = self._queue.popleft()
+                self._condition.notify_all()
+            try:
+                self._callback(*args)
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc()
+
+
+class _ImmediateExecutor(object):
+    """ Runs functions on the calling thread """
+
+    @staticmethod
+    def submit(fn, *args):
+        fn(*args)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+IMMEDIATE = _ImmediateExecutor()
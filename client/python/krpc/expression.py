@@ -0,0 +1,355 @@
+import itertools
+from krpc.types import ValueType
+import krpc.schema.KRPC_pb2 as KRPC
+
+# Names of the types that values in an expression can have, as passed to
+# the KRPC.Type constructors, and the protobuf type codes they correspond to
+TYPES = {
+    KRPC.Type.DOUBLE: 'double',
+    KRPC.Type.FLOAT: 'float',
+    KRPC.Type.SINT32: 'int',
+    KRPC.Type.BOOL: 'bool',
+    KRPC.Type.STRING: 'string'
+}
+_CONSTANTS = {
+    'double': 'constant_double',
+    'float': 'constant_float',
+    'int': 'constant_int',
+    'bool': 'constant_bool',
+    'string': 'constant_string'
+}
+
+# Operations whose result is a bool, and those whose result has the
+# same type as their first argument
+_BOOL_OPS = set([
+    'equal', 'not_equal', 'greater_than', 'greater_than_or_equal',
+    'less_than', 'less_than_or_equal', 'and_', 'or_', 'exclusive_or',
+    'not_', 'contains'])
+_SAME_TYPE_OPS = set([
+    'add', 'subtract', 'multiply', 'divide', 'modulo', 'power',
+    'left_shift', 'right_shift', 'sum', 'max', 'min'])
+
+# Used to give lambda parameters unique names
+_parameter_ids = itertools.count()
+
+
+def _type_name(typ):
+    """ Get the name of a type, given its name or a krpc.types type """
+    if typ is None or typ in _CONSTANTS:
+        return typ
+    if isinstance(typ, ValueType) and typ.protobuf_type.code in TYPES:
+        return TYPES[typ.protobuf_type.code]
+    raise ValueError('Expressions cannot contain values of type %s' % typ)
+
+
+class Expression(object):
+    """ An expression that is evaluated by the server. Expressions are built
+        from remote procedure calls and constants using Python operators,
+        and are sent to the server when they are used to create an event,
+        using Client.add_event.
+
+        The comparison operators build expressions rather than comparing
+        them, so expressions cannot be used as bools. Use &, | and ~ instead
+        of and, or and not. """
+
+    def __init__(self, op, args, typ=None):
+        self._op = op
+        self._args = args
+        self._type = typ
+
+    @classmethod
+    def call(cls, func, *args, **kwargs):
+        """ An expression that calls a remote procedure. Takes the same
+            arguments as Client.add_stream. As a shorthand for a property,
+            call(obj, 'name') is the same as call(getattr, obj, 'name'). """
+        if not callable(func):
+            args = (func,) + args
+            func = getattr
+        return cls('call', (func, args, kwargs))
+
+    @classmethod
+    def constant(cls, value, typ=None):
+        """ A constant value. typ is the name of the type of the value,
+            one of 'double', 'float', 'int', 'bool' or 'string'. If it is
+            None, the type is chosen when the expression is sent to the
+            server, to match the values the constant is combined with. """
+        return cls('constant', (value,), _type_name(typ))
+
+    @classmethod
+    def parameter(cls, name, typ):
+        """ A parameter of a function, for use in the
+            body of the function passed to select and where """
+        return cls('parameter', (name,), _type_name(typ))
+
+    @classmethod
+    def function(cls, parameters, body):
+        """ A function, with the given parameters and body """
+        return cls('function', (list(parameters), body))
+
+    # Comparison operators
+
+    def __eq__(self, other):
+        return Expression('equal', (self, other), 'bool')
+
+    def __ne__(self, other):
+        return Expression('not_equal', (self, other), 'bool')
+
+    def __gt__(self, other):
+        return Expression('greater_than', (self, other), 'bool')
+
+    def __ge__(self, other):
+        return Expression('greater_than_or_equal', (self, other), 'bool')
+
+    def __lt__(self, other):
+        return Expression('less_than', (self, other), 'bool')
+
+    def __le__(self, other):
+        return Expression('less_than_or_equal', (self, other), 'bool')
+
+    __hash__ = object.__hash__
+
+    def __bool__(self):
+        raise TypeError('Expressions cannot be used as bools. '
+                        'Use &, | and ~ instead of and, or and not.')
+
+    __nonzero__ = __bool__
+
+    # Logical operators
+
+    def __and__(self, other):
+        return Expression('and_', (self, other), 'bool')
+
+    def __rand__(self, other):
+        return Expression('and_', (other, self), 'bool')
+
+    def __or__(self, other):
+        return Expression('or_', (self, other), 'bool')
+
+    def __ror__(self, other):
+        return Expression('or_', (other, self), 'bool')
+
+    def __xor__(self, other):
+        return Expression('exclusive_or', (self, other), 'bool')
+
+    def __rxor__(self, other):
+        return Expression('exclusive_or', (other, self), 'bool')
+
+    def __invert__(self):
+        return Expression('not_', (self,), 'bool')
+
+    # Arithmetic operators
+
+    def __add__(self, other):
+        return Expression('add', (self, other))
+
+    def __radd__(self, other):
+        return Expression('add', (other, self))
+
+    def __sub__(self, other):
+        return Expression('subtract', (self, other))
+
+    def __rsub__(self, other):
+        return Expression('subtract', (other, self))
+
+    def __mul__(self, other):
+        return Expression('multiply', (self, other))
+
+    def __rmul__(self, other):
+        return Expression('multiply', (other, self))
+
+    def __truediv__(self, other):
+        return Expression('divide', (self, other))
+
+    def __rtruediv__(self, other):
+        return Expression('divide', (other, self))
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    def __mod__(self, other):
+        return Expression('modulo', (self, other))
+
+    def __rmod__(self, other):
+        return Expression('modulo', (other, self))
+
+    def __pow__(self, other):
+        return Expression('power', (self, other))
+
+    def __rpow__(self, other):
+        return Expression('power', (other, self))
+
+    def __lshift__(self, other):
+        return Expression('left_shift', (self, other))
+
+    def __rshift__(self, other):
+        return Expression('right_shift', (self, other))
+
+    def cast(self, typ):
+        """ Convert the value to the type with the given name """
+        typ = _type_name(typ)
+        return Expression('cast', (self, typ), typ)
+
+    # Collections
+
+    def __getitem__(self, index):
+        return Expression('get', (self, index))
+
+    # Stops iteration falling back to __getitem__, which never ends
+    __iter__ = None
+
+    def __contains__(self, value):
+        raise TypeError('Expressions cannot be used with in. '
+                        'Use contains() instead.')
+
+    def count(self):
+        """ The number of items in a collection """
+        return Expression('count', (self,), 'int')
+
+    def sum(self):
+        """ The sum of the items in a collection """
+        return Expression('sum', (self,))
+
+    def max(self):
+        """ The largest item in a collection """
+        return Expression('max', (self,))
+
+    def min(self):
+        """ The smallest item in a collection """
+        return Expression('min', (self,))
+
+    def average(self):
+        """ The average of the items in a collection """
+        return Expression('average', (self,), 'double')
+
+    def contains(self, value):
+        """ Whether a collection contains the given value """
+        return Expression('contains', (self, value), 'bool')
+
+    def to_list(self):
+        """ Convert a collection to a list """
+        return Expression('to_list', (self,))
+
+    def to_set(self):
+        """ Convert a collection to a set """
+        return Expression('to_set', (self,))
+
+    def select(self, func, typ):
+        """ Apply a function to each item in a collection. func is passed
+            a parameter for the item, whose type has the given name, and
+            returns an expression for the result. """
+        return Expression('select', (self, self._lambda(func, typ)))
+
+    def where(self, func, typ):
+        """ The items in a collection for which a function returns true.
+            func is passed a parameter for the item, whose type has the
+            given name, and returns an expression for the condition. """
+        return Expression('where', (self, self._lambda(func, typ)))
+
+    def aggregate(self, func, typ, seed=None):
+        """ Combine the items in a collection using a function of two
+            parameters, the value so far and the next item, whose types
+            have the given name. If seed is not None, it is the initial
+            value. Otherwise the first item is used. """
+        func = self._lambda(func, typ, typ)
+        if seed is None:
+            return Expression('aggregate', (self, func), _type_name(typ))
+        return Expression(
+            'aggregate_with_seed', (self, seed, func), _type_name(typ))
+
+    @staticmethod
+    def _lambda(func, *types):
+        parameters = [Expression.parameter('x%d' % next(_parameter_ids), typ)
+                      for typ in types]
+        return Expression.function(parameters, func(*parameters))
+
+    def compile(self, conn):
+        """ Create the expression on the server, by calling the
+            constructors of the KRPC.Expression class. Returns the
+            KRPC.Expression object. """
+        return _Compiler(conn).compile(self)
+
+
+class _Compiler(object):
+    """ Creates the nodes of an expression on the server """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._expression = conn.krpc.Expression
+        # Map from the id of a node to the server object for the node,
+        # so that nodes used more than once are only created once
+        self._nodes = {}
+
+    def compile(self, node, typ=None):
+        """ Create a node on the server. typ is the type of the value the
+            node is combined with, which constants are converted to. """
+        if not isinstance(node, Expression):
+            return self._constant(node, typ)
+        if id(node) in self._nodes:
+            return self._nodes[id(node)]
+        result = self._compile(node)
+        self._nodes[id(node)] = result
+        return result
+
+    def type_of(self, node):
+        """ Get the type of the value of a node,
+            or None if it is not known """
+        if not isinstance(node, Expression):
+            return None
+        if node._type is not None:
+            return node._type
+        if node._op == 'call':
+            func, args, kwargs = node._args
+            try:
+                return _type_name(
+                    self._conn._get_return_type(func, *args, **kwargs))
+            except ValueError:
+                return None
+        if node._op in _SAME_TYPE_OPS:
+            return self.type_of(node._args[0])
+        return None
+
+    def _compile(self, node):
+        expression = self._expression
+        op, args = node._op, node._args
+        if op == 'constant':
+            return self._constant(args[0], node._type)
+        if op == 'call':
+            func, args, kwargs = args
+            return expression.call(
+                self._conn.get_call(func, *args, **kwargs))
+        if op == 'parameter':
+            return expression.parameter(args[0], self._type(node._type))
+        if op == 'function':
+            parameters, body = args
+            return expression.function(
+                [self.compile(x) for x in parameters], self.compile(body))
+        if op == 'cast':
+            return expression.cast(self.compile(args[0]), self._type(args[1]))
+        if op in _BOOL_OPS and op != 'not_' or op in _SAME_TYPE_OPS:
+            if len(args) == 2:
+                # Convert constants to the type of the other argument
+                types = [self.type_of(x) for x in args]
+                return getattr(expression, op)(
+                    self.compile(args[0], types[1]),
+                    self.compile(args[1], types[0]))
+        return getattr(expression, op)(*[self.compile(x) for x in args])
+
+    def _constant(self, value, typ):
+        if typ not in _CONSTANTS:
+            if isinstance(value, bool):
+                typ = 'bool'
+            elif isinstance(value, float):
+                typ = 'double'
+            elif isinstance(value, (str, unicode)):
+                typ = 'string'
+            else:
+                typ = 'int'
+        elif typ == 'int' and isinstance(value, float):
+            typ = 'double'
+        if typ in ('double', 'float'):
+            value = float(value)
+        return getattr(self._expression, _CONSTANTS[typ])(value)
+
+    def _type(self, name):
+        """ Create a KRPC.Type object on the server """
+        return getattr(self._conn.krpc.Type, name)()
@@ -0,0 +1,43 @@
+import threading
+from krpc.error import RPCError
+
+
+class Future(object):
+    """ The result of a remote procedure call that may not have
+        been received from the server yet. """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._value = None
+        self._exception = None
+
+    def done(self):
+        """ Whether the result has been received. """
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        """ Get the result of the call, blocking until it is received.
+            If the call raised an exception, the exception is re-raised.
+
+            When timeout is not None, it should be a floating point number
+            specifying the timeout in seconds for the operation. """
+        if not self._event.wait(timeout):
+            raise RPCError('Timed out waiting for result')
+        if self._exception is not None:
+            raise self._exception  # pylint: disable=raising-bad-type
+        return self._value
+
+    def exception(self, timeout=None):
+        """ Get the exception raised by the call, or None if the
+            call succeeded. Blocks until the result is received. """
+        if not self._event.wait(timeout):
+            raise RPCError('Timed out waiting for result')
+        return self._exception
+
+    def set_result(self, value):
+        self._value = value
+        self._event.set()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._event.set()
@@ -0,0 +1,107 @@
+from krpc.types import ValueType, TupleType
+import krpc.schema.KRPC_pb2 as KRPC
+
+# Names of the NumPy dtypes used to store values of each value type
+_DTYPES = {
+    KRPC.Type.DOUBLE: 'float64',
+    KRPC.Type.FLOAT: 'float32',
+    KRPC.Type.SINT32: 'int32',
+    KRPC.Type.SINT64: 'int64',
+    KRPC.Type.UINT32: 'uint32',
+    KRPC.Type.UINT64: 'uint64',
+    KRPC.Type.BOOL: 'bool'
+}
+
+
+def _dtype(typ):
+    """ Get the NumPy dtype used to store values of the given type,
+        or None if the values are stored as python objects """
+    if isinstance(typ, ValueType):
+        return _DTYPES.get(typ.protobuf_type.code)
+    return None
+
+
+class History(object):
+    """ The most recent values of a stream, and the times at which they
+        were received, stored in fixed size NumPy arrays.
+
+        Numeric values are stored using the matching NumPy type. Tuples of
+        numeric values are stored with one column per element. Values of
+        other types are stored in arrays of python objects.
+
+        Each value is written to the arrays twice, capacity elements apart,
+        so that the most recent values are always in a contiguous region of
+        the arrays. This allows them to be returned as views, without
+        copying. A view of the most recent n values stays unchanged until
+        another capacity - n values have been received. Copy it if it is
+        needed for longer. """
+
+    def __init__(self, capacity, return_type, lock):
+        # NumPy is optional, and only imported when it is used
+        import numpy  # pylint: disable=import-error
+        if capacity < 1:
+            raise ValueError('History capacity must be at least 1')
+        self._capacity = capacity
+        self._lock = lock
+        self._count = 0
+        shape = (2 * capacity,)
+        dtype = _dtype(return_type)
+        if dtype is None and isinstance(return_type, TupleType):
+            dtypes = [_dtype(x) for x in return_type.value_types]
+            if all(x is not None for x in dtypes):
+                shape = (2 * capacity, len(dtypes))
+                dtype = numpy.result_type(*dtypes)
+        if dtype is None:
+            dtype = object
+        self._values = numpy.zeros(shape, dtype=dtype)
+        self._times = numpy.zeros(2 * capacity, dtype=numpy.float64)
+
+    @property
+    def capacity(self):
+        """ The maximum number of values stored """
+        return self._capacity
+
+    @property
+    def count(self):
+        """ The total number of values received. Can be larger
+            than the capacity, in which case the oldest values
+            have been discarded. """
+        return self._count
+
+    def __len__(self):
+        return min(self._count, self._capacity)
+
+    def append(self, value, timestamp):
+        """ Add a value, received at the given time """
+        with self._lock:
+            i = self._count % self._capacity
+            j = i + self._capacity
+            self._values[i] = value
+            self._values[j] = value
+            self._times[i] = timestamp
+            self._times[j] = timestamp
+            self._count += 1
+
+    def recent(self, n=None):
+        """ A view of the most recent n values, oldest first. If n is
+            None, returns all of the values that are stored. """
+        return self._window(self._values, n)
+
+    def times(self, n=None):
+        """ A view of the times at which the most recent n values were
+            received, in seconds, from krpc.platform.monotonic() """
+        return self._window(self._times, n)
+
+    def window(self, n=None):
+        """ Views of the times and values of the most recent n values,
+            taken together so that they correspond to each other """
+        with self._lock:
+            return self.times(n), self.recent(n)
+
+    def _window(self, data, n):
+        with self._lock:
+            stored = min(self._count, self._capacity)
+            if n is None or n > stored:
+                n = stored
+            end = self._count % self._capacity + self._capacity
+            return data[end - n:end]
@@ -0,0 +1,34 @@
+class Options(object):
+    """ The optional features of a client, given to krpc.connect as keyword
+        arguments. See krpc.connect for their meanings. Options that are
+        not given have their default values. """
+
+    _DEFAULTS = (
+        ('pipelined', False),
+        ('lanes', None),
+        ('schema_cache', None),
+        ('services', None),
+        ('docs', True),
+        ('definitions', None),
+        ('lazy_decode', False),
+        ('callback_executor', None),
+        ('stream_thread', True),
+        ('auto_stream', None),
+        ('cache', None),
+        ('numpy_arrays', False)
+    )
+
+    __slots__ = tuple(name for name, _ in _DEFAULTS)
+
+    def __init__(self, **kwargs):
+        for name, default in self._DEFAULTS:
+            setattr(self, name, kwargs.pop(name, default))
+        if kwargs:
+            raise TypeError(
+                'Unknown client option \'%s\'' % sorted(kwargs)[0])
+
+    def __repr__(self):
+        return 'Options(%s)' % ', '.join(
+            '%s=%r' % (name, getattr(self, name))
+            for name, default in self._DEFAULTS
+            if getattr(self, name) is not default)
@@ -0,0 +1,66 @@
+import collections
+import threading
+from krpc.error import ConnectionError  # pylint: disable=redefined-builtin
+from krpc.future import Future
+import krpc.schema.KRPC_pb2 as KRPC
+
+
+class Pipeline(object):
+    """ Sends requests over an RPC connection without waiting for the
+        responses to earlier requests. The server responds to requests in
+        the order they are received, so a background thread matches each
+        response to the oldest pending request. """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._send_lock = threading.Lock()
+        self._pending = collections.deque()
+        self._error = None
+        self._thread = threading.Thread(target=self._receive_responses)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def send(self, data):
+        """ Send an encoded request message, prepended with its size.
+            Returns a future for the corresponding response message. """
+        future = Future()
+        with self._send_lock:
+            if self._error is not None:
+                raise self._error
+            # Queue the future before sending, so that it is
+            # in place when the response arrives
+            self._pending.append(future)
+            try:
+                self._connection.send(data)
+            except Exception as ex:
+                self._fail(ConnectionError(str(ex)))
+                raise
+        return future
+
+    @property
+    def pending(self):
+        """ Number of requests that are waiting for a response """
+        return len(self._pending)
+
+    def close(self):
+        """ Close the connection and wait for the response thread to exit.
+            Requests that are still pending fail with a ConnectionError. """
+        self._connection.close()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _receive_responses(self):
+        try:
+            while True:
+                response = self._connection.receive_message(KRPC.Response)
+                self._pending.popleft().set_result(response)
+        except Exception as ex:  # pylint: disable=broad-except
+            with self._send_lock:
+                self._fail(ConnectionError(str(ex) or 'Connection closed'))
+
+    def _fail(self, error):
+        """ Fail all pending requests with the given error.
+            The send lock must be held when calling this method. """
+        self._error = error
+        while self._pending:
+            self._pending.popleft().set_exception(error)
@@ -1,5 +1,10 @@
+import os
 import struct
 import binascii
+import time
+
+# Python 2 does not provide a monotonic clock
+monotonic = getattr(time, 'monotonic', time.time)
 
 POS_INF = 1e10000
 NEG_INF = -POS_INF
@@ -21,3 +26,19 @@ def unhexlify(data):
         x = data[i:i + 2]
         value.append(int(x, 16))
     return struct.pack('%dB' % len(value), *value)
+
+
+if hasattr(os, 'replace'):
+    replace = os.replace  # pylint: disable=invalid-name
+elif os.name == 'nt':
+    import ctypes
+
+    def replace(src, dst):
+        """ Rename src to dst, atomically replacing dst if it exists """
+        # MOVEFILE_REPLACE_EXISTING | MOVEFILE_WRITE_THROUGH
+        if not ctypes.windll.kernel32.MoveFileExW(
+                unicode(src), unicode(dst), 0x1 | 0x8):
+            raise ctypes.WinError()
+else:
+    # Outside of Windows, rename replaces an existing file atomically
+    replace = os.rename  # pylint: disable=invalid-name
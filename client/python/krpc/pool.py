@@ -0,0 +1,134 @@
+from contextlib import contextmanager
+import itertools
+import threading
+from krpc.pipeline import Pipeline
+import krpc.schema.KRPC_pb2 as KRPC
+
+# Name of the lane used by threads that have not selected a lane
+DEFAULT_LANE = 'default'
+
+
+class Channel(object):
+    """ Sends requests over an RPC connection, waiting for the
+        response to each request before the next can be sent. """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._lock = threading.Lock()
+        # Response messages that are reused by each thread. A response
+        # is processed by the thread that sent the request before it
+        # sends another one, so it can be reused for the next response.
+        self._responses = threading.local()
+
+    def send(self, data, blocking=True):
+        """ Send an encoded request message and wait for the response. If
+            blocking is false and another request is in progress, returns
+            None. The response message is reused for the next response
+            received by the calling thread. """
+        # The lock is acquired without a with statement,
+        # so that a non-blocking send can give up
+        # pylint: disable=consider-using-with
+        if not self._lock.acquire(blocking):
+            return None
+        try:
+            response = getattr(self._responses, 'message', None)
+            if response is None:
+                response = KRPC.Response()
+                self._responses.message = response
+            self._connection.send(data)
+            self._connection.receive_message_into(response)
+            return response
+        finally:
+            self._lock.release()
+
+    def close(self):
+        self._connection.close()
+
+
+class Lane(object):
+    """ A group of RPC connections. A request is sent over a connection
+        that is not busy with another request, if there is one. """
+
+    def __init__(self, connections, pipelined=False):
+        if pipelined:
+            self._pipelines = [Pipeline(x) for x in connections]
+            self._channels = None
+        else:
+            self._pipelines = None
+            self._channels = [Channel(x) for x in connections]
+            self._next = itertools.count()
+
+    def send(self, data):
+        """ Send an encoded request message and wait for the response """
+        if self._pipelines is not None:
+            pipeline = min(self._pipelines, key=lambda x: x.pending)
+            return pipeline.send(data).result()
+        if len(self._channels) > 1:
+            for channel in self._channels:
+                response = channel.send(data, blocking=False)
+                if response is not None:
+                    return response
+        # All connections are busy, so queue on one of them
+        channel = self._channels[next(self._next) % len(self._channels)]
+        return channel.send(data)
+
+    def send_primary(self, data):
+        """ Send an encoded request message over the first
+            connection in the lane, and wait for the response """
+        if self._pipelines is not None:
+            return self._pipelines[0].send(data).result()
+        return self._channels[0].send(data)
+
+    def close(self):
+        for channel in self._pipelines or self._channels:
+            channel.close()
+
+
+class ConnectionPool(object):
+    """ A set of RPC connections, arranged into named lanes. Each thread
+        sends its requests over the lane it has selected, so that requests
+        in one lane are not held up behind requests in another.
+
+        Each RPC connection is a separate client from the server's point of
+        view. Streams belong to the client that created them, so calls to
+        the KRPC service are always sent over the primary connection, which
+        is the first connection in the default lane. """
+
+    def __init__(self, lanes, pipelined=False):
+        self._lanes = dict((name, Lane(connections, pipelined))
+                           for name, connections in lanes.items())
+        self._default = self._lanes[DEFAULT_LANE]
+        self._single = len(lanes) == 1 and len(lanes[DEFAULT_LANE]) == 1
+        self._local = threading.local()
+
+    @property
+    def lanes(self):
+        """ The names of the lanes """
+        return sorted(self._lanes.keys())
+
+    @contextmanager
+    def lane(self, name):
+        """ Send requests made by the calling thread over the given lane,
+            for the duration of a with statement """
+        if name not in self._lanes:
+            raise ValueError('Lane \'%s\' does not exist' % name)
+        previous = getattr(self._local, 'lane', None)
+        self._local.lane = self._lanes[name]
+        try:
+            yield
+        finally:
+            self._local.lane = previous
+
+    def send(self, data, primary=False):
+        """ Send an encoded request message and wait for the response.
+            If primary is true, the request is sent over the primary
+            connection. Otherwise it is sent over the lane selected
+            by the calling thread. """
+        if primary or self._single:
+            return self._default.send_primary(data)
+        lane = getattr(self._local, 'lane', None) or self._default
+        return lane.send(data)
+
+    def close(self):
+        for lane in self._lanes.values():
+            lane.close()
@@ -0,0 +1,240 @@
+import mmap
+import struct
+import threading
+import time
+from krpc.error import RPCError
+from krpc.platform import monotonic
+from krpc.stream import Stream
+from krpc.streammanager import StreamManager
+from krpc.types import Types
+import krpc.schema.KRPC_pb2 as KRPC
+
+# Recordings start with this string, followed by a sequence of records.
+# Each record has a header containing the kind of record, the time it was
+# received and the size of its data, followed by the data.
+MAGIC = b'KRPCSTREAMS\x01'
+_RECORD_HEADER = struct.Struct('<BdI')
+# A STREAM record holds the id of a stream, the size of its serialized
+# KRPC.Type return type, then the return type and the serialized
+# KRPC.ProcedureCall for the stream
+_STREAM_HEADER = struct.Struct('<QI')
+STREAM = 1
+# An UPDATE record holds a serialized KRPC.StreamUpdate message,
+# exactly as it was received from the server
+UPDATE = 2
+
+
+class Recorder(object):
+    """ Writes the stream update messages received by a client to a file,
+        without decoding them. The return type and call for each stream
+        are written before the first update for it. Those for the streams
+        that exist when recording starts form the header of the file. """
+
+    def __init__(self, path):
+        # The file stays open until the recording is closed
+        self._file = open(path, 'wb')  # pylint: disable=consider-using-with
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+        self._streams = set()
+
+    def add_stream(self, stream_id, return_type, call=None):
+        """ Record the return type and call for a stream """
+        return_type = return_type.protobuf_type.SerializeToString()
+        call = call.SerializeToString() if call is not None else b''
+        with self._lock:
+            if self._file is None or stream_id in self._streams:
+                return
+            self._streams.add(stream_id)
+            self._write(STREAM, monotonic(),
+                        _STREAM_HEADER.pack(stream_id, len(return_type)) +
+                        return_type + call)
+
+    def record(self, data, timestamp):
+        """ Record the data for a stream update message """
+        with self._lock:
+            if self._file is not None:
+                self._write(UPDATE, timestamp, data)
+
+    def close(self):
+        """ Stop recording and close the file """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, value, traceback):
+        self.close()
+
+    def _write(self, kind, timestamp, data):
+        self._file.write(_RECORD_HEADER.pack(kind, timestamp, len(data)))
+        self._file.write(data)
+
+
+class RecordedStream(object):
+    """ Information about a stream in a recording """
+
+    def __init__(self, stream_id, return_type, call):
+        self.id = stream_id
+        self.return_type = return_type
+        self.call = call
+
+    def __repr__(self):
+        if self.call is None:
+            return '<RecordedStream #%d>' % self.id
+        return '<RecordedStream #%d %s.%s>' % \
+            (self.id, self.call.service, self.call.procedure)
+
+
+class Replay(object):
+    """ Plays back a recording made by a Recorder, without a connection to
+        a server. The stream update messages are applied to a StreamManager
+        in the order they were received, so the streams returned by
+        stream() behave as they did when the recording was made.
+
+        Values of enumeration types can only be decoded if types is given.
+        It is the type store of a client connected to a server that provides
+        the same services, such as client._types. """
+
+    def __init__(self, path, types=None):
+        with open(path, 'rb') as handle:
+            self._data = mmap.mmap(
+                handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            self._data.close()
+            raise ValueError('\'%s\' is not a stream recording' % path)
+        self._conn = _ReplayClient(types or Types())
+        self._manager = self._conn._stream_manager
+        self._streams = []
+        # Position, size and receive time of each update message
+        self._updates = []
+        self._position = 0
+        pos = len(MAGIC)
+        while pos + _RECORD_HEADER.size <= len(self._data):
+            kind, timestamp, size = _RECORD_HEADER.unpack(
+                self._data[pos:pos + _RECORD_HEADER.size])
+            pos += _RECORD_HEADER.size
+            if pos + size > len(self._data):
+                # The recording was not closed cleanly
+                break
+            if kind == STREAM:
+                self._add_stream(self._data[pos:pos + size])
+            elif kind == UPDATE:
+                self._updates.append((pos, size, timestamp))
+            pos += size
+
+    @property
+    def streams(self):
+        """ The streams in the recording, as RecordedStream objects """
+        return list(self._streams)
+
+    def stream(self, stream_id):
+        """ Get a stream, by its id """
+        for info in self._streams:
+            if info.id == stream_id:
+                return Stream(self._manager.get_stream(
+                    info.return_type, stream_id))
+        raise ValueError('Stream %d is not in the recording' % stream_id)
+
+    @property
+    def stream_update_condition(self):
+        """ Condition variable that is notified when
+            a stream update message has been applied """
+        return self._manager.update_condition
+
+    def __len__(self):
+        return len(self._updates)
+
+    @property
+    def position(self):
+        """ The number of update messages that have been applied """
+        return self._position
+
+    def step(self):
+        """ Apply the next update message. Returns the time at which it was
+            received, or None if there are no more messages. """
+        if self._position >= len(self._updates):
+            return None
+        pos, size, timestamp = self._updates[self._position]
+        self._position += 1
+        update = KRPC.StreamUpdate.FromString(self._data[pos:pos + size])
+        self._manager.update(update.results, timestamp)
+        return timestamp
+
+    def run(self, speed=1.0):
+        """ Apply the remaining update messages. If speed is not None,
+            the messages are applied at speed times the rate at which they
+            were received. If speed is None, they are applied as fast as
+            possible. """
+        start = None
+        while self._position < len(self._updates):
+            timestamp = self._updates[self._position][2]
+            if speed is not None:
+                if start is None:
+                    start = (monotonic(), timestamp)
+                delay = (timestamp - start[1]) / speed - \
+                        (monotonic() - start[0])
+                if delay > 0:
+                    time.sleep(delay)
+            self.step()
+
+    def close(self):
+        """ Close the recording file """
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, value, traceback):
+        self.close()
+
+    def _add_stream(self, data):
+        stream_id, type_size = _STREAM_HEADER.unpack(
+            data[:_STREAM_HEADER.size])
+        pos = _STREAM_HEADER.size
+        return_type = self._conn._types.as_type(
+            KRPC.Type.FromString(data[pos:pos + type_size]))
+        pos += type_size
+        call = None
+        if pos < len(data):
+            call = KRPC.ProcedureCall.FromString(data[pos:])
+        self._streams.append(RecordedStream(stream_id, return_type, call))
+        self._manager.get_stream(return_type, stream_id)._started = True
+
+
+class _ReplayClient(object):
+    """ Stands in for a client when replaying a recording. Streams in a
+        recording cannot be started, stopped or removed on a server. """
+
+    def __init__(self, types):
+        self._types = types
+        self._stream_manager = StreamManager(self)
+        self.krpc = _ReplayKRPC()
+
+    def _build_error(self, error):
+        # The services are not known, so exceptions defined
+        # by a service are created from their names
+        message = error.description
+        if error.stack_trace:
+            message += '\nServer stack trace:\n' + error.stack_trace
+        if error.service and error.name:
+            return self._types.exception_type(
+                error.service, error.name)(message)
+        return RPCError(message)
+
+
+class _ReplayKRPC(object):  # pylint: disable=unused-argument
+    """ The KRPC service procedures used by streams,
+        that have no effect on a recording """
+
+    def start_stream(self, stream_id):
+        pass
+
+    def set_stream_rate(self, stream_id, rate):
+        pass
+
+    def remove_stream(self, stream_id):
+        pass
@@ -0,0 +1,54 @@
+import hashlib
+import threading
+import weakref
+from krpc.types import Types
+from krpc.decoder import Decoder
+from krpc.service import clear_documentation
+import krpc.schema.KRPC_pb2 as KRPC
+
+# Schemas that are in use by clients, keyed by the hash of their
+# encoded services message and whether they include documentation
+_schemas = weakref.WeakValueDictionary()
+_lock = threading.Lock()
+
+
+class Schema(object):
+    """ The services provided by a server, and the type objects for values
+        that do not contain remote objects. A schema is shared by all of
+        the clients in the process that are connected to servers providing
+        identical services, so that the services message is only decoded and
+        stored once, and the type objects and their compiled encoders and
+        decoders are only created once. Remote objects, and so class types,
+        belong to a single client and are not shared. The service objects,
+        their classes and call templates are also built for each client,
+        as they are bound to its connection. """
+
+    def __init__(self, services):
+        self._services = services
+        self._types = Types()
+
+    @property
+    def services(self):
+        """ The KRPC.Services message. Must not be modified. """
+        return self._services
+
+    @property
+    def types(self):
+        """ The type store for types that do not contain class types """
+        return self._types
+
+
+def get_schema(data, docs=True):
+    """ Get the schema for an encoded KRPC.Services message, creating it
+        if no client in the process is using it. If docs is false, the
+        documentation is removed from the services. """
+    key = (hashlib.sha1(data).digest(), docs)
+    with _lock:
+        schema = _schemas.get(key)
+        if schema is None:
+            schema = Schema(Decoder.decode_message(data, KRPC.Services))
+            if not docs:
+                for service in schema.services.services:
+                    clear_documentation(service)
+            _schemas[key] = schema
+        return schema
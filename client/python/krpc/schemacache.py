@@ -0,0 +1,131 @@
+import errno
+import hashlib
+import json
+import os
+import tempfile
+import time
+from krpc.definitions import Definitions
+from krpc.platform import replace
+
+# Time in seconds after which cache entries expire, by default
+DEFAULT_MAX_AGE = 3600
+
+
+def default_path():
+    """ Get the default directory for the schema cache """
+    return os.path.join(os.path.expanduser('~'), '.krpc', 'cache')
+
+
+def schema_hash(data):
+    """ Get the hash of a serialized KRPC.Services message """
+    return hashlib.sha256(data).hexdigest()
+
+
+class SchemaCache(object):
+    """ Stores serialized KRPC.Services messages on disk, so that
+        clients can skip downloading them from the server.
+
+        The server does not provide a hash of its schema, so entries are
+        keyed by the address and port of the server, and the server version.
+        Each entry also records the hash of its data, which is checked when
+        the entry is loaded. The services provided by a server can change
+        without its version changing, for example when a mod is installed,
+        so entries expire max_age seconds after they were stored, and are
+        then downloaded again. If max_age is None, entries do not expire,
+        and must be removed when the services change.
+
+        The ids of the services and procedures, from service definition
+        files, can also be stored alongside the services. """
+
+    _HEADER_LENGTH = 64
+
+    def __init__(self, path=None, max_age=DEFAULT_MAX_AGE):
+        self._path = path if path is not None else default_path()
+        self._max_age = max_age
+
+    @property
+    def path(self):
+        """ The directory that the cache is stored in """
+        return self._path
+
+    @property
+    def max_age(self):
+        """ The time in seconds after which entries expire,
+            or None if they do not expire """
+        return self._max_age
+
+    def load(self, address, port, version):
+        """ Returns the cached data for a server, or None
+            if there is no valid entry for it """
+        return self._read(self._filename(address, port, version))
+
+    def store(self, address, port, version, data):
+        """ Store data for a server. Failures to write
+            to the cache directory are ignored. """
+        self._write(self._filename(address, port, version), data)
+
+    def load_definitions(self, address, port, version):
+        """ Returns the cached Definitions for a server, or None
+            if there is no valid entry for it """
+        data = self._read(self._filename(
+            address, port, version, '.definitions'))
+        if data is None:
+            return None
+        try:
+            return Definitions(json.loads(data.decode('utf-8')))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def store_definitions(self, address, port, version, definitions):
+        """ Store Definitions for a server. Failures to write
+            to the cache directory are ignored. """
+        data = json.dumps(definitions.to_json(), sort_keys=True)
+        self._write(self._filename(address, port, version, '.definitions'),
+                    data.encode('utf-8'))
+
+    def _read(self, filename):
+        try:
+            if self._max_age is not None and \
+               time.time() - os.path.getmtime(filename) > self._max_age:
+                return None
+            with open(filename, 'rb') as entry:
+                content = entry.read()
+        except (IOError, OSError):
+            return None
+        header = content[:self._HEADER_LENGTH].decode('ascii', 'replace')
+        data = content[self._HEADER_LENGTH:]
+        if header != schema_hash(data):
+            return None
+        return data
+
+    def _write(self, filename, data):
+        try:
+            os.makedirs(self._path)
+        except OSError as ex:
+            if ex.errno != errno.EEXIST:
+                return
+        # Write to a temporary file then replace the entry with it, so
+        # other processes never see a partial or missing entry
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self._path)
+            with os.fdopen(fd, 'wb') as entry:
+                entry.write(schema_hash(data).encode('ascii'))
+                entry.write(data)
+            replace(tmp, filename)
+        except (IOError, OSError):
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def remove(self, address, port, version):
+        """ Remove the entries for a server """
+        for extension in ('.services', '.definitions'):
+            try:
+                os.remove(self._filename(address, port, version, extension))
+            except OSError:
+                pass
+
+    def _filename(self, address, port, version, extension='.services'):
+        key = '%s:%d:%s' % (address, port, version)
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self._path, name + extension)
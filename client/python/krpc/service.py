@@ -1,10 +1,12 @@
 import keyword
 from collections import defaultdict
+from functools import partial
 import xml.etree.ElementTree as ElementTree
-from krpc.types import Types, DynamicType, DefaultArgument
+from krpc.types import Types, DynamicType, DefaultArgument, Documentation
 from krpc.decoder import Decoder
 from krpc.utils import snake_case
 from krpc.attributes import Attributes
+from krpc.calltemplate import CallTemplate
 
 
 def _signature(param_types, return_type):
@@ -46,9 +48,8 @@ def _update_names(*names):
     return newnames
 
 
-def _construct_func(invoke, service_name, procedure_name,
-                    prefix_param_names, param_names,
-                    param_types, param_required, param_default, return_type):
+def _construct_func(invoke, template, prefix_param_names, param_names,
+                    param_required, param_default):
     """ Build function to invoke a remote procedure """
 
     prefix_param_names = _update_names(*prefix_param_names)
@@ -56,32 +57,27 @@ def _construct_func(invoke, service_name, procedure_name,
 
     params = []
     for name, required, default, typ in zip(
-            param_names, param_required, param_default, param_types):
+            param_names, param_required, param_default,
+            template.param_types):
         if not required:
             name += ' = DefaultArgument(' + \
                     repr(_as_literal(default, typ)) + ')'
         params.append(name)
 
-    invoke_args = [
-        '\'' + str(service_name) + '\'',
-        '\'' + str(procedure_name) + '\'',
-        '[' + ','.join(param_names) + ']',
-        'param_names',
-        'param_types',
-        'return_type'
-    ]
     code = 'lambda ' + ', '.join(prefix_param_names + params) + \
-           ': invoke(' + ', '.join(invoke_args) + ')'
+           ': invoke(template, [' + ','.join(param_names) + '])'
     context = {
         'invoke': invoke,
-        'DefaultArgument': DefaultArgument,
-        'param_names': param_names,
-        'param_types': param_types,
-        'return_type': return_type
+        'template': template,
+        'DefaultArgument': DefaultArgument
     }
     return eval(code, context)  # pylint: disable=eval-used
 
 
+def _build_call(template, args):
+    return template.build_call(args)
+
+
 def _indent(lines, level):
     result = []
     for line in lines:
@@ -154,15 +150,50 @@ def _parse_documentation(xml):
                        if x != '')
 
 
-def create_service(client, service):
-    """ Create a new service type """
+def _documentation(xml, docs=True):
+    """ Get the docstring for some XML documentation. The XML is
+        parsed the first time the docstring is read. """
+    if not docs:
+        return None
+    return Documentation(partial(_parse_documentation, xml))
+
+
+def clear_documentation(service):
+    """ Remove the documentation from a service message """
+    service.ClearField('documentation')
+    for procedure in service.procedures:
+        procedure.ClearField('documentation')
+    for cls in service.classes:
+        cls.ClearField('documentation')
+    for enumeration in service.enumerations:
+        enumeration.ClearField('documentation')
+        for value in enumeration.values:
+            value.ClearField('documentation')
+    for exception in service.exceptions:
+        exception.ClearField('documentation')
+
+
+def create_service(client, service, docs=True, ids=None):
+    """ Create a new service type. Class, enumeration and exception types
+        are added immediately, as they are needed to decode values returned
+        by the server. Procedures and properties are added the first time
+        they are accessed. Docstrings are generated from the documentation
+        the first time they are read. If docs is false, the documentation
+        is discarded and the docstrings are None. If ids is given, it is a
+        tuple containing the id of the service and a dictionary mapping
+        procedure names to ids, used to address calls to the service. """
+    if not docs:
+        clear_documentation(service)
     cls = type(
         str(service.name),
         (ServiceBase,),
         {
             '_client': client,
             '_name': service.name,
-            '__doc__': _parse_documentation(service.documentation)
+            '_service': service,
+            '_docs': docs,
+            '_ids': ids,
+            '__doc__': _documentation(service.documentation, docs)
         }
     )
 
@@ -178,53 +209,6 @@ def create_service(client, service):
     for exception in service.exceptions:
         cls._add_service_exception(exception)
 
-    # Add procedures
-    for procedure in service.procedures:
-        if Attributes.is_a_procedure(procedure.name):
-            cls._add_service_procedure(procedure)
-
-    # Add properties
-    properties = defaultdict(lambda: [None, None])
-    for procedure in service.procedures:
-        if Attributes.is_a_property_accessor(procedure.name):
-            name = Attributes.get_property_name(procedure.name)
-            if Attributes.is_a_property_getter(procedure.name):
-                properties[name][0] = procedure
-            else:
-                properties[name][1] = procedure
-    for name, procedures in properties.items():
-        cls._add_service_property(name, procedures[0], procedures[1])
-
-    # Add class methods
-    for procedure in service.procedures:
-        if Attributes.is_a_class_method(procedure.name):
-            class_name = Attributes.get_class_name(procedure.name)
-            method_name = Attributes.get_class_member_name(procedure.name)
-            cls._add_service_class_method(class_name, method_name, procedure)
-
-    # Add static class methods
-    for procedure in service.procedures:
-        if Attributes.is_a_class_static_method(procedure.name):
-            class_name = Attributes.get_class_name(procedure.name)
-            method_name = Attributes.get_class_member_name(procedure.name)
-            cls._add_service_class_static_method(
-                class_name, method_name, procedure)
-
-    # Add class properties
-    properties = defaultdict(lambda: [None, None])
-    for procedure in service.procedures:
-        if Attributes.is_a_class_property_accessor(procedure.name):
-            class_name = Attributes.get_class_name(procedure.name)
-            property_name = Attributes.get_class_member_name(procedure.name)
-            key = (class_name, property_name)
-            if Attributes.is_a_class_property_getter(procedure.name):
-                properties[key][0] = procedure
-            else:
-                properties[key][1] = procedure
-    for (class_name, property_name), procedures in properties.items():
-        cls._add_service_class_property(
-            class_name, property_name, procedures[0], procedures[1])
-
     return cls()
 
 
@@ -232,12 +216,79 @@ class ServiceBase(DynamicType):
     """ Base class for service objects, created at runtime
         using information received from the server. """
 
+    @classmethod
+    def _documentation(cls, xml):
+        return _documentation(xml, cls._docs)
+
+    @classmethod
+    def _build_members(cls):
+        """ Register the procedures and properties of the service, and the
+            members of its classes, so they can be added lazily """
+        members = {}
+        class_members = defaultdict(dict)
+
+        # Procedures
+        for procedure in cls._service.procedures:
+            if Attributes.is_a_procedure(procedure.name):
+                members[_member_name(procedure.name)] = \
+                    partial(cls._add_service_procedure, procedure)
+
+        # Properties
+        properties = defaultdict(lambda: [None, None])
+        for procedure in cls._service.procedures:
+            if Attributes.is_a_property_accessor(procedure.name):
+                name = Attributes.get_property_name(procedure.name)
+                if Attributes.is_a_property_getter(procedure.name):
+                    properties[name][0] = procedure
+                else:
+                    properties[name][1] = procedure
+        for name, procedures in properties.items():
+            members[_member_name(name)] = partial(
+                cls._add_service_property, name, *procedures)
+
+        # Class methods and static class methods
+        for procedure in cls._service.procedures:
+            if Attributes.is_a_class_method(procedure.name):
+                add_member = cls._add_service_class_method
+            elif Attributes.is_a_class_static_method(procedure.name):
+                add_member = cls._add_service_class_static_method
+            else:
+                continue
+            class_name = Attributes.get_class_name(procedure.name)
+            method_name = Attributes.get_class_member_name(procedure.name)
+            class_members[class_name][_member_name(method_name)] = \
+                partial(add_member, class_name, method_name, procedure)
+
+        # Class properties
+        properties = defaultdict(lambda: [None, None])
+        for procedure in cls._service.procedures:
+            if Attributes.is_a_class_property_accessor(procedure.name):
+                class_name = Attributes.get_class_name(procedure.name)
+                property_name = Attributes.get_class_member_name(
+                    procedure.name)
+                key = (class_name, property_name)
+                if Attributes.is_a_class_property_getter(procedure.name):
+                    properties[key][0] = procedure
+                else:
+                    properties[key][1] = procedure
+        for (class_name, property_name), procedures in properties.items():
+            class_members[class_name][_member_name(property_name)] = partial(
+                cls._add_service_class_property,
+                class_name, property_name, *procedures)
+
+        cls._members = members
+        for remote_cls in cls._service.classes:
+            class_cls = cls._client._types.class_type(
+                cls._name, remote_cls.name).python_type
+            class_cls._members = class_members[remote_cls.name]
+
     @classmethod
     def _add_service_class(cls, remote_cls):
         """ Add a class type """
         name = remote_cls.name
         class_type = cls._client._types.class_type(
-            cls._name, name, _parse_documentation(remote_cls.documentation))
+            cls._name, name, cls._documentation(remote_cls.documentation))
+        class_type.python_type._service_type = cls
         setattr(cls, name, class_type.python_type)
 
     @classmethod
@@ -245,11 +296,15 @@ class ServiceBase(DynamicType):
         """ Add an enum type """
         name = enumeration.name
         enumeration_type = cls._client._types.enumeration_type(
-            cls._name, name, _parse_documentation(enumeration.documentation))
-        enumeration_type.set_values(dict(
-            (str(snake_case(x.name)), {
-                'value': x.value, 'doc': _parse_documentation(x.documentation)
-            }) for x in enumeration.values))
+            cls._name, name, cls._documentation(enumeration.documentation))
+        # The type is shared with other clients using the same schema,
+        # in which case one of them has already set its values
+        if enumeration_type.python_type is None:
+            enumeration_type.set_values(dict(
+                (str(snake_case(x.name)), {
+                    'value': x.value,
+                    'doc': cls._documentation(x.documentation)
+                }) for x in enumeration.values))
         setattr(cls, name, enumeration_type.python_type)
 
     @classmethod
@@ -257,7 +312,7 @@ class ServiceBase(DynamicType):
         """ Add an exception type """
         name = exception.name
         exception_type = cls._client._types.exception_type(
-            cls._name, name, _parse_documentation(exception.documentation))
+            cls._name, name, cls._documentation(exception.documentation))
         setattr(cls, name, exception_type)
 
     @classmethod
@@ -280,50 +335,59 @@ class ServiceBase(DynamicType):
         return param_names, param_types, param_required, \
             param_default, return_type
 
+    @classmethod
+    def _construct_procedure(cls, procedure_name, prefix_param_names,
+                             param_names, param_types, param_required,
+                             param_default, return_type):
+        """ Build function to invoke a remote procedure, using
+            a template compiled for the procedure """
+        service_id = procedure_id = 0
+        if cls._ids is not None:
+            service_id = cls._ids[0]
+            procedure_id = cls._ids[1].get(procedure_name, 0)
+        template = CallTemplate(cls._client._types, cls._name,
+                                procedure_name, param_types, return_type,
+                                service_id, procedure_id)
+        func = _construct_func(
+            cls._client._invoke_template, template, prefix_param_names,
+            param_names, param_required, param_default)
+        build_call = _construct_func(
+            _build_call, template, prefix_param_names,
+            param_names, param_required, param_default)
+        setattr(func, '_build_call', build_call)
+        setattr(func, '_return_type', return_type)
+        setattr(func, '_template', template)
+        return func
+
     @classmethod
     def _add_service_procedure(cls, procedure):
         """ Add a procedure """
         param_names, param_types, param_required, \
             param_default, return_type = cls._parse_procedure(procedure)
-        func = _construct_func(
-            cls._client._invoke, cls._name, procedure.name, [],
-            param_names, param_types,
+        func = cls._construct_procedure(
+            procedure.name, [], param_names, param_types,
             param_required, param_default, return_type)
-        build_call = _construct_func(
-            cls._client._build_call, cls._name, procedure.name, [],
-            param_names, param_types,
-            param_required, param_default, return_type)
-        setattr(func, '_build_call', build_call)
-        setattr(func, '_return_type', return_type)
         name = _member_name(procedure.name)
         return cls._add_static_method(
-            name, func, doc=_parse_documentation(procedure.documentation))
+            name, func, doc=cls._documentation(procedure.documentation))
 
     @classmethod
     def _add_service_property(cls, name, getter=None, setter=None):
         """ Add a property """
         doc = None
         if getter:
-            doc = _parse_documentation(getter.documentation)
+            doc = cls._documentation(getter.documentation)
         elif setter:
-            doc = _parse_documentation(setter.documentation)
+            doc = cls._documentation(setter.documentation)
         if getter:
-            getter_name = getter.name
             _, _, _, _, return_type = cls._parse_procedure(getter)
-            getter = _construct_func(
-                cls._client._invoke, cls._name, getter_name, ['self'],
-                [], [], [], [], return_type)
-            build_call = _construct_func(
-                cls._client._build_call, cls._name, getter_name, ['self'],
-                [], [], [], [], return_type)
-            setattr(getter, '_build_call', build_call)
-            setattr(getter, '_return_type', return_type)
+            getter = cls._construct_procedure(
+                getter.name, ['self'], [], [], [], [], return_type)
         if setter:
             param_names, param_types, _, _, _ = cls._parse_procedure(setter)
-            setter = _construct_func(cls._client._invoke, cls._name,
-                                     setter.name, ['self'],
-                                     param_names, param_types,
-                                     [True], [None], None)
+            setter = cls._construct_procedure(
+                setter.name, ['self'], param_names, param_types,
+                [True], [None], None)
         name = _member_name(name)
         return cls._add_property(name, getter, setter, doc=doc)
 
@@ -337,19 +401,12 @@ class ServiceBase(DynamicType):
         # Rename this to self if it doesn't cause a name clash
         if 'self' not in param_names:
             param_names[0] = 'self'
-        func = _construct_func(
-            cls._client._invoke, cls._name, procedure.name, [],
-            param_names, param_types,
-            param_required, param_default, return_type)
-        build_call = _construct_func(
-            cls._client._build_call, cls._name, procedure.name, [],
-            param_names, param_types,
+        func = cls._construct_procedure(
+            procedure.name, [], param_names, param_types,
             param_required, param_default, return_type)
-        setattr(func, '_build_call', build_call)
-        setattr(func, '_return_type', return_type)
         name = _member_name(method_name)
         class_cls._add_method(
-            name, func, doc=_parse_documentation(procedure.documentation))
+            name, func, doc=cls._documentation(procedure.documentation))
 
     @classmethod
     def _add_service_class_static_method(cls, class_name,
@@ -359,19 +416,12 @@ class ServiceBase(DynamicType):
             cls._name, class_name).python_type
         param_names, param_types, param_required, \
             param_default, return_type = cls._parse_procedure(procedure)
-        func = _construct_func(
-            cls._client._invoke, cls._name, procedure.name, [],
-            param_names, param_types,
+        func = cls._construct_procedure(
+            procedure.name, [], param_names, param_types,
             param_required, param_default, return_type)
-        build_call = _construct_func(
-            cls._client._build_call, cls._name, procedure.name, [],
-            param_names, param_types,
-            param_required, param_default, return_type)
-        setattr(func, '_build_call', build_call)
-        setattr(func, '_return_type', return_type)
         name = _member_name(method_name)
         class_cls._add_static_method(
-            name, func, doc=_parse_documentation(procedure.documentation))
+            name, func, doc=cls._documentation(procedure.documentation))
 
     @classmethod
     def _add_service_class_property(cls, class_name, property_name,
@@ -381,29 +431,22 @@ class ServiceBase(DynamicType):
             cls._name, class_name).python_type
         doc = None
         if getter:
-            doc = _parse_documentation(getter.documentation)
+            doc = cls._documentation(getter.documentation)
         elif setter:
-            doc = _parse_documentation(setter.documentation)
+            doc = cls._documentation(setter.documentation)
         if getter:
-            getter_name = getter.name
             param_names, param_types, _, _, \
                 return_type = cls._parse_procedure(getter)
             # Rename this to self if it doesn't cause a name clash
             if 'self' not in param_names:
                 param_names[0] = 'self'
-            getter = _construct_func(
-                cls._client._invoke, cls._name, getter_name, [],
-                param_names, param_types, [True], [None], return_type)
-            build_call = _construct_func(
-                cls._client._build_call, cls._name, getter_name, [],
-                param_names, param_types, [True], [None], return_type)
-            setattr(getter, '_build_call', build_call)
-            setattr(getter, '_return_type', return_type)
+            getter = cls._construct_procedure(
+                getter.name, [], param_names, param_types,
+                [True], [None], return_type)
         if setter:
-            param_names, param_types, _, _, \
-                return_type = cls._parse_procedure(setter)
-            setter = _construct_func(
-                cls._client._invoke, cls._name, setter.name, [],
-                param_names, param_types, [True, True], [None, None], None)
+            param_names, param_types, _, _, _ = cls._parse_procedure(setter)
+            setter = cls._construct_procedure(
+                setter.name, [], param_names, param_types,
+                [True, True], [None, None], None)
         property_name = _member_name(property_name)
         return class_cls._add_property(property_name, getter, setter, doc=doc)
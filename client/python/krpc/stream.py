@@ -1,3 +1,7 @@
+from krpc.executor import BLOCK
+from krpc.platform import monotonic
+
+
 class Stream(object):
     """ A streamed remote procedure call. When called, returns the
         most recently received result of the call. """
@@ -27,7 +31,7 @@ class Stream(object):
         else:
             with self._stream.condition:
                 self._stream.start()
-                self._stream.condition.wait()
+                self._stream.wait()
 
     @property
     def rate(self):
@@ -50,6 +54,37 @@ class Stream(object):
             raise value  # pylint: disable=raising-bad-type
         return value
 
+    def get_if_newer(self, sequence):
+        """ Get the most recent value for this stream, if it was received
+            after the given sequence number. Returns a tuple containing the
+            value and its sequence number, or None if there is no newer
+            value. Does not block, or wait for the stream to start. """
+        if not self._stream.started:
+            self._stream.start()
+        sample = self._stream.sample
+        if sample is None or sample.sequence <= sequence:
+            return None
+        value = sample.value
+        if isinstance(value, Exception):
+            raise value  # pylint: disable=raising-bad-type
+        return value, sample.sequence
+
+    @property
+    def sequence(self):
+        """ The sequence number of the stream update message that the most
+            recent value was received in, or 0 if there is no value. """
+        sample = self._stream.sample
+        return sample.sequence if sample is not None else 0
+
+    @property
+    def age(self):
+        """ The time in seconds since the most recent value was received,
+            or None if there is no value. """
+        sample = self._stream.sample
+        if sample is None:
+            return None
+        return monotonic() - sample.timestamp
+
     @property
     def condition(self):
         """ Condition variable that is notified when the stream updates. """
@@ -63,11 +98,51 @@ class Stream(object):
             specifying the timeout in seconds for the operation. """
         if not self._stream.started:
             self._stream.start()
-        self._stream.condition.wait(timeout=timeout)
+        self._stream.wait(timeout)
+
+    @property
+    def numpy_arrays(self):
+        """ Whether the values of the stream are decoded into NumPy arrays.
+            Can only be enabled for streams whose values are collections
+            of numbers supported by krpc.arrays. Applies to the values
+            received after it is changed. Requires NumPy. """
+        return_type = self._stream.return_type
+        return return_type is not None and \
+            self._stream.decoder is not return_type.decoder
+
+    @numpy_arrays.setter
+    def numpy_arrays(self, value):
+        return_type = self._stream.return_type
+        if not value:
+            if return_type is not None:
+                self._stream.decoder = return_type.decoder
+        elif return_type is None or return_type.array_decoder is None:
+            raise ValueError(
+                'Cannot decode values of type %s into NumPy arrays' %
+                return_type)
+        else:
+            self._stream.decoder = return_type.array_decoder
+
+    def history(self, capacity):
+        """ Record the most recent values of the stream, and the times at
+            which they were received, in NumPy arrays that can hold capacity
+            values. Returns a krpc.history.History object. If the stream is
+            already recording with the same capacity, the existing history
+            is returned. Otherwise any values already recorded are
+            discarded. Requires NumPy. """
+        return self._stream.enable_history(capacity)
 
-    def add_callback(self, callback):
-        """ Add a callback that is invoked whenever the stream is updated. """
-        self._stream.add_callback(callback)
+    def add_callback(self, callback, policy=BLOCK, queue_size=None):
+        """ Add a callback that is invoked whenever the stream is updated.
+            If the client has a callback executor, queue_size limits the
+            number of calls waiting to be run, and defaults to
+            krpc.executor.DEFAULT_QUEUE_SIZE. policy is what happens
+            when the queue is full: 'latest' keeps only the most recent
+            value, 'drop_oldest' discards the oldest value, and 'block'
+            waits for the callback to catch up. Returns a
+            krpc.executor.Callback object, which counts the dropped
+            values. """
+        return self._stream.add_callback(callback, policy, queue_size)
 
     def remove_callback(self, callback):
         """ Remove a callback. """
@@ -0,0 +1,97 @@
+from collections import namedtuple
+
+
+class StreamGroup(object):
+    """ A group of streams whose values are read together. Each snapshot of
+        the group contains values that were all received in the same stream
+        update message, so they are consistent with each other.
+
+        The streams are added to the server in a single request, and are
+        started together in a single request. """
+
+    def __init__(self, conn, streams, names=None):
+        self._conn = conn
+        self._manager = conn._stream_manager
+        self._streams = self._manager.add_streams(streams)
+        if names is None:
+            self._snapshot_type = type('Snapshot', (tuple,), {})
+        else:
+            if len(names) != len(streams):
+                raise ValueError('Expected %d names, got %d' %
+                                 (len(streams), len(names)))
+            self._snapshot_type = type(
+                'Snapshot', (namedtuple('Snapshot', names),), {})
+
+    def start(self, wait=True):
+        """ Start the streams. If wait is true, blocks
+            until all of the streams have received a value. """
+        if all(x.started for x in self._streams):
+            return
+        if not wait:
+            self._manager.start_streams(self._streams)
+        else:
+            with self._manager.update_condition:
+                self._manager.start_streams(self._streams)
+                while not all(x.updated for x in self._streams):
+                    self._manager.wait_for_update()
+
+    @property
+    def rate(self):
+        """ The update rate for the streams in Hertz.
+            Zero if the rate is unlimited. """
+        return self._streams[0].rate if self._streams else 0
+
+    @rate.setter
+    def rate(self, value):
+        """ The update rate for the streams in Hertz.
+            Zero if the rate is unlimited. """
+        self._manager.set_stream_rates(self._streams, value)
+
+    def __call__(self):
+        """ Get a snapshot of the most recent values of the streams. Returns a
+            tuple, or a named tuple if names were given when the group was
+            created. The sequence attribute of the snapshot is the number of
+            the stream update message that the values were taken from. """
+        if not all(x.started for x in self._streams):
+            self.start()
+        sequence, values = self._manager.snapshot(self._streams)
+        for value in values:
+            if isinstance(value, Exception):
+                raise value  # pylint: disable=raising-bad-type
+        snapshot = tuple.__new__(self._snapshot_type, values)
+        snapshot.sequence = sequence
+        return snapshot
+
+    @property
+    def sequence(self):
+        """ The number of the most recent stream update message """
+        return self._manager.sequence
+
+    @property
+    def condition(self):
+        """ Condition variable that is notified when
+            a stream update message has been processed. """
+        return self._manager.update_condition
+
+    def wait(self, timeout=None):
+        """ Wait until the next stream update message or a timeout occurs.
+            The condition variable must be locked before calling this method.
+
+            When timeout is not None, it should be a floating point number
+            specifying the timeout in seconds for the operation. """
+        if not all(x.started for x in self._streams):
+            self._manager.start_streams(self._streams)
+        self._manager.wait_for_update(timeout)
+
+    def __len__(self):
+        return len(self._streams)
+
+    def remove(self):
+        """ Remove the streams """
+        self._manager.remove_streams(self._streams)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, value, traceback):
+        self.remove()
@@ -1,29 +1,101 @@
+import collections
 import threading
-from krpc.decoder import Decoder
 from krpc.error import StreamError
+from krpc.executor import Callback, BLOCK, IMMEDIATE
+from krpc.history import History
+from krpc.options import Options
+from krpc.platform import monotonic
 import krpc.schema.KRPC_pb2 as KRPC
 
+# While a predicate passed to StreamManager.wait_until is being evaluated,
+# _tracking.streams maps the streams it reads to the samples it read
+_tracking = threading.local()
+
+
+class _Sample(object):
+    """ A value of a stream, the sequence number of the stream update
+        message it was received in, and the time it was received. Samples
+        are replaced rather than modified, so they can be read without a
+        lock. The only exception is an encoded value, which is decoded when
+        first read. Decoding it twice in different threads gives the same
+        result, so this does not need a lock either. data is the encoded
+        value, which is kept so that it can be decoded again if the
+        stream's decoder is changed. """
+
+    __slots__ = ('_value', '_encoded', '_decode', 'data', 'sequence',
+                 'timestamp')
+
+    def __init__(self, value, sequence, timestamp,
+                 encoded=None, decode=None, data=None):
+        self._value = value
+        self._encoded = encoded
+        self._decode = decode
+        self.data = encoded if data is None else data
+        self.sequence = sequence
+        self.timestamp = timestamp
+
+    @property
+    def value(self):
+        if self._encoded is not None:
+            self._value = self._decode(self._encoded)
+            self._encoded = None
+        return self._value
+
+
+# The id of a stream, the return type of its procedure, and the call
+_Definition = collections.namedtuple(
+    '_Definition', ['stream_id', 'return_type', 'call'])
+
 
 class StreamImpl(object):
-    def __init__(self, conn, stream_id, return_type, update_lock):
-        self._conn = conn
-        self._stream_id = stream_id
-        self._return_type = return_type
-        self._update_lock = update_lock
+    def __init__(self, manager, stream_id, return_type, call=None,
+                 decoder=None):
+        self._manager = manager
+        self._definition = _Definition(stream_id, return_type, call)
+        # Function that decodes the values of the stream
+        if decoder is None and return_type is not None:
+            decoder = return_type.decoder
+        self._decoder = decoder
         self._started = False
-        self._updated = False
-        self._value = None
+        # The most recent sample, or None if no value has been received
+        self._sample = None
         self._condition = threading.Condition()
         self._callbacks = []
         self._rate = 0
+        self._history = None
+        # Whether the stream was only added by the client's
+        # AutoStreams, which removes it when it is no longer used
+        self.auto = False
+
+    @property
+    def stream_id(self):
+        return self._definition.stream_id
 
     @property
     def return_type(self):
-        return self._return_type
+        return self._definition.return_type
+
+    @property
+    def call(self):
+        return self._definition.call
+
+    @property
+    def decoder(self):
+        return self._decoder
+
+    @decoder.setter
+    def decoder(self, value):
+        with self._manager._update_lock:
+            self._decoder = value
+            sample = self._sample
+            if sample is not None and sample.data is not None:
+                # Decode the most recent value again when it is next read
+                self._sample = _Sample(None, sample.sequence,
+                                       sample.timestamp, sample.data, value)
 
     def start(self):
         if not self._started:
-            self._conn.krpc.start_stream(self._stream_id)
+            self._manager._conn.krpc.start_stream(self.stream_id)
             self._started = True
 
     @property
@@ -33,7 +105,7 @@ class StreamImpl(object):
     @rate.setter
     def rate(self, value):
         self._rate = value
-        self._conn.krpc.set_stream_rate(self._stream_id, value)
+        self._manager._conn.krpc.set_stream_rate(self.stream_id, value)
 
     @property
     def started(self):
@@ -41,68 +113,191 @@ class StreamImpl(object):
 
     @property
     def value(self):
-        if not self._updated:
+        sample = self._sample
+        streams = getattr(_tracking, 'streams', None)
+        if streams is not None:
+            streams.setdefault(self, sample)
+        if sample is None:
             raise StreamError("Stream has no value")
-        return self._value
+        return sample.value
 
     @value.setter
     def value(self, value):
-        with self._update_lock:
-            self._updated = True
-            self._value = value
+        with self._manager._update_lock:
+            sample = self._sample
+            if sample is None:
+                self._sample = _Sample(value, 0, monotonic())
+            else:
+                self._sample = _Sample(
+                    value, sample.sequence, sample.timestamp)
+
+    @property
+    def sample(self):
+        sample = self._sample
+        streams = getattr(_tracking, 'streams', None)
+        if streams is not None:
+            streams.setdefault(self, sample)
+        return sample
+
+    def set_value(self, value, sequence, timestamp, encoded=None):
+        self._sample = _Sample(value, sequence, timestamp, data=encoded)
+
+    def set_encoded_value(self, data, sequence, timestamp):
+        """ Set the value of the stream to the given encoded
+            value, which is decoded when the value is first read """
+        self._sample = _Sample(
+            None, sequence, timestamp, data, self._decoder)
 
     @property
     def updated(self):
-        return self._updated
+        return self._sample is not None
+
+    @property
+    def history(self):
+        return self._history
+
+    def enable_history(self, capacity):
+        with self._manager._update_lock:
+            if self._history is None or self._history.capacity != capacity:
+                self._history = History(
+                    capacity, self.return_type, self._manager._update_lock)
+            return self._history
 
     @property
     def condition(self):
         return self._condition
 
+    def wait(self, timeout=None):
+        """ Wait until the stream is updated or a timeout occurs.
+            The condition variable must be locked. """
+        sample = self._sample
+        self._manager.wait(
+            self._condition, lambda: self._sample is not sample, timeout)
+
     @property
     def callbacks(self):
-        with self._update_lock:
+        with self._manager._update_lock:
             return self._callbacks
 
-    def add_callback(self, callback):
-        with self._update_lock:
+    def add_callback(self, callback, policy=BLOCK, queue_size=None):
+        callback = Callback(self._manager.callback_executor,
+                            callback, policy, queue_size)
+        with self._manager._update_lock:
             self._callbacks = self._callbacks[:]
             self._callbacks.append(callback)
-            return self._callbacks
+            return callback
 
     def remove_callback(self, callback):
-        with self._update_lock:
-            self._callbacks = [x for x in self._callbacks if x != callback]
+        with self._manager._update_lock:
+            self._callbacks = [x for x in self._callbacks
+                               if x.callback != callback]
             return self._callbacks
 
     def remove(self):
-        self._conn._stream_manager.remove_stream(self._stream_id)
-        with self._update_lock:
-            self._value = StreamError("Stream does not exist")
+        self._manager.remove_stream(self.stream_id)
+        self.set_removed()
+
+    def set_removed(self):
+        """ Mark the stream as removed from the server,
+            so that reading its value raises an error """
+        with self._manager._update_lock:
+            self._sample = _Sample(
+                StreamError("Stream does not exist"), 0, monotonic())
+
+
+class _UpdateIO(object):
+    """ The stream connection that updates are received from by
+        StreamManager.pump(), when there is no stream update thread,
+        and the recorder that updates are written to """
+
+    __slots__ = ('connection', 'recorder')
+
+    def __init__(self):
+        self.connection = None
+        self.recorder = None
 
 
 class StreamManager(object):
-    def __init__(self, conn):
+    # Class of the streams created by the manager
+    _stream_class = StreamImpl
+
+    def __init__(self, conn, options=None, callback_executor=None):
         self._conn = conn
+        # The client's options. If options.lazy_decode is true, stream
+        # values are decoded when they are first read, unless the stream
+        # has callbacks or a history. If options.numpy_arrays is true,
+        # stream values that are collections of numbers are decoded into
+        # NumPy arrays.
+        self._options = options or Options()
+        # Runs the callbacks. If None, they are run on the thread
+        # that processes the stream update message.
+        self._callback_executor = callback_executor or IMMEDIATE
         self._update_lock = threading.RLock()
         self._condition = threading.Condition()
         self._streams = {}
         self._callbacks = []
-
-    def add_stream(self, return_type, call):
+        # Number of stream update messages that have been processed
+        self._sequence = 0
+        # Message that each stream update is parsed into, reused to
+        # avoid allocating a new message for every update
+        self._message = KRPC.StreamUpdate()
+        self._io = _UpdateIO()
+
+    def add_stream(self, return_type, call, auto=False):
         stream_id = self._conn.krpc.add_stream(call, False).id
+        return self.get_stream(return_type, stream_id, call, auto)
+
+    def add_streams(self, streams):
+        """ Add several streams to the server in a single request.
+            streams is a list of (return_type, call) tuples. """
+        add_stream = self._conn.krpc.add_stream
+        results = self._conn.call_many(
+            [(add_stream, call, False) for _, call in streams])
+        return [self.get_stream(return_type, result.id, call)
+                for (return_type, call), result in zip(streams, results)]
+
+    def start_streams(self, streams):
+        """ Start several streams in a single request """
+        streams = [x for x in streams if not x.started]
+        if not streams:
+            return
+        start_stream = self._conn.krpc.start_stream
+        self._conn.call_many(
+            [(start_stream, stream.stream_id) for stream in streams])
+        for stream in streams:
+            stream._started = True
+
+    def set_stream_rates(self, streams, rate):
+        """ Set the update rate of several streams in a single request """
+        set_stream_rate = self._conn.krpc.set_stream_rate
+        self._conn.call_many(
+            [(set_stream_rate, stream.stream_id, rate) for stream in streams])
+        for stream in streams:
+            stream._rate = rate
+
+    def get_stream(self, return_type, stream_id, call=None, auto=False):
+        """ Get the stream with the given id, creating it if the client
+            does not have it yet. If auto is false, the stream is no longer
+            treated as being used only by the client's AutoStreams. """
         with self._update_lock:
             if stream_id not in self._streams:
-                self._streams[stream_id] = StreamImpl(
-                    self._conn, stream_id, return_type, self._update_lock)
+                decoder = None
+                if self._options.numpy_arrays and return_type is not None:
+                    decoder = return_type.array_decoder
+                stream = self._stream_class(
+                    self, stream_id, return_type, call, decoder)
+                stream.auto = auto
+                self._streams[stream_id] = stream
+                if self._io.recorder is not None:
+                    self._io.recorder.add_stream(
+                        stream_id, return_type, call)
+            elif not auto:
+                self._streams[stream_id].auto = False
             return self._streams[stream_id]
 
-    def get_stream(self, return_type, stream_id):
-        with self._update_lock:
-            if stream_id not in self._streams:
-                self._streams[stream_id] = StreamImpl(
-                    self._conn, stream_id, return_type, self._update_lock)
-            return self._streams[stream_id]
+    def has_stream(self, stream_id):
+        """ Whether the client has a stream with the given id """
+        return stream_id in self._streams
 
     def remove_stream(self, stream_id):
         with self._update_lock:
@@ -110,31 +305,177 @@ class StreamManager(object):
                 self._conn.krpc.remove_stream(stream_id)
                 del self._streams[stream_id]
 
+    def remove_streams(self, streams):
+        """ Remove several streams in a single request """
+        with self._update_lock:
+            stream_ids = [x.stream_id for x in streams
+                          if x.stream_id in self._streams]
+            if stream_ids:
+                remove_stream = self._conn.krpc.remove_stream
+                self._conn.call_many(
+                    [(remove_stream, stream_id) for stream_id in stream_ids])
+            for stream_id in stream_ids:
+                del self._streams[stream_id]
+            for stream in streams:
+                stream.set_removed()
+
+    @property
+    def recorder(self):
+        return self._io.recorder
+
+    def start_recording(self, recorder):
+        """ Record stream update messages using the given recorder,
+            starting with the return types and calls of the streams """
+        with self._update_lock:
+            for stream in self._streams.values():
+                recorder.add_stream(
+                    stream.stream_id, stream.return_type, stream.call)
+            self._io.recorder = recorder
+
+    @property
+    def sequence(self):
+        """ The number of stream update messages that have been processed """
+        return self._sequence
+
+    def snapshot(self, streams):
+        """ Get the values of several streams, all from the same stream
+            update message, and the sequence number of that message """
+        with self._update_lock:
+            return self._sequence, [stream.value for stream in streams]
+
     @property
     def update_condition(self):
         return self._condition
 
     def wait_for_update(self, timeout=None):
-        self._condition.wait(timeout=timeout)
+        sequence = self._sequence
+        self.wait(self._condition, lambda: self._sequence != sequence,
+                  timeout)
+
+    def wait(self, condition, updated, timeout=None):
+        """ Wait until a locked condition variable is notified, or a timeout
+            occurs. If updates are pumped instead of being received by a
+            thread, they are received on the calling thread until updated()
+            returns true. """
+        if self._io.connection is None:
+            condition.wait(timeout=timeout)
+            return
+        deadline = None if timeout is None else monotonic() + timeout
+        while not updated():
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    return
+            self.pump(remaining)
+
+    def wait_until(self, predicates, timeout=None):
+        """ Wait until one of the predicates returns a true value, or a
+            timeout occurs. The predicates are evaluated again only when one
+            of the streams they read is updated, or when any stream is
+            updated if they do not read any streams. Returns a tuple of the
+            index of the predicate and its value, or None and the value of
+            the last predicate if the timeout occurs. """
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            # Predicates are evaluated without holding the condition, as
+            # reading a stream that has not started waits for an update.
+            # Updates made after a stream is read are still seen, as the
+            # sample that was read is compared with the current one.
+            sequence = self._sequence
+            samples = {}
+            value = None
+            for i, predicate in enumerate(predicates):
+                value, streams = _evaluate(predicate)
+                if value:
+                    return i, value
+                samples.update(streams)
+
+            def updated():
+                if not samples:
+                    return self._sequence != sequence
+                return any(stream.sample is not sample
+                           for stream, sample in samples.items())
+
+            with self._condition:
+                while not updated():
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - monotonic()
+                        if remaining <= 0:
+                            return None, value
+                    self.wait(self._condition, updated, remaining)
+
+    def pump_from(self, connection):
+        """ Receive updates from the given stream connection when pump()
+            is called, instead of from a stream update thread """
+        self._io.connection = connection
+
+    def pump(self, timeout=None):
+        """ Wait until a stream update message has been received, or a
+            timeout occurs, then process all the complete messages that
+            have been received. Returns the number of messages processed.
+            If timeout is zero, does not block. """
+        connection = self._io.connection
+        if connection is None:
+            raise StreamError('Stream updates are received by a thread')
+        data = connection.receive_message_into(self._message, timeout)
+        count = 0
+        while data is not None:
+            self._process(data)
+            count += 1
+            data = connection.receive_message_into(self._message, 0)
+        return count
+
+    def receive(self, data):
+        """ Process the data for a stream update message received from
+            the server. Only one thread can call this at a time. """
+        self._message.ParseFromString(data)
+        self._process(data)
+
+    def _process(self, data):
+        """ Process a stream update message that has been parsed into
+            self._message, given the data it was parsed from """
+        timestamp = monotonic()
+
+        # Record the message before decoding its values
+        recorder = self._io.recorder
+        if recorder is not None:
+            recorder.record(data, timestamp)
+
+        # Add the data to the cache
+        self.update(self._message.results, timestamp)
+
+    @property
+    def callback_executor(self):
+        return self._callback_executor
 
     @property
     def update_callbacks(self):
         with self._update_lock:
             return self._callbacks
 
-    def add_update_callback(self, callback):
+    def add_update_callback(self, callback, policy=BLOCK, queue_size=None):
+        callback = Callback(
+            self._callback_executor, callback, policy, queue_size)
         with self._update_lock:
             self._callbacks = self._callbacks[:]
             self._callbacks.append(callback)
-            return self._callbacks
+            return callback
 
     def remove_update_callback(self, callback):
         with self._update_lock:
-            self._callbacks = [x for x in self._callbacks if x != callback]
+            self._callbacks = [x for x in self._callbacks
+                               if x.callback != callback]
             return self._callbacks
 
-    def update(self, results):
+    def update(self, results, timestamp=None):
+        # Callbacks to invoke, and their arguments
+        calls = []
         with self._update_lock:
+            self._sequence += 1
+            if timestamp is None:
+                timestamp = monotonic()
             for result in results:
                 if result.id not in self._streams:
                     continue
@@ -143,50 +484,86 @@ class StreamManager(object):
                 if result.result.HasField('error'):
                     self._update_stream(
                         result.id,
-                        self._conn._build_error(result.result.error))
+                        self._conn._build_error(result.result.error),
+                        timestamp, calls)
                     continue
 
                 # Decode the return value and store it in the cache
-                typ = self._streams[result.id].return_type
-                value = Decoder.decode(result.result.value, typ)
-                self._update_stream(result.id, value)
+                stream = self._streams[result.id]
+                if self._options.lazy_decode and stream.history is None and \
+                   not stream.callbacks:
+                    with stream.condition:
+                        stream.set_encoded_value(
+                            result.result.value, self._sequence, timestamp)
+                        stream.condition.notify_all()
+                    continue
+                value = stream.decoder(result.result.value)
+                self._update_stream(result.id, value, timestamp, calls,
+                                    result.result.value)
             with self._condition:
                 self._condition.notify_all()
-            for fn in self._callbacks:
-                fn()
-
-    def _update_stream(self, stream_id, value):
+            calls.extend((fn, ()) for fn in self._callbacks)
+        # Callbacks are invoked after releasing the lock, so that
+        # they do not stop other threads from reading streams
+        for fn, args in calls:
+            fn(*args)
+
+    def _update_stream(self, stream_id, value, timestamp, calls,
+                       encoded=None):
         stream = self._streams[stream_id]
         with stream.condition:
-            stream.value = value
+            stream.set_value(value, self._sequence, timestamp, encoded)
+            if stream.history is not None and \
+               not isinstance(value, Exception):
+                stream.history.append(value, timestamp)
             stream.condition.notify_all()
-        for fn in stream.callbacks:
-            fn(value)
+        calls.extend((fn, (value,)) for fn in stream.callbacks)
 
 
-def update_thread(manager, connection, stop):
-    while True:
+def _evaluate(predicate):
+    """ Call a predicate. Returns its value, and a dictionary mapping the
+        streams it read to the samples it read from them. """
+    previous = getattr(_tracking, 'streams', None)
+    _tracking.streams = {}
+    try:
+        value = predicate()
+        return value, _tracking.streams
+    finally:
+        _tracking.streams = previous
 
-        # Read the size and position of the update message
-        data = b''
-        while True:
-            try:
-                data += connection.partial_receive(1)
-                size = Decoder.decode_message_size(data)
-                break
-            except IndexError:
-                pass
-            except:  # noqa pylint: disable=bare-except
-                # TODO: is there a better way to catch exceptions when the
-                #      thread is forcibly stopped (e.g. by CTRL+c)?
-                return
-            if stop.is_set():
-                connection.close()
-                return
-
-        # Read and decode the update message
-        data = connection.receive(size)
-        update = Decoder.decode_message(data, KRPC.StreamUpdate)
 
-        # Add the data to the cache
-        manager.update(update.results)
+def update_thread(manager, connection, stop):
+    while True:
+        if stop.is_set():
+            connection.close()
+            return
+
+        # Receive the next update message, into the manager's reused message
+        try:
+            data = connection.receive_message_into(
+                manager._message, timeout=0.01)
+            if data is None:
+                continue
+        except:  # noqa pylint: disable=bare-except
+            # TODO: is there a better way to catch exceptions when the
+            #      thread is forcibly stopped (e.g. by CTRL+c)?
+            return
+        manager._process(data)
+
+
+class UpdateThread(object):
+    """ A daemon thread that receives stream update messages from a
+        connection, and passes them to a stream manager """
+
+    def __init__(self, manager, connection):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=update_thread, args=(manager, connection, self._stop))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """ Stop the thread, close the connection, and wait for
+            the thread to finish """
+        self._stop.set()
+        self._thread.join()
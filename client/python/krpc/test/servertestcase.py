@@ -12,10 +12,11 @@ class ServerTestCase(object):
             cls.conn = cls.connect()
 
     @staticmethod
-    def connect():
+    def connect(**kwargs):
         return krpc.connect(name='python_client_test', address='localhost',
                             rpc_port=ServerTestCase.rpc_port(),
-                            stream_port=ServerTestCase.stream_port())
+                            stream_port=ServerTestCase.stream_port(),
+                            **kwargs)
 
     @staticmethod
     def rpc_port():
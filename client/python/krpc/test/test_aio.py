@@ -0,0 +1,231 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from krpc.expression import Expression
+from krpc.recorder import Replay
+from krpc.test.servertestcase import ServerTestCase
+try:
+    import asyncio
+    import krpc.aio
+    import krpc.error
+except (ImportError, SyntaxError):
+    asyncio = None
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'requires python 3.5')
+class TestAsyncio(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(cls.loop)
+        cls.conn = cls.await_(cls.connect())
+
+    @staticmethod
+    def connect():
+        return krpc.aio.connect(
+            name='python_client_test', address='localhost',
+            rpc_port=ServerTestCase.rpc_port(),
+            stream_port=ServerTestCase.stream_port())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.await_(cls.conn.close())
+        cls.loop.close()
+
+    @classmethod
+    def await_(cls, awaitable):
+        return cls.loop.run_until_complete(awaitable)
+
+    def test_method(self):
+        self.assertEqual('3.14159', self.await_(
+            self.conn.test_service.float_to_string(3.14159)))
+
+    def test_property(self):
+        self.conn.test_service.string_property = 'foo'
+        self.assertEqual('foo', self.await_(
+            self.conn.test_service.string_property))
+
+    def test_setter_error(self):
+        obj = self.conn.test_service.TestClass(987654)
+        obj.int_property = 42
+        # The error is raised by the next call made
+        # after the response to the setter is received
+        self.await_(self.conn.test_service.float_to_string(3.14159))
+        with self.assertRaises(RuntimeError):
+            self.await_(self.conn.test_service.float_to_string(3.14159))
+        self.assertEqual('3.14159', self.await_(
+            self.conn.test_service.float_to_string(3.14159)))
+
+    def test_setter_in_batch(self):
+        self.await_(self.conn.call_many(
+            [(setattr, self.conn.test_service, 'string_property', 'bar')]))
+        self.assertEqual('bar', self.await_(
+            self.conn.test_service.string_property))
+
+    def test_client_state(self):
+        self.assertIsNone(self.conn.cache)
+        self.assertIsNone(self.conn.auto_streams)
+        self.assertEqual(['default'], self.conn.lanes)
+
+    def test_class_method(self):
+        obj = self.await_(self.conn.test_service.create_test_object('bob'))
+        self.assertEqual(
+            'bob3.14159', self.await_(obj.float_to_string(3.14159)))
+
+    def test_concurrent_calls(self):
+        results = self.await_(asyncio.gather(
+            *[self.conn.test_service.int32_to_string(i) for i in range(100)]))
+        self.assertEqual([str(i) for i in range(100)], results)
+
+    def test_exception(self):
+        with self.assertRaises(self.conn.test_service.CustomException):
+            self.await_(self.conn.test_service.throw_custom_exception())
+
+    def test_batch(self):
+        batch = self.conn.batch()
+        x = batch.add(self.conn.test_service.float_to_string, 3.14159)
+        y = batch.add(self.conn.test_service.int32_to_string, 42)
+        self.await_(batch.execute())
+        self.assertEqual('3.14159', x.result())
+        self.assertEqual('42', y.result())
+
+    def test_call_many(self):
+        self.assertEqual(['3.14159', '42'], self.await_(self.conn.call_many([
+            (self.conn.test_service.float_to_string, 3.14159),
+            (self.conn.test_service.int32_to_string, 42)])))
+
+    def test_stream(self):
+        stream = self.await_(self.conn.add_stream(
+            self.conn.test_service.float_to_string, 3.14159))
+        self.await_(stream.start())
+        self.assertEqual('3.14159', stream())
+        self.await_(stream.remove())
+
+    def test_stream_callback(self):
+        stream = self.await_(self.conn.add_stream(
+            self.conn.test_service.counter, 'TestAsyncio.callback'))
+        values = []
+        stream.add_callback(values.append)
+        self.await_(stream.start())
+        while len(values) < 3:
+            self.await_(stream.wait())
+        self.assertEqual(sorted(values), values)
+        self.await_(stream.remove())
+        with self.assertRaises(krpc.error.StreamError):
+            stream()
+
+    def test_stream_iterate(self):
+        stream = self.await_(self.conn.add_stream(
+            self.conn.test_service.counter, 'TestAsyncio.test_stream_iterate'))
+        values = stream.__aiter__()
+        previous = self.await_(values.__anext__())
+        for _ in range(3):
+            value = self.await_(values.__anext__())
+            self.assertGreater(value, previous)
+            previous = value
+        self.await_(stream.remove())
+
+    def test_wait_until(self):
+        x = self.await_(self.conn.add_stream(
+            self.conn.test_service.counter, 'TestAsyncio.test_wait_until'))
+        self.await_(x.start())
+        self.assertTrue(self.await_(self.conn.wait_until(lambda: x() >= 5)))
+        self.assertFalse(self.await_(
+            self.conn.wait_until(lambda: x() < 0, timeout=0.05)))
+        self.await_(x.remove())
+
+    def test_wait_any(self):
+        x = self.await_(self.conn.add_stream(
+            self.conn.test_service.counter, 'TestAsyncio.test_wait_any'))
+        self.await_(x.start())
+        self.assertEqual(1, self.await_(self.conn.wait_any(
+            [lambda: x() < 0, lambda: x() >= 5])))
+        self.assertIsNone(self.await_(
+            self.conn.wait_any([lambda: x() < 0], timeout=0.05)))
+        self.await_(x.remove())
+
+    def server_expression(self, conn, value):
+        expression = conn.krpc.Expression
+        one = self.await_(expression.constant_int(1))
+        other = self.await_(expression.constant_int(value))
+        return self.await_(expression.equal(one, other))
+
+    def test_add_event(self):
+        event = self.await_(self.conn.add_event(
+            self.server_expression(self.conn, 1)))
+        self.assertTrue(self.await_(event.wait(1)))
+        self.await_(event.remove())
+        with self.assertRaises(NotImplementedError):
+            self.await_(self.conn.add_event(Expression.call(
+                self.conn.test_service.float_to_string, 1.5) == '1.5'))
+
+    def test_call_array_unsupported_type(self):
+        with self.assertRaises(ValueError):
+            self.await_(self.conn.call_array(
+                (self.conn.test_service.float_to_string, 1.0)))
+
+    def test_record_streams(self):
+        path = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(path, 'recording')
+            x = self.await_(self.conn.add_stream(
+                self.conn.test_service.counter,
+                'TestAsyncio.test_record_streams'))
+            values = []
+            with self.conn.record_streams(filename):
+                iterator = x.__aiter__()
+                while len(values) < 3:
+                    values.append(self.await_(iterator.__anext__()))
+            self.await_(x.remove())
+            with Replay(filename) as replay:
+                x = replay.stream(replay.streams[0].id)
+                replayed = []
+                while replay.step() is not None:
+                    replayed.append(x())
+            for value in values:
+                self.assertIn(value, replayed)
+        finally:
+            shutil.rmtree(path)
+
+    def test_unsupported(self):
+        conn = self.conn
+        self.assertRaises(NotImplementedError, conn.fileno)
+        self.assertRaises(NotImplementedError, conn.poll_streams)
+        self.assertRaises(NotImplementedError, conn.pump_streams, 0)
+        self.assertRaises(NotImplementedError, conn.lane, 'foo')
+        self.assertRaises(NotImplementedError, conn.stream_group,
+                          [(conn.test_service.float_to_string, 1.0)])
+
+    def test_stream_updates_stopped(self):
+        conn = self.await_(self.connect())
+        try:
+            stream = self.await_(conn.add_stream(
+                conn.test_service.float_to_string, 1.5))
+            self.await_(stream.start())
+            iterator = stream.__aiter__()
+            self.assertEqual('1.5', self.await_(iterator.__anext__()))
+            event = self.await_(conn.add_event(
+                self.server_expression(conn, 2)))
+            self.await_(event.start())
+            self.await_(asyncio.sleep(0.1))
+            # Neither the stream nor the event are updated again
+            waiting = [self.loop.create_task(iterator.__anext__()),
+                       self.loop.create_task(event.wait()),
+                       self.loop.create_task(conn.wait_for_stream_update())]
+            self.await_(asyncio.sleep(0.1))
+            self.assertFalse(any(task.done() for task in waiting))
+            conn._stream_connection[1].close()
+            for task in waiting:
+                with self.assertRaises(krpc.error.ConnectionError):
+                    self.await_(task)
+            with self.assertRaises(krpc.error.ConnectionError):
+                self.await_(stream.wait())
+        finally:
+            self.await_(conn.close())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from krpc.types import Types
+from krpc.encoder import Encoder
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestArrays(unittest.TestCase):
+    types = Types()
+
+    def decode(self, value, typ, out=None):
+        return typ.array_decoder(Encoder.encode(value, typ), out)
+
+    def vector_type(self, value_type, size=3):
+        return self.types.tuple_type(*([value_type] * size))
+
+    def test_list(self):
+        typ = self.types.list_type(self.types.double_type)
+        value = self.decode([1.5, -2, 3e10], typ)
+        self.assertEqual(numpy.float64, value.dtype)
+        self.assertEqual([1.5, -2, 3e10], value.tolist())
+        value = self.decode([], typ)
+        self.assertEqual((0,), value.shape)
+
+    def test_float_list(self):
+        typ = self.types.list_type(self.types.float_type)
+        value = self.decode([1.5, -2], typ)
+        self.assertEqual(numpy.float32, value.dtype)
+        self.assertEqual([1.5, -2], value.tolist())
+
+    def test_tuple(self):
+        typ = self.vector_type(self.types.double_type)
+        value = self.decode((1, 2, 3), typ)
+        self.assertEqual((3,), value.shape)
+        self.assertEqual([1, 2, 3], value.tolist())
+
+    def test_list_of_tuples(self):
+        typ = self.types.list_type(self.vector_type(self.types.double_type))
+        value = self.decode([(1, 2, 3), (4, 5, 6)], typ)
+        self.assertEqual((2, 3), value.shape)
+        self.assertEqual([[1, 2, 3], [4, 5, 6]], value.tolist())
+        value = self.decode([], typ)
+        self.assertEqual((0, 3), value.shape)
+
+    def test_tuple_of_tuples(self):
+        typ = self.vector_type(self.vector_type(self.types.float_type), 2)
+        value = self.decode(((1, 2, 3), (4, 5, 6)), typ)
+        self.assertEqual(numpy.float32, value.dtype)
+        self.assertEqual([[1, 2, 3], [4, 5, 6]], value.tolist())
+
+    def test_special_values(self):
+        typ = self.types.list_type(self.types.double_type)
+        value = self.decode([float('inf'), float('-inf'), float('nan')], typ)
+        self.assertEqual(float('inf'), value[0])
+        self.assertEqual(float('-inf'), value[1])
+        self.assertTrue(numpy.isnan(value[2]))
+
+    def test_none(self):
+        typ = self.types.list_type(self.types.double_type)
+        self.assertIsNone(typ.array_decoder(b'\x00'))
+
+    def test_unsupported_types(self):
+        types = self.types
+        self.assertIsNone(types.double_type.array_decoder)
+        self.assertIsNone(types.list_type(types.sint32_type).array_decoder)
+        self.assertIsNone(types.list_type(types.string_type).array_decoder)
+        self.assertIsNone(
+            types.tuple_type(types.double_type,
+                             types.float_type).array_decoder)
+        self.assertIsNone(
+            types.set_type(types.double_type).array_decoder)
+        self.assertIsNone(
+            types.list_type(
+                types.list_type(types.double_type)).array_decoder)
+
+    def test_out(self):
+        typ = self.types.list_type(self.vector_type(self.types.double_type))
+        out = numpy.zeros((4, 3))
+        value = self.decode([(1, 2, 3), (4, 5, 6)], typ, out)
+        self.assertEqual((2, 3), value.shape)
+        self.assertIs(out, value.base)
+        self.assertEqual([[1, 2, 3], [4, 5, 6], [0, 0, 0], [0, 0, 0]],
+                         out.tolist())
+        self.assertRaises(ValueError, self.decode,
+                          [(1, 2, 3), (4, 5, 6)], typ, numpy.zeros((1, 3)))
+        self.assertRaises(ValueError, self.decode,
+                          [(1, 2, 3)], typ, numpy.zeros((4, 2)))
+
+    def test_out_tuple(self):
+        typ = self.vector_type(self.types.double_type)
+        out = numpy.zeros(3, dtype=numpy.float32)
+        self.assertIs(out, self.decode((1, 2, 3), typ, out))
+        self.assertEqual([1, 2, 3], out.tolist())
+        self.assertRaises(ValueError, self.decode,
+                          (1, 2, 3), typ, numpy.zeros(4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import time
+from krpc.error import StreamError
+from krpc.test.servertestcase import ServerTestCase
+
+
+class TestAutoStream(ServerTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = cls.connect(auto_stream=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def setUp(self):
+        self.conn.test_service.string_property = 'foo'
+
+    def tearDown(self):
+        self.conn.auto_streams.remove()
+        self.conn.auto_streams.idle_timeout = 5
+
+    def promoted(self):
+        return [(x.service, x.procedure)
+                for x in self.conn.auto_streams.promoted]
+
+    def test_promote(self):
+        for _ in range(10):
+            self.assertEqual('foo', self.conn.test_service.string_property)
+        self.assertEqual([], self.promoted())
+        for _ in range(10):
+            self.assertEqual('foo', self.conn.test_service.string_property)
+        self.assertEqual(
+            [('TestService', 'get_StringProperty')], self.promoted())
+        promoted = self.conn.auto_streams.promoted[0]
+        self.assertEqual('get_StringProperty', promoted.call.procedure)
+        self.assertGreater(promoted.reads, 0)
+
+    def test_class_property(self):
+        obj = self.conn.test_service.create_test_object('jeb')
+        obj.int_property = 42
+        for _ in range(20):
+            self.assertEqual(42, obj.int_property)
+        self.assertEqual(
+            [('TestService', 'TestClass_get_IntProperty')], self.promoted())
+        # Calls with different arguments are counted separately
+        obj2 = self.conn.test_service.create_test_object('bob')
+        obj2.int_property = 7
+        self.assertEqual(7, obj2.int_property)
+        self.assertEqual(1, len(self.promoted()))
+
+    def test_methods_not_promoted(self):
+        for _ in range(20):
+            self.assertEqual(
+                '3.14159', self.conn.test_service.float_to_string(3.14159))
+        self.assertEqual([], self.promoted())
+
+    def test_idle(self):
+        self.conn.auto_streams.idle_timeout = 0.05
+        for _ in range(20):
+            _ = self.conn.test_service.string_property
+        self.assertEqual(1, len(self.promoted()))
+        stream_id = list(self.conn.auto_streams._promoted.values())[0] \
+            .stream._stream.stream_id
+        time.sleep(0.1)
+        _ = self.conn.test_service.string_property
+        self.assertEqual([], self.promoted())
+        self.assertFalse(self.conn._stream_manager.has_stream(stream_id))
+
+    def test_idle_without_calls(self):
+        self.conn.auto_streams.idle_timeout = 0.05
+        for _ in range(20):
+            _ = self.conn.test_service.string_property
+        self.assertEqual(1, len(self.promoted()))
+        time.sleep(0.2)
+        self.assertEqual([], self.promoted())
+
+    def test_user_stream_is_kept(self):
+        self.conn.auto_streams.idle_timeout = 0.05
+        with self.conn.stream(getattr, self.conn.test_service,
+                              'string_property') as x:
+            for _ in range(20):
+                _ = self.conn.test_service.string_property
+            self.assertEqual(1, len(self.promoted()))
+            time.sleep(0.1)
+            _ = self.conn.test_service.string_property
+            self.assertEqual([], self.promoted())
+            self.assertEqual('foo', x())
+
+    def test_requires_stream_thread(self):
+        self.assertRaises(StreamError, self.connect,
+                          stream_thread=False, auto_stream=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+import time
+from krpc.cache import ResultCache, IMMUTABLE, TICK, NEVER, INVALIDATE
+from krpc.test.servertestcase import ServerTestCase
+
+
+class TestCache(ServerTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = cls.connect(cache={
+            'TestService.get_StringProperty': IMMUTABLE,
+            'TestService.TestClass_get_IntProperty': 10,
+            'TestService.FloatToString': NEVER
+        })
+        cls.cache = cls.conn.cache
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def setUp(self):
+        self.cache.clear()
+
+    def counts(self):
+        return self.cache.hits, self.cache.misses
+
+    def test_immutable(self):
+        self.conn.test_service.string_property = 'foo'
+        hits, misses = self.counts()
+        self.assertEqual('foo', self.conn.test_service.string_property)
+        self.assertEqual((hits, misses + 1), self.counts())
+        self.assertEqual('foo', self.conn.test_service.string_property)
+        self.assertEqual((hits + 1, misses + 1), self.counts())
+        # Immutable results are kept, even if the property is set
+        self.conn.test_service.string_property = 'bar'
+        self.assertEqual('foo', self.conn.test_service.string_property)
+        self.cache.clear()
+        self.assertEqual('bar', self.conn.test_service.string_property)
+
+    def test_time_limit(self):
+        obj = self.conn.test_service.create_test_object('jeb')
+        obj.int_property = 42
+        self.assertEqual(42, obj.int_property)
+        hits, misses = self.counts()
+        self.assertEqual(42, obj.int_property)
+        self.assertEqual((hits + 1, misses), self.counts())
+        self.cache.set_policy('TestService.TestClass_get_IntProperty', 0.05)
+        self.assertEqual(42, obj.int_property)
+        time.sleep(0.1)
+        hits, misses = self.counts()
+        self.assertEqual(42, obj.int_property)
+        self.assertEqual((hits, misses + 1), self.counts())
+        self.cache.set_policy('TestService.TestClass_get_IntProperty', 10)
+
+    def test_calls_invalidate(self):
+        obj = self.conn.test_service.create_test_object('jeb')
+        obj.int_property = 1
+        self.assertEqual(1, obj.int_property)
+        obj.int_property = 2
+        self.assertEqual(2, obj.int_property)
+        self.assertEqual(2, obj.int_property)
+        # Procedures with a policy do not invalidate results
+        hits, misses = self.counts()
+        self.conn.test_service.float_to_string(3.14159)
+        self.assertEqual(2, obj.int_property)
+        self.assertEqual((hits + 1, misses), self.counts())
+        # Calls that are not setters and have no policy
+        # do not invalidate results
+        self.conn.test_service.create_test_object('bob')
+        self.assertEqual(2, obj.int_property)
+        self.assertEqual((hits + 2, misses), self.counts())
+        # Calls to procedures with the invalidate policy invalidate results
+        self.cache.set_policy('TestService.FloatToString', INVALIDATE)
+        self.assertEqual(2, obj.int_property)
+        hits, misses = self.counts()
+        self.conn.test_service.float_to_string(3.14159)
+        self.assertEqual(2, obj.int_property)
+        self.assertEqual((hits, misses + 1), self.counts())
+        self.cache.set_policy('TestService.FloatToString', NEVER)
+        # Batches of calls that do not change the game
+        # do not invalidate results
+        self.assertEqual(2, obj.int_property)
+        hits, misses = self.counts()
+        self.conn.call_many([
+            (self.conn.test_service.float_to_string, 1.0),
+            (getattr, obj, 'int_property')])
+        self.assertEqual(2, obj.int_property)
+        self.assertEqual((hits + 1, misses), self.counts())
+        # Batches containing setters invalidate results
+        with self.conn.batch() as batch:
+            batch.add(setattr, obj, 'int_property', 3)
+        self.assertEqual(3, obj.int_property)
+        self.assertEqual((hits + 1, misses + 1), self.counts())
+        # Batches containing calls to procedures with
+        # the invalidate policy invalidate results
+        self.cache.set_policy('TestService.FloatToString', INVALIDATE)
+        self.conn.call_many([(self.conn.test_service.float_to_string, 1.0)])
+        self.assertEqual(3, obj.int_property)
+        self.assertEqual((hits + 1, misses + 2), self.counts())
+
+    def test_arguments(self):
+        obj1 = self.conn.test_service.create_test_object('jeb')
+        obj2 = self.conn.test_service.create_test_object('bob')
+        obj1.int_property = 1
+        obj2.int_property = 2
+        self.assertEqual(1, obj1.int_property)
+        self.assertEqual(2, obj2.int_property)
+        self.assertEqual(2, self.cache.size)
+
+    def test_least_recently_used(self):
+        objs = [self.conn.test_service.create_test_object(str(i))
+                for i in range(3)]
+        for i, obj in enumerate(objs):
+            obj.int_property = i
+        self.cache.max_size = 2
+        try:
+            for i, obj in enumerate(objs):
+                self.assertEqual(i, obj.int_property)
+            self.assertEqual(2, self.cache.size)
+            hits, misses = self.counts()
+            self.assertEqual(2, objs[2].int_property)
+            self.assertEqual(0, objs[0].int_property)
+            self.assertEqual((hits + 1, misses + 1), self.counts())
+        finally:
+            self.cache.max_size = 4096
+
+    def test_tick(self):
+        # The test server does not provide the universal time,
+        # so results with a tick policy are not cached
+        self.cache.set_policy('TestService.get_StringProperty', TICK)
+        try:
+            hits, misses = self.counts()
+            self.conn.test_service.string_property = 'foo'
+            self.assertEqual('foo', self.conn.test_service.string_property)
+            self.assertEqual('foo', self.conn.test_service.string_property)
+            self.assertEqual((hits, misses), self.counts())
+        finally:
+            self.cache.set_policy('TestService.get_StringProperty', IMMUTABLE)
+
+    def test_policies(self):
+        self.assertEqual(
+            IMMUTABLE, self.cache.policy('SpaceCenter.CelestialBody_get_Name'))
+        self.assertEqual(
+            IMMUTABLE, self.cache.policy('TestService.get_StringProperty'))
+        self.assertIsNone(self.cache.policy('TestService.AddToObjectList'))
+        self.assertRaises(ValueError, self.cache.set_policy,
+                          'TestService.get_StringProperty', 'foo')
+        self.assertRaises(ValueError, self.cache.set_policy,
+                          'TestService.get_StringProperty', -1)
+        self.assertRaises(ValueError, ResultCache, self.conn, {'a.b': True})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from krpc.calltemplate import CallTemplate
+from krpc.encoder import Encoder
+from krpc.types import Types, DefaultArgument
+import krpc.schema.KRPC_pb2 as KRPC
+
+
+class TestCallTemplate(unittest.TestCase):
+    types = Types()
+
+    def template(self, *param_types):
+        return CallTemplate(self.types, 'ServiceName', 'ProcedureName',
+                            list(param_types), None)
+
+    def expected_call(self, *args):
+        call = KRPC.ProcedureCall()
+        call.service = 'ServiceName'
+        call.procedure = 'ProcedureName'
+        for position, (value, typ) in enumerate(args):
+            call.arguments.add(position=position,
+                               value=Encoder.encode(value, typ))
+        return call
+
+    def test_no_arguments(self):
+        template = self.template()
+        request = KRPC.Request()
+        request.calls.extend([self.expected_call()])
+        self.assertEqual(Encoder.encode_message_with_size(request),
+                         template.encode_request([]))
+
+    def test_arguments(self):
+        obj_type = self.types.class_type('ServiceName', 'ClassName')
+        obj = obj_type.python_type(42)
+        template = self.template(
+            self.types.string_type, self.types.double_type, obj_type,
+            self.types.list_type(self.types.sint32_type))
+        args = ['foo', 3.14159, obj, [1, 2, 3]]
+        expected = self.expected_call(
+            *zip(args, template.param_types))
+        self.assertEqual(expected, template.build_call(args))
+        request = KRPC.Request()
+        request.calls.extend([expected])
+        self.assertEqual(Encoder.encode_message_with_size(request),
+                         template.encode_request(args))
+
+    def test_ids(self):
+        template = CallTemplate(
+            self.types, 'ServiceName', 'ProcedureName',
+            [self.types.string_type], None, service_id=2, procedure_id=42)
+        expected = KRPC.ProcedureCall()
+        expected.service_id = 2
+        expected.procedure_id = 42
+        expected.arguments.add(
+            position=0, value=Encoder.encode('foo', self.types.string_type))
+        self.assertEqual(expected, template.build_call(['foo']))
+        request = KRPC.Request()
+        request.calls.extend([expected])
+        self.assertEqual(Encoder.encode_message_with_size(request),
+                         template.encode_request(['foo']))
+        self.assertLess(len(template.encode_request(['foo'])),
+                        len(self.template(self.types.string_type)
+                            .encode_request(['foo'])))
+
+    def test_encoded_call(self):
+        template = self.template(self.types.string_type)
+        call = template.encode_call(['foo'])
+        self.assertEqual(template.encode_request(['foo']),
+                         template.encode_request_for(call))
+        self.assertEqual(template.build_call(['foo']),
+                         template.build_call_from(call))
+
+    def test_getter(self):
+        string_type = self.types.string_type
+        for service, procedure, return_type, getter in (
+                ('ServiceName', 'get_Foo', string_type, True),
+                ('ServiceName', 'ClassName_get_Foo', string_type, True),
+                ('ServiceName', 'set_Foo', None, False),
+                ('ServiceName', 'ProcedureName', string_type, False),
+                ('KRPC', 'get_Clients', string_type, False)):
+            template = CallTemplate(
+                self.types, service, procedure, [], return_type)
+            self.assertEqual(getter, template.getter)
+
+    def test_default_argument(self):
+        template = self.template(
+            self.types.sint32_type, self.types.sint32_type)
+        call = template.build_call([42, DefaultArgument('0')])
+        self.assertEqual(1, len(call.arguments))
+        self.assertEqual(0, call.arguments[0].position)
+
+    def test_coerce_argument(self):
+        template = self.template(self.types.double_type)
+        self.assertEqual(
+            self.expected_call((42.0, self.types.double_type)),
+            template.build_call([42]))
+
+    def test_invalid_argument(self):
+        template = self.template(self.types.double_type)
+        self.assertRaises(TypeError, template.build_call, ['foo'])
+
+    def test_repeated_argument(self):
+        typ = self.types.list_type(self.types.sint32_type)
+        template = self.template(typ)
+        value = [1, 2]
+        template.build_call([value])
+        value.append(3)
+        self.assertEqual(self.expected_call(([1, 2, 3], typ)),
+                         template.build_call([value]))
+
+    def test_repeated_message_argument(self):
+        typ = self.types.procedure_call_type
+        template = self.template(typ)
+        value = KRPC.ProcedureCall(service='Foo', procedure='Bar')
+        template.build_call([value])
+        value.procedure = 'Baz'
+        self.assertEqual(self.expected_call((value, typ)),
+                         template.build_call([value]))
+
+    def test_primary(self):
+        self.assertFalse(self.template().primary)
+        self.assertTrue(CallTemplate(
+            self.types, 'KRPC', 'GetStatus', [], None).primary)
+        event_type = self.types.as_type(KRPC.Type(code=KRPC.Type.EVENT))
+        template = CallTemplate(self.types, 'ServiceName', 'OnTimer',
+                                [self.types.uint32_type], event_type)
+        self.assertTrue(template.primary)
+        self.assertFalse(template.getter)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -113,6 +113,34 @@ class TestClient(ServerTestCase, unittest.TestCase):
         self.conn.test_service.object_property = None
         self.assertIsNone(self.conn.test_service.object_property)
 
+    def test_class_identity(self):
+        obj = self.conn.test_service.create_test_object('bob')
+        self.assertIs(obj, self.conn.test_service.echo_test_object(obj))
+        obj2 = self.conn.test_service.create_test_object('bill')
+        self.assertIsNot(obj, obj2)
+
+    def test_call_array_unsupported_type(self):
+        self.assertRaises(ValueError, self.conn.call_array,
+                          (self.conn.test_service.float_to_string, 1.0))
+        self.assertRaises(ValueError, self.conn.call_array,
+                          (getattr, self.conn.test_service, 'string_property'))
+
+    def test_shared_schema(self):
+        conn = self.connect()
+        try:
+            self.assertIs(self.conn._schema, conn._schema)
+            self.assertIs(self.conn.test_service.TestEnum,
+                          conn.test_service.TestEnum)
+            self.assertIsNot(self.conn.test_service.TestClass,
+                             conn.test_service.TestClass)
+            obj = conn.test_service.create_test_object('jeb')
+            self.assertIsNot(
+                obj, self.conn.test_service.create_test_object('jeb'))
+            self.assertIsInstance(conn.test_service.enum_return(),
+                                  self.conn.test_service.TestEnum)
+        finally:
+            conn.close()
+
     def test_class_none_value_when_not_allowed(self):
         with self.assertRaises(krpc.error.RPCError) as cm:
             self.conn.test_service.return_null_when_not_allowed()
@@ -321,12 +349,98 @@ class TestClient(ServerTestCase, unittest.TestCase):
         self.assertTrue(
             str(cm.exception).startswith('A custom kRPC exception'))
 
+    def test_batch(self):
+        service = self.conn.test_service
+        obj = service.create_test_object('jeb')
+        obj.int_property = 42
+        with self.conn.batch() as batch:
+            result0 = batch.add(service.float_to_string, 3.14159)
+            result1 = batch.add(getattr, obj, 'int_property')
+            result2 = batch.add(obj.float_to_string, 3.14159)
+            result3 = batch.add(service.TestClass.static_method, 'foo')
+            self.assertEqual(4, len(batch))
+            self.assertFalse(result0.done())
+        self.assertTrue(result0.done())
+        self.assertEqual('3.14159', result0.result())
+        self.assertEqual(42, result1.result())
+        self.assertEqual('jeb3.14159', result2.result())
+        self.assertEqual('jebfoo', result3.result())
+
+    def test_batch_exceptions(self):
+        with self.conn.batch() as batch:
+            result0 = batch.add(
+                self.conn.test_service.throw_invalid_operation_exception)
+            result1 = batch.add(self.conn.test_service.bool_to_string, True)
+            result2 = batch.add(self.conn.test_service.throw_custom_exception)
+        with self.assertRaises(RuntimeError) as cm:
+            result0.result()
+        self.assertTrue(str(cm.exception).startswith('Invalid operation'))
+        self.assertEqual('True', result1.result())
+        self.assertIsInstance(
+            result2.exception(), self.conn.test_service.CustomException)
+
+    def test_batch_setters(self):
+        service = self.conn.test_service
+        obj = service.create_test_object('jeb')
+        with self.conn.batch() as batch:
+            result0 = batch.add(setattr, obj, 'int_property', 7)
+            result1 = batch.add(setattr, service, 'string_property', 'bar')
+        self.assertIsNone(result0.result())
+        self.assertIsNone(result1.result())
+        self.assertEqual(7, obj.int_property)
+        self.assertEqual('bar', service.string_property)
+
+    def test_batch_not_executed(self):
+        with self.assertRaises(ValueError):
+            with self.conn.batch() as batch:
+                result = batch.add(self.conn.test_service.bool_to_string,
+                                   True)
+                raise ValueError()
+        with self.assertRaises(krpc.error.RPCError) as cm:
+            result.result(timeout=1)
+        self.assertEqual('Batch was not executed', str(cm.exception))
+        self.assertRaises(krpc.error.RPCError, batch.execute)
+
+    def test_batch_send_error(self):
+        conn = self.connect()
+        batch = conn.batch()
+        result = batch.add(conn.test_service.bool_to_string, True)
+        conn.close()
+        self.assertRaises(socket.error, batch.execute)
+        self.assertTrue(result.done())
+        self.assertRaises(socket.error, result.result)
+
+    def test_batch_executed_twice(self):
+        batch = self.conn.batch()
+        batch.add(self.conn.test_service.bool_to_string, True)
+        batch.execute()
+        self.assertRaises(krpc.error.RPCError, batch.execute)
+        self.assertRaises(krpc.error.RPCError, batch.add,
+                          self.conn.test_service.bool_to_string, True)
+
+    def test_call_many(self):
+        self.assertEqual(
+            ['3.14159', '42', 'False'],
+            self.conn.call_many([
+                (self.conn.test_service.float_to_string, 3.14159),
+                (self.conn.test_service.int32_to_string, 42),
+                (self.conn.test_service.bool_to_string, False)]))
+        self.assertEqual([], self.conn.call_many([]))
+        with self.assertRaises(ValueError):
+            self.conn.call_many([
+                (self.conn.test_service.bool_to_string, False),
+                (self.conn.test_service.throw_argument_exception,)])
+
     def test_client_members(self):
         self.assertSetEqual(
             set(['krpc', 'test_service', 'stream', 'add_stream',
                  'stream_update_condition', 'wait_for_stream_update',
                  'add_stream_update_callback', 'remove_stream_update_callback',
-                 'get_call', 'close']),
+                 'get_call', 'batch', 'call_many', 'lane', 'lanes',
+                 'stream_group', 'record_streams', 'fileno', 'poll_streams',
+                 'pump_streams', 'add_event', 'wait_until', 'wait_any',
+                 'auto_streams', 'cache', 'call_array',
+                 'close']),
             set(x for x in dir(self.conn) if not x.startswith('_')))
 
     def test_krpc_service_members(self):
@@ -448,6 +562,34 @@ class TestClient(ServerTestCase, unittest.TestCase):
             self.conn.test_service.string_property = string
             self.assertEqual(string, self.conn.test_service.string_property)
 
+    def test_lazy_members(self):
+        conn = self.connect()
+        service_type = type(conn.test_service)
+        self.assertNotIn('float_to_string', service_type.__dict__)
+        self.assertIn('float_to_string', dir(conn.test_service))
+        self.assertEqual(
+            '3.14159', conn.test_service.float_to_string(3.14159))
+        self.assertIn('float_to_string', service_type.__dict__)
+        obj = conn.test_service.create_test_object('bob')
+        self.assertNotIn('int_property', type(obj).__dict__)
+        obj.int_property = 42
+        # Remote objects have no __dict__ that a value could be stored in
+        self.assertFalse(hasattr(obj, '__dict__'))
+        self.assertEqual(42, obj.int_property)
+        self.assertFalse(hasattr(conn.test_service, 'foo'))
+        self.assertFalse(hasattr(conn.test_service.TestClass, 'foo'))
+        conn.close()
+
+    def test_connect_services(self):
+        conn = self.connect(services=['TestService'])
+        self.assertTrue(hasattr(conn, 'krpc'))
+        self.assertTrue(hasattr(conn, 'test_service'))
+        conn.close()
+        conn = self.connect(services=[])
+        self.assertTrue(hasattr(conn, 'krpc'))
+        self.assertFalse(hasattr(conn, 'test_service'))
+        conn.close()
+
     def test_types_from_different_connections(self):
         conn1 = self.connect()
         conn2 = self.connect()
@@ -2,6 +2,8 @@ import unittest
 import threading
 import socket
 from krpc.connection import Connection
+from krpc.encoder import Encoder
+import krpc.schema.KRPC_pb2 as KRPC
 
 
 def server_thread(started):
@@ -80,6 +82,44 @@ class TestConnection(unittest.TestCase):
         self.assertEqual(message[len(partial):],
                          conn.receive(len(message) - len(partial)))
 
+    def test_receive_message(self):
+        conn = self.connect()
+        status = KRPC.Status(version='1.2.3', bytes_read=42)
+        conn.send_message(status)
+        self.assertEqual(status, conn.receive_message(KRPC.Status))
+
+    def test_receive_multiple_messages(self):
+        conn = self.connect()
+        messages = [KRPC.Status(version=str(i), rpcs_executed=i)
+                    for i in range(100)]
+        conn.send(b''.join(
+            Encoder.encode_message_with_size(x) for x in messages))
+        for message in messages:
+            self.assertEqual(message, conn.receive_message(KRPC.Status))
+
+    def test_receive_large_message(self):
+        conn = Connection('localhost', server_thread.port, buffer_size=16)
+        conn.connect()
+        status = KRPC.Status(version='x' * 1000)
+        conn.send_message(status)
+        conn.send_message(status)
+        self.assertEqual(status, conn.receive_message(KRPC.Status))
+        self.assertEqual(status, conn.receive_message(KRPC.Status))
+
+    def test_receive_message_into(self):
+        conn = self.connect()
+        status = KRPC.Status(version='1.2.3')
+        received = KRPC.Status(version='foo', bytes_read=42)
+        conn.send_message(status)
+        self.assertEqual(status.SerializeToString(),
+                         conn.receive_message_into(received))
+        self.assertEqual(status, received)
+
+    def test_receive_message_into_timeout(self):
+        conn = self.connect()
+        received = KRPC.Status()
+        self.assertIsNone(conn.receive_message_into(received, timeout=0.01))
+
     def test_receive_on_remote_closed_connection(self):
         conn = self.connect()
         self.server_close_connection(conn)
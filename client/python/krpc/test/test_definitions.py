@@ -0,0 +1,107 @@
+import copy
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from krpc.definitions import Definitions
+import krpc.schema.KRPC_pb2 as KRPC
+
+
+class TestDefinitions(unittest.TestCase):
+
+    defs = {
+        'ServiceName': {
+            'id': 2,
+            'documentation': '',
+            'procedures': {
+                'ProcedureA': {'id': 1, 'parameters': []},
+                'ProcedureB': {'id': 2, 'parameters': []}
+            }
+        }
+    }
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def service(self, *procedures):
+        service = KRPC.Service()
+        service.name = 'ServiceName'
+        for name in procedures:
+            service.procedures.add(name=name)
+        return service
+
+    def test_ids(self):
+        definitions = Definitions(self.defs)
+        self.assertEqual(['ServiceName'], definitions.services)
+        self.assertEqual(
+            (2, {'ProcedureA': 1, 'ProcedureB': 2}),
+            definitions.ids(self.service('ProcedureA', 'ProcedureB')))
+
+    def test_mismatched_procedures(self):
+        definitions = Definitions(self.defs)
+        self.assertIsNone(definitions.ids(self.service('ProcedureA')))
+        self.assertIsNone(definitions.ids(
+            self.service('ProcedureA', 'ProcedureB', 'ProcedureC')))
+
+    def test_reordered_procedures(self):
+        definitions = Definitions(self.defs)
+        self.assertIsNone(
+            definitions.ids(self.service('ProcedureB', 'ProcedureA')))
+
+    def test_mismatched_signatures(self):
+        defs = copy.deepcopy(self.defs)
+        defs['ServiceName']['procedures']['ProcedureA']['parameters'] = [
+            {'name': 'x', 'type': {'code': 'DOUBLE'}}]
+        definitions = Definitions(defs)
+        service = self.service('ProcedureA', 'ProcedureB')
+        self.assertIsNone(definitions.ids(service))
+        parameter = service.procedures[0].parameters.add(name='x')
+        parameter.type.code = KRPC.Type.FLOAT
+        self.assertIsNone(definitions.ids(service))
+        parameter.type.code = KRPC.Type.DOUBLE
+        self.assertIsNotNone(definitions.ids(service))
+        service.procedures[1].return_type.code = KRPC.Type.STRING
+        self.assertIsNone(definitions.ids(service))
+
+    def test_names_only(self):
+        defs = copy.deepcopy(self.defs)
+        for procedure in defs['ServiceName']['procedures'].values():
+            del procedure['parameters']
+        definitions = Definitions(defs)
+        service = self.service('ProcedureA', 'ProcedureB')
+        service.procedures[0].parameters.add(name='x')
+        self.assertIsNotNone(definitions.ids(service))
+        self.assertIsNone(
+            definitions.ids(self.service('ProcedureB', 'ProcedureA')))
+
+    def test_unknown_service(self):
+        service = self.service('ProcedureA', 'ProcedureB')
+        service.name = 'OtherService'
+        self.assertIsNone(Definitions(self.defs).ids(service))
+
+    def test_load(self):
+        filename = os.path.join(self.path, 'ServiceName.json')
+        with open(filename, 'w') as handle:
+            json.dump(self.defs, handle)
+        service = self.service('ProcedureA', 'ProcedureB')
+        self.assertIsNotNone(Definitions.load(filename).ids(service))
+        self.assertIsNotNone(Definitions.load(self.path).ids(service))
+        self.assertIsNotNone(Definitions.load([self.path]).ids(service))
+
+    def test_to_json(self):
+        definitions = Definitions(Definitions(self.defs).to_json())
+        service = self.service('ProcedureA', 'ProcedureB')
+        self.assertEqual(
+            (2, {'ProcedureA': 1, 'ProcedureB': 2}),
+            definitions.ids(service))
+        # The fingerprint of the signatures is kept
+        service.procedures[0].parameters.add(name='x')
+        self.assertIsNone(definitions.ids(service))
+
+
+if __name__ == '__main__':
+    unittest.main()
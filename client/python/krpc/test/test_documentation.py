@@ -31,6 +31,16 @@ class TestDocumentation(ServerTestCase, unittest.TestCase):
         self.assertEqual('Enum ValueC documentation string.',
                          self.conn.test_service.TestEnum.value_c.__doc__)
 
+    def test_no_docs(self):
+        with self.connect(docs=False) as conn:
+            self.assertIsNone(conn.test_service.__doc__)
+            self.assertIsNone(conn.test_service.float_to_string.__doc__)
+            self.assertIsNone(conn.test_service.TestClass.__doc__)
+            self.assertIsNone(conn.test_service.TestEnum.__doc__)
+            self.assertIsNone(conn.test_service.TestEnum.value_a.__doc__)
+            self.assertEqual(
+                '3.14159', conn.test_service.float_to_string(3.14159))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -150,6 +150,28 @@ class TestEncodeDecode(unittest.TestCase):
         self._run_test_encode_value(typ, cases)
         self._run_test_decode_value(typ, cases)
 
+    def test_tuple_of_doubles(self):
+        cases = [((1.0, -2.5, 0.0),
+                  '0a08000000000000f03f' +
+                  '0a0800000000000004c0' +
+                  '0a080000000000000000')]
+        typ = self.types.tuple_type(
+            self.types.double_type,
+            self.types.double_type,
+            self.types.double_type)
+        self._run_test_encode_value(typ, cases)
+        self._run_test_decode_value(typ, cases)
+
+    def test_list_of_floats(self):
+        cases = [
+            ([], ''),
+            ([1.0], '0a040000803f'),
+            ([1.0, -2.5], '0a040000803f0a04000020c0')
+        ]
+        typ = self.types.list_type(self.types.float_type)
+        self._run_test_encode_value(typ, cases)
+        self._run_test_decode_value(typ, cases)
+
     def test_list(self):
         cases = [
             ([], ''),
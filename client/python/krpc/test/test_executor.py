@@ -0,0 +1,130 @@
+import sys
+import threading
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+from krpc.executor import CallbackExecutor, Callback, IMMEDIATE, \
+    LATEST, DROP_OLDEST, BLOCK, DEFAULT_QUEUE_SIZE
+
+
+class TestExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = CallbackExecutor(2)
+        self.values = []
+        # Set to let the callback return
+        self.release = threading.Event()
+        # Set when the callback has started
+        self.started = threading.Event()
+        self.done = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown()
+
+    def callback(self, value):
+        self.started.set()
+        self.release.wait()
+        self.values.append(value)
+        if value == 9:
+            self.done.set()
+
+    def run_callback(self, policy, queue_size=None):
+        callback = Callback(self.executor, self.callback, policy, queue_size)
+        callback(0)
+        self.started.wait()
+        for i in range(1, 10):
+            callback(i)
+        self.release.set()
+        self.done.wait(1)
+        return callback
+
+    def test_immediate(self):
+        callback = Callback(IMMEDIATE, self.values.append)
+        callback(1)
+        callback(2)
+        self.assertEqual([1, 2], self.values)
+        self.assertEqual(0, callback.dropped)
+
+    def test_latest(self):
+        callback = self.run_callback(LATEST)
+        self.assertEqual([0, 9], self.values)
+        self.assertEqual(1, callback.queue_size)
+        self.assertEqual(8, callback.dropped)
+        self.assertEqual(0, callback.pending)
+
+    def test_drop_oldest(self):
+        callback = self.run_callback(DROP_OLDEST, 3)
+        self.assertEqual([0, 7, 8, 9], self.values)
+        self.assertEqual(6, callback.dropped)
+
+    def test_block_default_size(self):
+        callback = self.run_callback(BLOCK)
+        self.assertEqual(list(range(10)), self.values)
+        self.assertEqual(DEFAULT_QUEUE_SIZE, callback.queue_size)
+        self.assertEqual(0, callback.dropped)
+
+    def test_drop_oldest_default_size(self):
+        callback = Callback(self.executor, self.callback, DROP_OLDEST)
+        self.assertEqual(DEFAULT_QUEUE_SIZE, callback.queue_size)
+        callback(0)
+        self.started.wait()
+        for i in range(DEFAULT_QUEUE_SIZE + 5):
+            callback(i)
+        self.assertEqual(DEFAULT_QUEUE_SIZE, callback.pending)
+        self.assertEqual(5, callback.dropped)
+
+    def test_block(self):
+        callback = Callback(self.executor, self.callback, BLOCK, 2)
+        callback(0)
+        self.started.wait()
+        callback(1)
+        callback(2)
+        blocked = threading.Thread(target=callback, args=(3,))
+        blocked.start()
+        blocked.join(0.1)
+        self.assertTrue(blocked.is_alive())
+        self.release.set()
+        blocked.join(1)
+        self.assertFalse(blocked.is_alive())
+        callback(9)
+        self.done.wait(1)
+        self.assertEqual([0, 1, 2, 3, 9], self.values)
+        self.assertEqual(0, callback.dropped)
+
+    def test_exception(self):
+        self.release.set()
+
+        def callback(value):
+            if value == 0:
+                raise RuntimeError('error')
+            self.callback(value)
+
+        stderr = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            callback = Callback(self.executor, callback)
+            callback(0)
+            callback(9)
+            self.done.wait(1)
+            self.assertIn('RuntimeError: error', sys.stderr.getvalue())
+        finally:
+            sys.stderr = stderr
+        self.assertEqual([9], self.values)
+
+    def test_invalid_policy(self):
+        self.assertRaises(
+            ValueError, Callback, self.executor, self.callback, 'foo')
+        self.assertRaises(
+            ValueError, Callback, self.executor, self.callback, BLOCK, 0)
+
+    def test_shutdown(self):
+        self.executor.shutdown()
+        self.assertRaises(
+            RuntimeError, self.executor.submit, self.callback, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import threading
+import unittest
+from krpc.expression import Expression
+from krpc.types import Types
+from krpc.test.servertestcase import ServerTestCase
+
+
+class _Constructors(object):
+    """ Records calls to the KRPC.Expression and KRPC.Type constructors,
+        returning a tuple of the constructor name and its arguments """
+
+    def __getattr__(self, name):
+        return lambda *args: (name,) + args
+
+
+class _KRPC(object):
+    """ The parts of the KRPC service used to compile expressions """
+    Expression = _Constructors()
+    Type = _Constructors()
+
+
+class _Client(object):
+    types = Types()
+    krpc = _KRPC()
+
+    @staticmethod
+    def get_call(func, *args):
+        return (func.__name__,) + args
+
+    def _get_return_type(self, func, *args):  # pylint: disable=unused-argument
+        return getattr(self.types, func.__name__ + '_type')
+
+
+def altitude():
+    pass
+
+
+altitude.__name__ = 'double'
+
+
+def stage():
+    pass
+
+
+stage.__name__ = 'sint32'
+
+
+class TestExpression(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = _Client()
+
+    def compile(self, expression):
+        return expression.compile(self.conn)
+
+    def test_comparison(self):
+        self.assertEqual(
+            ('greater_than', ('call', ('double',)),
+             ('constant_double', 70000.0)),
+            self.compile(Expression.call(altitude) > 70000))
+        self.assertEqual(
+            ('less_than_or_equal', ('call', ('sint32', 1)),
+             ('constant_int', 3)),
+            self.compile(Expression.call(stage, 1) <= 3))
+
+    def test_reflected(self):
+        self.assertEqual(
+            ('subtract', ('constant_double', 1.0), ('call', ('double',))),
+            self.compile(1 - Expression.call(altitude)))
+
+    def test_logical(self):
+        x = Expression.call(altitude)
+        self.assertEqual(
+            ('or_',
+             ('and_',
+              ('greater_than', ('call', ('double',)),
+               ('constant_double', 1.0)),
+              ('not_', ('equal', ('call', ('sint32',)),
+                        ('constant_int', 2)))),
+             ('constant_bool', True)),
+            self.compile(
+                (x > 1) & ~(Expression.call(stage) == 2) | True))
+
+    def test_arithmetic_type(self):
+        x = Expression.call(altitude)
+        self.assertEqual(
+            ('greater_than',
+             ('multiply', ('call', ('double',)), ('constant_double', 2.0)),
+             ('constant_double', 5.0)),
+            self.compile(x * 2 > 5))
+
+    def test_constant(self):
+        self.assertEqual(('constant_float', 1.0),
+                         self.compile(Expression.constant(1, 'float')))
+        self.assertEqual(('constant_string', 'foo'),
+                         self.compile(Expression.constant('foo')))
+        self.assertRaises(ValueError, Expression.constant, 1, 'foo')
+
+    def test_aggregates(self):
+        x = Expression.call(altitude)
+        self.assertEqual(('count', ('call', ('double',))),
+                         self.compile(x.count()))
+        self.assertEqual(('get', ('call', ('double',)), ('constant_int', 0)),
+                         self.compile(x[0]))
+        self.assertEqual(
+            ('contains', ('call', ('double',)), ('constant_double', 1.5)),
+            self.compile(x.contains(1.5)))
+
+    def test_where(self):
+        compiled = self.compile(
+            Expression.call(altitude).where(lambda x: x > 1, 'double'))
+        self.assertEqual('where', compiled[0])
+        function = compiled[2]
+        self.assertEqual('function', function[0])
+        parameter = function[1][0]
+        self.assertEqual('parameter', parameter[0])
+        self.assertEqual(('double',), parameter[2])
+        self.assertEqual(
+            ('greater_than', parameter, ('constant_double', 1.0)),
+            function[2])
+
+    def test_shared_nodes(self):
+        x = Expression.call(altitude)
+        compiled = self.compile((x > 1) & (x < 2))
+        self.assertIs(compiled[1][1], compiled[2][1])
+
+    def test_not_a_bool(self):
+        x = Expression.call(altitude)
+        self.assertRaises(TypeError, bool, x > 1)
+        with self.assertRaises(TypeError):
+            _ = 1 < x < 2
+
+    def test_not_iterable(self):
+        x = Expression.call(altitude)
+        self.assertRaises(TypeError, iter, x)
+        self.assertRaises(TypeError, list, x)
+        with self.assertRaises(TypeError):
+            _ = 1 in x
+
+
+class TestExpressionEvent(ServerTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestExpressionEvent, cls).setUpClass()
+
+    def test_add_event(self):
+        counter = Expression.call(
+            self.conn.test_service.counter, 'TestExpressionEvent')
+        event = self.conn.add_event(
+            (counter > 5) & (counter * 2 < 100))
+        with event.condition:
+            event.wait()
+            self.assertTrue(event.stream())
+
+    def test_callback(self):
+        called = threading.Event()
+        event = self.conn.add_event(
+            Expression.call(self.conn.test_service.float_to_string,
+                            1.5) == '1.5')
+        event.add_callback(called.set)
+        event.start()
+        self.assertTrue(called.wait(3))
+
+    def test_server_expression(self):
+        expression = self.conn.krpc.Expression
+        event = self.conn.add_event(expression.equal(
+            expression.constant_int(1), expression.constant_int(1)))
+        with event.condition:
+            event.wait()
+            self.assertTrue(event.stream())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import threading
+import unittest
+from krpc.types import Types
+try:
+    import numpy
+    from krpc.history import History
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestHistory(unittest.TestCase):
+    types = Types()
+
+    def history(self, capacity, typ):
+        return History(capacity, typ, threading.RLock())
+
+    def test_empty(self):
+        history = self.history(4, self.types.double_type)
+        self.assertEqual(0, len(history))
+        self.assertEqual(0, len(history.recent()))
+        self.assertEqual(0, len(history.times()))
+
+    def test_values(self):
+        history = self.history(4, self.types.double_type)
+        for i in range(3):
+            history.append(float(i), 10.0 + i)
+        self.assertEqual(3, len(history))
+        self.assertEqual(numpy.float64, history.recent().dtype)
+        self.assertEqual([0, 1, 2], history.recent().tolist())
+        self.assertEqual([11, 12], history.times(2).tolist())
+
+    def test_wrap_around(self):
+        history = self.history(4, self.types.sint32_type)
+        for i in range(11):
+            history.append(i, float(i))
+            expected = list(range(max(0, i - 3), i + 1))
+            self.assertEqual(expected, history.recent().tolist())
+            self.assertEqual(expected, history.times().tolist())
+        self.assertEqual(4, len(history))
+        self.assertEqual(11, history.count)
+        self.assertEqual([9, 10], history.recent(2).tolist())
+        self.assertEqual([7, 8, 9, 10], history.recent(100).tolist())
+
+    def test_views(self):
+        history = self.history(4, self.types.double_type)
+        for i in range(6):
+            history.append(float(i), 0.0)
+        values = history.recent()
+        self.assertIsNotNone(values.base)
+        self.assertFalse(values.flags.owndata)
+
+    def test_tuple(self):
+        typ = self.types.tuple_type(
+            self.types.double_type, self.types.double_type,
+            self.types.double_type)
+        history = self.history(4, typ)
+        history.append((1, 2, 3), 0.0)
+        history.append((4, 5, 6), 0.0)
+        values = history.recent()
+        self.assertEqual((2, 3), values.shape)
+        self.assertEqual([2, 5], values[:, 1].tolist())
+
+    def test_objects(self):
+        history = self.history(2, self.types.string_type)
+        history.append('foo', 0.0)
+        history.append('bar', 1.0)
+        history.append('baz', 2.0)
+        self.assertEqual(object, history.recent().dtype)
+        self.assertEqual(['bar', 'baz'], history.recent().tolist())
+
+    def test_window(self):
+        history = self.history(4, self.types.float_type)
+        history.append(1.5, 10.0)
+        history.append(2.5, 11.0)
+        times, values = history.window(1)
+        self.assertEqual([11.0], times.tolist())
+        self.assertEqual([2.5], values.tolist())
+
+    def test_invalid_capacity(self):
+        self.assertRaises(ValueError, self.history, 0, self.types.double_type)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from krpc.options import Options
+
+
+class TestOptions(unittest.TestCase):
+
+    def test_defaults(self):
+        options = Options()
+        self.assertFalse(options.pipelined)
+        self.assertTrue(options.docs)
+        self.assertTrue(options.stream_thread)
+        self.assertIsNone(options.cache)
+        self.assertFalse(options.numpy_arrays)
+
+    def test_options(self):
+        options = Options(pipelined=True, auto_stream=10)
+        self.assertTrue(options.pipelined)
+        self.assertEqual(10, options.auto_stream)
+        self.assertEqual('Options(pipelined=True, auto_stream=10)',
+                         repr(options))
+
+    def test_unknown_option(self):
+        self.assertRaises(TypeError, Options, pipelinde=True)
+
+    def test_no_new_attributes(self):
+        options = Options()
+        with self.assertRaises(AttributeError):
+            options.name = 1
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 from __future__ import print_function
 import unittest
+import threading
 import timeit
 from krpc.test.servertestcase import ServerTestCase
 
@@ -21,6 +22,38 @@ class TestPerformance(ServerTestCase, unittest.TestCase):
         print('RPC execution rate: %d per second' % (samples/delta_t))
         print('Latency: %.3f milliseconds' % ((delta_t*1000)/samples))
 
+    def test_pipelined_performance(self):
+        threads = 8
+        samples = 100
+
+        def run(conn):
+            def worker():
+                for _ in range(samples):
+                    conn.test_service.float_to_string(float(3.14159))
+
+            def wrapper():
+                workers = [threading.Thread(target=worker)
+                           for _ in range(threads)]
+                for thread in workers:
+                    thread.start()
+                for thread in workers:
+                    thread.join()
+
+            return timeit.timeit(stmt=wrapper, number=1)
+
+        pipelined_conn = self.connect(pipelined=True)
+        try:
+            delta_t = run(self.conn)
+            pipelined_delta_t = run(pipelined_conn)
+        finally:
+            pipelined_conn.close()
+        print()
+        print('Threads: %d, RPCs per thread: %d' % (threads, samples))
+        print('Locked RPC execution rate: %d per second' %
+              (threads*samples/delta_t))
+        print('Pipelined RPC execution rate: %d per second' %
+              (threads*samples/pipelined_delta_t))
+
 
 if __name__ == '__main__':
     unittest.main()
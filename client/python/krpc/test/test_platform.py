@@ -1,5 +1,8 @@
 import unittest
-from krpc.platform import bytelength, hexlify, unhexlify
+import os
+import shutil
+import tempfile
+from krpc.platform import bytelength, hexlify, unhexlify, monotonic, replace
 
 
 class TestPlatform(unittest.TestCase):
@@ -19,6 +22,24 @@ class TestPlatform(unittest.TestCase):
         self.assertEqual(unhexlify('000102'), b'\x00\x01\x02')
         self.assertEqual(unhexlify('ff'), b'\xFF')
 
+    def test_monotonic(self):
+        self.assertLessEqual(monotonic(), monotonic())
+
+    def test_replace(self):
+        path = tempfile.mkdtemp()
+        try:
+            src = os.path.join(path, 'src')
+            dst = os.path.join(path, 'dst')
+            for data in (b'foo', b'bar'):
+                with open(src, 'wb') as handle:
+                    handle.write(data)
+                replace(src, dst)
+                self.assertFalse(os.path.exists(src))
+                with open(dst, 'rb') as handle:
+                    self.assertEqual(data, handle.read())
+        finally:
+            shutil.rmtree(path)
+
 
 if __name__ == '__main__':
     unittest.main()
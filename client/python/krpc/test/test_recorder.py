@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from krpc.encoder import Encoder
+from krpc.error import RPCError
+from krpc.recorder import Recorder, Replay
+from krpc.types import Types
+from krpc.test.servertestcase import ServerTestCase
+import krpc.schema.KRPC_pb2 as KRPC
+
+
+class TestRecorder(unittest.TestCase):
+    types = Types()
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, 'recording')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def update(self, *results):
+        update = KRPC.StreamUpdate()
+        for stream_id, value, typ in results:
+            result = update.results.add(id=stream_id)
+            if isinstance(value, Exception):
+                result.result.error.description = str(value)
+            else:
+                result.result.value = Encoder.encode(value, typ)
+        return update.SerializeToString()
+
+    def record(self):
+        call = KRPC.ProcedureCall(service='TestService',
+                                  procedure='FloatToString')
+        with Recorder(self.filename) as recorder:
+            recorder.add_stream(1, self.types.double_type)
+            recorder.add_stream(2, self.types.string_type, call)
+            recorder.record(self.update(
+                (1, 1.5, self.types.double_type),
+                (2, 'foo', self.types.string_type)), 10.0)
+            recorder.record(self.update(
+                (1, 2.5, self.types.double_type)), 10.1)
+            recorder.record(self.update(
+                (2, RPCError('error'), None)), 10.2)
+
+    def test_streams(self):
+        self.record()
+        with Replay(self.filename) as replay:
+            self.assertEqual([1, 2], [x.id for x in replay.streams])
+            self.assertIsNone(replay.streams[0].call)
+            self.assertEqual('FloatToString',
+                             replay.streams[1].call.procedure)
+            self.assertEqual(self.types.string_type.python_type,
+                             replay.streams[1].return_type.python_type)
+            self.assertRaises(ValueError, replay.stream, 3)
+
+    def test_step(self):
+        self.record()
+        with Replay(self.filename) as replay:
+            self.assertEqual(3, len(replay))
+            x = replay.stream(1)
+            y = replay.stream(2)
+            self.assertEqual(10.0, replay.step())
+            self.assertEqual(1.5, x())
+            self.assertEqual('foo', y())
+            self.assertEqual(10.1, replay.step())
+            self.assertEqual(2.5, x())
+            self.assertEqual('foo', y())
+            self.assertEqual(10.2, replay.step())
+            self.assertRaises(RPCError, y)
+            self.assertIsNone(replay.step())
+            self.assertEqual(3, replay.position)
+
+    def test_run(self):
+        self.record()
+        with Replay(self.filename) as replay:
+            x = replay.stream(1)
+            start = time.time()
+            replay.run(speed=2)
+            self.assertGreater(time.time() - start, 0.09)
+            self.assertEqual(2.5, x())
+        with Replay(self.filename) as replay:
+            replay.run(speed=None)
+            self.assertEqual(3, replay.position)
+
+    def test_truncated(self):
+        self.record()
+        with open(self.filename, 'rb') as handle:
+            data = handle.read()
+        with open(self.filename, 'wb') as handle:
+            handle.write(data[:-3])
+        with Replay(self.filename) as replay:
+            self.assertEqual(2, len(replay))
+
+    def test_not_a_recording(self):
+        with open(self.filename, 'wb') as handle:
+            handle.write(b'foobarbazqux1234')
+        self.assertRaises(ValueError, Replay, self.filename)
+
+
+class TestRecorderConnect(ServerTestCase, unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, 'recording')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_record_and_replay(self):
+        with self.connect() as conn:
+            with conn.stream(conn.test_service.counter,
+                             'TestRecorderConnect.test_record_and_replay') \
+                    as x:
+                with conn.record_streams(self.filename):
+                    values = []
+                    with x.condition:
+                        x.start(wait=False)
+                        while len(values) < 5:
+                            x.wait()
+                            values.append(x())
+        with Replay(self.filename) as replay:
+            self.assertEqual(1, len(replay.streams))
+            self.assertEqual('Counter', replay.streams[0].call.procedure)
+            x = replay.stream(replay.streams[0].id)
+            replayed = []
+            while replay.step() is not None:
+                replayed.append(x())
+            self.assertEqual(values, replayed[:len(values)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from krpc.registry import get_schema
+from krpc.schema.KRPC_pb2 import Services
+
+
+class TestRegistry(unittest.TestCase):
+
+    @staticmethod
+    def services_data(name='TestService'):
+        services = Services()
+        service = services.services.add()
+        service.name = name
+        service.documentation = '<doc><summary>A service</summary></doc>'
+        procedure = service.procedures.add()
+        procedure.name = 'Foo'
+        procedure.documentation = '<doc><summary>Foo</summary></doc>'
+        return services.SerializeToString()
+
+    def test_same_services(self):
+        schema = get_schema(self.services_data())
+        self.assertIs(schema, get_schema(self.services_data()))
+        self.assertEqual('TestService', schema.services.services[0].name)
+        self.assertEqual('<doc><summary>A service</summary></doc>',
+                         schema.services.services[0].documentation)
+
+    def test_different_services(self):
+        schema = get_schema(self.services_data())
+        schema2 = get_schema(self.services_data('TestService2'))
+        self.assertIsNot(schema, schema2)
+        self.assertIsNot(schema.types, schema2.types)
+
+    def test_without_documentation(self):
+        schema = get_schema(self.services_data())
+        schema2 = get_schema(self.services_data(), docs=False)
+        self.assertIsNot(schema, schema2)
+        service = schema2.services.services[0]
+        self.assertEqual('', service.documentation)
+        self.assertEqual('', service.procedures[0].documentation)
+        self.assertEqual('<doc><summary>A service</summary></doc>',
+                         schema.services.services[0].documentation)
+
+
+if __name__ == '__main__':
+    unittest.main()
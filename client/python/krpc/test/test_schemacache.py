@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from krpc.schemacache import SchemaCache, schema_hash
+from krpc.definitions import Definitions
+from krpc.test.servertestcase import ServerTestCase
+
+
+class TestSchemaCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = SchemaCache(os.path.join(self.path, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_load_missing(self):
+        self.assertIsNone(self.cache.load('localhost', 50000, '0.4.9'))
+
+    def test_store_and_load(self):
+        self.cache.store('localhost', 50000, '0.4.9', b'foo')
+        self.assertEqual(b'foo', self.cache.load('localhost', 50000, '0.4.9'))
+        self.assertIsNone(self.cache.load('localhost', 50000, '0.4.8'))
+        self.assertIsNone(self.cache.load('localhost', 50001, '0.4.9'))
+        self.assertIsNone(self.cache.load('127.0.0.2', 50000, '0.4.9'))
+
+    def test_replace(self):
+        self.cache.store('localhost', 50000, '0.4.9', b'foo')
+        self.cache.store('localhost', 50000, '0.4.9', b'bar')
+        self.assertEqual(b'bar', self.cache.load('localhost', 50000, '0.4.9'))
+
+    def test_remove(self):
+        self.cache.store('localhost', 50000, '0.4.9', b'foo')
+        self.cache.remove('localhost', 50000, '0.4.9')
+        self.assertIsNone(self.cache.load('localhost', 50000, '0.4.9'))
+
+    def test_definitions(self):
+        self.assertIsNone(
+            self.cache.load_definitions('localhost', 50000, '0.4.9'))
+        definitions = Definitions({
+            'ServiceName': {'id': 2, 'procedures': {'Procedure': {'id': 1}}}
+        })
+        self.cache.store_definitions(
+            'localhost', 50000, '0.4.9', definitions)
+        self.assertEqual(
+            definitions.to_json(),
+            self.cache.load_definitions(
+                'localhost', 50000, '0.4.9').to_json())
+        self.assertIsNone(self.cache.load('localhost', 50000, '0.4.9'))
+        self.cache.remove('localhost', 50000, '0.4.9')
+        self.assertEqual([], os.listdir(self.cache.path))
+
+    def test_corrupt_entry(self):
+        self.cache.store('localhost', 50000, '0.4.9', b'foo')
+        filename = os.path.join(self.cache.path,
+                                os.listdir(self.cache.path)[0])
+        with open(filename, 'ab') as entry:
+            entry.write(b'bar')
+        self.assertIsNone(self.cache.load('localhost', 50000, '0.4.9'))
+
+    def test_expiry(self):
+        self.cache.store('localhost', 50000, '0.4.9', b'foo')
+        filename = os.path.join(self.cache.path,
+                                os.listdir(self.cache.path)[0])
+        stored = time.time() - self.cache.max_age - 1
+        os.utime(filename, (stored, stored))
+        self.assertIsNone(self.cache.load('localhost', 50000, '0.4.9'))
+        cache = SchemaCache(self.cache.path, max_age=None)
+        self.assertEqual(b'foo', cache.load('localhost', 50000, '0.4.9'))
+        self.cache.store('localhost', 50000, '0.4.9', b'bar')
+        self.assertEqual(b'bar', self.cache.load('localhost', 50000, '0.4.9'))
+
+    def test_schema_hash(self):
+        self.assertEqual(
+            '2c26b46b68ffc68ff99b453c1d30413413422d706483bfa0f98a5e886266e7ae',
+            schema_hash(b'foo'))
+
+
+class TestSchemaCacheConnect(ServerTestCase, unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_connect(self):
+        for _ in range(2):
+            with self.connect(schema_cache=self.path) as conn:
+                self.assertEqual(
+                    '3.14159', conn.test_service.float_to_string(3.14159))
+        self.assertEqual(1, len(os.listdir(self.path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,13 @@
+import select
 import unittest
 import threading
 import time
 from krpc.error import StreamError
 from krpc.test.servertestcase import ServerTestCase
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class TestStream(ServerTestCase, unittest.TestCase):
@@ -250,6 +255,96 @@ class TestStream(ServerTestCase, unittest.TestCase):
             self.assertEqual(55, stream())
             self.wait()
 
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_history(self):
+        with self.conn.stream(self.conn.test_service.counter,
+                              'TestStream.test_history') as x:
+            history = x.history(4)
+            self.assertIs(history, x.history(4))
+            with x.condition:
+                x.start(wait=False)
+                while history.count < 6:
+                    x.wait()
+                values = history.recent()
+                self.assertEqual(4, len(values))
+                self.assertEqual(x(), values[-1])
+            self.assertTrue(numpy.all(numpy.diff(values) > 0))
+            self.assertTrue(numpy.all(numpy.diff(history.times()) >= 0))
+
+    def test_numpy_arrays_unsupported_type(self):
+        with self.conn.stream(getattr, self.conn.test_service,
+                              'string_property') as x:
+            self.assertFalse(x.numpy_arrays)
+            self.assertRaises(ValueError, setattr, x, 'numpy_arrays', True)
+            x.numpy_arrays = False
+            self.assertFalse(x.numpy_arrays)
+
+    def test_get_if_newer(self):
+        with self.conn.stream(self.conn.test_service.counter,
+                              'TestStream.test_get_if_newer') as x:
+            self.assertEqual(0, x.sequence)
+            self.assertIsNone(x.age)
+            with x.condition:
+                self.assertIsNone(x.get_if_newer(0))
+                x.wait()
+            value, sequence = x.get_if_newer(0)
+            self.assertEqual(sequence, x.sequence)
+            self.assertIsNone(x.get_if_newer(sequence))
+            with x.condition:
+                x.wait()
+            newer, newer_sequence = x.get_if_newer(sequence)
+            self.assertLess(value, newer)
+            self.assertLess(sequence, newer_sequence)
+
+    def test_get_if_newer_exception(self):
+        stream = self.conn.add_stream(
+            self.conn.test_service.throw_invalid_operation_exception)
+        with stream.condition:
+            stream.get_if_newer(0)
+            stream.wait()
+        self.assertRaises(RuntimeError, stream.get_if_newer, 0)
+
+    def test_age(self):
+        with self.conn.stream(self.conn.test_service.float_to_string,
+                              2.5) as x:
+            x.start()
+            age = x.age
+            self.assertGreaterEqual(age, 0)
+            time.sleep(0.05)
+            self.assertGreater(x.age, age)
+
+    def test_wait_until(self):
+        with self.conn.stream(self.conn.test_service.counter,
+                              'TestStream.test_wait_until') as x:
+            self.assertTrue(self.conn.wait_until(lambda: x() >= 5))
+            self.assertGreaterEqual(x(), 5)
+
+    def test_wait_until_timeout(self):
+        calls = []
+
+        def predicate():
+            calls.append(None)
+            return x() == 'foo'
+
+        with self.conn.stream(self.conn.test_service.float_to_string,
+                              0.5) as x:
+            start = time.time()
+            self.assertFalse(self.conn.wait_until(predicate, timeout=0.1))
+            self.assertAlmostEqual(time.time() - start, 0.1, delta=0.05)
+        # The value of the stream does not change,
+        # so the predicate is only evaluated once
+        self.assertEqual(1, len(calls))
+
+    def test_wait_any(self):
+        with self.conn.stream(self.conn.test_service.float_to_string,
+                              0.5) as x:
+            with self.conn.stream(self.conn.test_service.counter,
+                                  'TestStream.test_wait_any') as y:
+                self.assertEqual(1, self.conn.wait_any(
+                    [lambda: x() == 'foo', lambda: y() > 3]))
+                self.assertIsNone(self.conn.wait_any(
+                    [lambda: x() == 'foo'], timeout=0.05))
+
     def test_wait(self):
         with self.conn.stream(self.conn.test_service.counter,
                               'TestStream.test_wait', 10) as x:
@@ -434,5 +529,181 @@ class TestStream(ServerTestCase, unittest.TestCase):
         self.assertEquals(self.test_rate_value, 5)
 
 
+class TestStreamLazyDecode(ServerTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = cls.connect(lazy_decode=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def test_decoded_on_read(self):
+        with self.conn.stream(self.conn.test_service.counter,
+                              'TestStreamLazyDecode.test_decoded_on_read') \
+                as x:
+            count = x()
+            with x.condition:
+                x.wait()
+            self.assertIsNotNone(x._stream.sample._encoded)
+            self.assertLess(count, x())
+            self.assertIsNone(x._stream.sample._encoded)
+
+    def test_exception(self):
+        stream = self.conn.add_stream(
+            self.conn.test_service.throw_custom_exception)
+        with self.assertRaises(RuntimeError):
+            stream()
+
+    def test_callback(self):
+        values = []
+        with self.conn.stream(self.conn.test_service.counter,
+                              'TestStreamLazyDecode.test_callback') as x:
+            with x.condition:
+                x.add_callback(values.append)
+                x.start(wait=False)
+                while len(values) < 3:
+                    x.wait()
+                self.assertIsNone(x._stream.sample._encoded)
+        self.assertEqual([0, 1, 2], values[:3])
+
+    def test_remove(self):
+        stream = self.conn.add_stream(
+            self.conn.test_service.float_to_string, 3.14159)
+        self.assertEqual('3.14159', stream())
+        stream.remove()
+        self.assertRaises(StreamError, stream)
+
+
+class TestStreamCallbackExecutor(ServerTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = cls.connect(callback_executor=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def test_callback(self):
+        values = []
+        done = threading.Event()
+
+        def callback(x):
+            values.append(x)
+            if x >= 4:
+                done.set()
+
+        with self.conn.stream(self.conn.test_service.counter,
+                              'TestStreamCallbackExecutor.test_callback') \
+                as x:
+            callback = x.add_callback(callback)
+            x.start(wait=False)
+            self.assertTrue(done.wait(3))
+        self.assertEqual([0, 1, 2, 3, 4], values[:5])
+        self.assertEqual(0, callback.dropped)
+
+    def test_latest(self):
+        release = threading.Event()
+        values = []
+        done = threading.Event()
+
+        def callback(x):
+            release.wait()
+            values.append(x)
+            if x >= 10:
+                done.set()
+
+        with self.conn.stream(self.conn.test_service.counter,
+                              'TestStreamCallbackExecutor.test_latest') as x:
+            callback = x.add_callback(callback, 'latest')
+            x.start()
+            with x.condition:
+                while x() < 10:
+                    x.wait()
+            release.set()
+            self.assertTrue(done.wait(3))
+        self.assertGreater(callback.dropped, 0)
+        self.assertLess(len(values), 11)
+
+    def test_update_callback(self):
+        done = threading.Event()
+        callback = self.conn.add_stream_update_callback(done.set)
+        try:
+            with self.conn.stream(self.conn.test_service.counter,
+                                  'TestStreamCallbackExecutor.'
+                                  'test_update_callback') as x:
+                x.start(wait=False)
+                self.assertTrue(done.wait(3))
+        finally:
+            self.conn.remove_stream_update_callback(callback.callback)
+
+
+class TestStreamThreadless(ServerTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = cls.connect(stream_thread=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def test_no_thread(self):
+        self.assertIsNone(self.conn._stream_thread)
+
+    def test_poll(self):
+        with self.conn.stream(self.conn.test_service.counter,
+                              'TestStreamThreadless.test_poll') as x:
+            x.start(wait=False)
+            while not select.select([self.conn], [], [], 1)[0]:
+                pass
+            self.assertGreater(self.conn.poll_streams(), 0)
+            count = x()
+            # Values only change when updates are processed
+            time.sleep(0.05)
+            self.assertEqual(count, x())
+            self.assertGreater(self.conn.pump_streams(1), 0)
+            self.assertLess(count, x())
+
+    def test_pump_timeout(self):
+        self.conn.poll_streams()
+        start = time.time()
+        self.assertEqual(0, self.conn.pump_streams(0.1))
+        self.assertGreater(time.time() - start, 0.09)
+
+    def test_start_and_wait(self):
+        with self.conn.stream(self.conn.test_service.counter,
+                              'TestStreamThreadless.test_start_and_wait') \
+                as x:
+            count = x()
+            with x.condition:
+                x.wait()
+            self.assertLess(count, x())
+
+    def test_stream_group(self):
+        with self.conn.stream_group([
+                (self.conn.test_service.float_to_string, 3.14159),
+                (self.conn.test_service.int32_to_string, 42)]) as group:
+            self.assertEqual(('3.14159', '42'), group())
+
+    def test_wait_until(self):
+        with self.conn.stream(self.conn.test_service.counter,
+                              'TestStreamThreadless.test_wait_until') as x:
+            self.assertTrue(self.conn.wait_until(lambda: x() >= 5))
+            self.assertFalse(
+                self.conn.wait_until(lambda: x() < 0, timeout=0.05))
+
+    def test_wait_for_update(self):
+        with self.conn.stream(self.conn.test_service.counter,
+                              'TestStreamThreadless.test_wait_for_update') \
+                as x:
+            x.start(wait=False)
+            with self.conn.stream_update_condition:
+                self.conn.wait_for_stream_update()
+            self.assertIsNotNone(x())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from krpc.error import StreamError
+from krpc.test.servertestcase import ServerTestCase
+
+
+class TestStreamGroup(ServerTestCase, unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestStreamGroup, cls).setUpClass()
+
+    def test_values(self):
+        obj = self.conn.test_service.create_test_object('bob')
+        self.conn.test_service.string_property = 'foo'
+        with self.conn.stream_group([
+                (self.conn.test_service.float_to_string, 3.14159),
+                (getattr, self.conn.test_service, 'string_property'),
+                (obj.float_to_string, 3.14159)]) as group:
+            self.assertEqual(3, len(group))
+            snapshot = group()
+            self.assertEqual(('3.14159', 'foo', 'bob3.14159'), snapshot)
+            self.assertGreater(snapshot.sequence, 0)
+
+    def test_names(self):
+        with self.conn.stream_group(
+                [(self.conn.test_service.float_to_string, 3.14159),
+                 (self.conn.test_service.int32_to_string, 42)],
+                names=['a', 'b']) as group:
+            snapshot = group()
+            self.assertEqual('3.14159', snapshot.a)
+            self.assertEqual('42', snapshot.b)
+
+    def test_wrong_number_of_names(self):
+        self.assertRaises(
+            ValueError, self.conn.stream_group,
+            [(self.conn.test_service.float_to_string, 3.14159)],
+            names=['a', 'b'])
+
+    def test_consistent_snapshots(self):
+        with self.conn.stream_group([
+                (self.conn.test_service.counter,
+                 'TestStreamGroup.test_consistent_snapshots.a'),
+                (self.conn.test_service.counter,
+                 'TestStreamGroup.test_consistent_snapshots.b')]) as group:
+            sequence = -1
+            for _ in range(10):
+                with group.condition:
+                    group.wait()
+                snapshot = group()
+                self.assertEqual(snapshot[0], snapshot[1])
+                self.assertLessEqual(sequence, snapshot.sequence)
+                sequence = snapshot.sequence
+
+    def test_property_setters_are_invalid(self):
+        self.assertRaises(
+            StreamError, self.conn.stream_group,
+            [(setattr, self.conn.test_service, 'string_property', 'foo')])
+
+    def test_remove(self):
+        group = self.conn.stream_group(
+            [(self.conn.test_service.float_to_string, 3.14159)])
+        self.assertEqual(('3.14159',), group())
+        group.remove()
+        self.assertRaises(StreamError, group)
+
+
+if __name__ == '__main__':
+    unittest.main()
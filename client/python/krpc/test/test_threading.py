@@ -41,5 +41,79 @@ class TestThreading(ServerTestCase, unittest.TestCase):
             thread.join()
 
 
+class TestPipelinedThreading(TestThreading):
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = cls.connect(pipelined=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def test_pipelined_batch(self):
+        with self.conn.batch() as batch:
+            result = batch.add(self.conn.test_service.int32_to_string, 42)
+        self.assertEqual('42', result.result())
+
+    def test_pipelined_exception(self):
+        with self.assertRaises(RuntimeError):
+            self.conn.test_service.throw_invalid_operation_exception()
+        self.assertEqual('True', self.conn.test_service.bool_to_string(True))
+
+
+class TestLaneThreading(TestThreading):
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = cls.connect(pool_size=2, lanes={'control': 1, 'bulk': 2})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def test_lanes(self):
+        self.assertEqual(['bulk', 'control', 'default'], self.conn.lanes)
+
+    def test_lane(self):
+        for lane in self.conn.lanes:
+            with self.conn.lane(lane):
+                self.assertEqual(
+                    '42', self.conn.test_service.int32_to_string(42))
+                with self.conn.stream(
+                        self.conn.test_service.int32_to_string, 42) as x:
+                    self.assertEqual('42', x())
+
+    def test_invalid_lane(self):
+        with self.assertRaises(ValueError):
+            with self.conn.lane('foo'):
+                pass
+
+    def test_invalid_pool_size(self):
+        self.assertRaises(ValueError, self.connect, pool_size=0)
+        self.assertRaises(ValueError, self.connect, lanes={'bulk': 0})
+
+    def test_event_in_lane(self):
+        # The event's stream is created by the primary connection,
+        # so that its updates are received by the client
+        for lane in self.conn.lanes:
+            with self.conn.lane(lane):
+                event = self.conn.test_service.on_timer(200)
+                with event.condition:
+                    event.wait(1)
+                    self.assertTrue(event.stream())
+                event.remove()
+
+    def test_lane_threads(self):
+        def bulk_worker():
+            with self.conn.lane('bulk'):
+                worker_thread2(self.conn, self)
+        threads = [threading.Thread(target=bulk_worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        with self.conn.lane('control'):
+            worker_thread2(self.conn, self)
+        for thread in threads:
+            thread.join()
+
+
 if __name__ == '__main__':
     unittest.main()
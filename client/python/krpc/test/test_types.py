@@ -1,8 +1,10 @@
+import copy
+import gc
 import unittest
 from enum import Enum
 from krpc.types import \
     Types, ValueType, ClassType, EnumerationType, MessageType, ClassBase, \
-    TupleType, ListType, SetType, DictionaryType
+    TupleType, ListType, SetType, DictionaryType, Documentation
 from krpc.schema.KRPC_pb2 import Type, ProcedureCall, Stream, Status, Services
 
 
@@ -56,6 +58,48 @@ class TestTypes(unittest.TestCase):
         typ2 = types.as_type(typ.protobuf_type)
         self.assertEqual(typ, typ2)
 
+    def test_class_instances_are_interned(self):
+        types = Types()
+        typ = types.class_type('ServiceName', 'ClassName')
+        instance = typ.python_type(42)
+        self.assertIs(instance, typ.python_type(42))
+        self.assertIs(instance, typ.decoder(b'\x2a'))
+        self.assertIsNot(instance, typ.python_type(43))
+        self.assertIs(instance, copy.copy(instance))
+        # Clients have separate objects
+        typ2 = Types().class_type('ServiceName', 'ClassName')
+        self.assertIsNot(instance, typ2.python_type(42))
+        self.assertEqual(instance, typ2.python_type(42))
+        # Objects that are no longer used are discarded
+        del instance
+        gc.collect()
+        self.assertNotIn(42, types._objects)
+
+    def test_class_instances_have_slots(self):
+        typ = Types().class_type('ServiceName', 'ClassName')
+        instance = typ.python_type(42)
+        self.assertFalse(hasattr(instance, '__dict__'))
+        self.assertRaises(AttributeError, setattr, instance, 'foo', 1)
+        self.assertFalse(hasattr(Types().string_type, '__dict__'))
+
+    def test_shared_types(self):
+        shared = Types()
+        types1 = Types(shared)
+        types2 = Types(shared)
+        self.assertIs(types1.double_type, types2.double_type)
+        self.assertIs(types1.list_type(types1.double_type),
+                      types2.list_type(types2.double_type))
+        self.assertIs(types1.enumeration_type('ServiceName', 'EnumName'),
+                      types2.enumeration_type('ServiceName', 'EnumName'))
+        # Class types, and types containing them, are not shared
+        class_type1 = types1.class_type('ServiceName', 'ClassName')
+        class_type2 = types2.class_type('ServiceName', 'ClassName')
+        self.assertIsNot(class_type1, class_type2)
+        self.assertIsNot(class_type1.python_type(42),
+                         class_type2.python_type(42))
+        self.assertIsNot(types1.list_type(class_type1),
+                         types2.list_type(class_type2))
+
     def test_enumeration_types(self):
         types = Types()
         typ = types.enumeration_type(
@@ -80,6 +124,35 @@ class TestTypes(unittest.TestCase):
         typ2 = types.as_type(typ.protobuf_type)
         self.assertEqual(typ, typ2)
 
+    def test_lazy_documentation(self):
+        generated = []
+
+        def documentation(doc):
+            def generate():
+                generated.append(doc)
+                return doc
+            return Documentation(generate)
+
+        types = Types()
+        cls = types.class_type(
+            'ServiceName', 'ClassName',
+            documentation('class documentation')).python_type
+        cls._add_property(
+            'prop', lambda self: 42, doc=documentation('property doc'))
+        enum = types.enumeration_type(
+            'ServiceName', 'EnumName', documentation('enum documentation'))
+        enum.set_values({'a': {'value': 0, 'doc': documentation('doca')}})
+        self.assertEqual([], generated)
+        self.assertEqual('class documentation', cls.__doc__)
+        self.assertEqual('class documentation', cls(42).__doc__)
+        self.assertEqual('property doc', cls.prop.__doc__)
+        self.assertEqual(42, cls(42).prop)
+        self.assertEqual('enum documentation', enum.python_type.__doc__)
+        self.assertEqual('doca', enum.python_type.a.__doc__)
+        self.assertEqual('doca', enum.python_type.a.__doc__)
+        self.assertEqual(['class documentation', 'property doc',
+                          'enum documentation', 'doca'], generated)
+
     def test_message_types(self):
         types = Types()
         cases = [
@@ -1,4 +1,6 @@
 import collections
+import threading
+import weakref
 from enum import Enum
 import krpc.schema.KRPC_pb2 as KRPC
 
@@ -43,15 +45,29 @@ def _protobuf_type(code, service=None, name=None, types=None):
     return protobuf_type
 
 
+# Held while getting type objects from a shared type store, which can be
+# used by several clients at once
+_shared_lock = threading.RLock()
+
+
 class Types(object):
     """ A type store. Used to obtain type objects from protocol buffer type
         strings, and stores python types for services and service defined
-        class and enumeration types. """
+        class and enumeration types.
 
-    def __init__(self):
+        If shared is a Types object, types that do not contain class types
+        are obtained from it, so that their type objects and compiled
+        encoders and decoders are shared with the other stores using it.
+        Class types are not shared, as remote objects belong to a client. """
+
+    def __init__(self, shared=None):
+        self._shared = shared
         # Mapping from protobuf type strings to type objects
         self._types = {}
         self._exception_types = {}
+        # Mapping from object ids to the remote objects that
+        # are in use, so that each id has a single object
+        self._objects = weakref.WeakValueDictionary()
 
     def as_type(self, protobuf_type, doc=None):
         """ Return a type object given a protocol buffer type """
@@ -61,10 +77,13 @@ class Types(object):
         if key in self._types:
             return self._types[key]
 
-        if protobuf_type.code in VALUE_TYPES:
+        if self._shared is not None and _is_client_independent(protobuf_type):
+            with _shared_lock:
+                typ = self._shared.as_type(protobuf_type, doc)
+        elif protobuf_type.code in VALUE_TYPES:
             typ = ValueType(protobuf_type)
         elif protobuf_type.code == KRPC.Type.CLASS:
-            typ = ClassType(protobuf_type, doc)
+            typ = ClassType(protobuf_type, doc, self._objects)
         elif protobuf_type.code == KRPC.Type.ENUMERATION:
             typ = EnumerationType(protobuf_type, doc)
         elif protobuf_type.code == KRPC.Type.TUPLE:
@@ -83,6 +102,11 @@ class Types(object):
         self._types[key] = typ
         return typ
 
+    def share(self, shared):
+        """ Obtain types that do not contain class types from
+            the given store, from now on """
+        self._shared = shared
+
     @classmethod
     def is_none_type(cls, protobuf_type):
         return protobuf_type.code == KRPC.Type.NONE
@@ -254,10 +278,16 @@ class Types(object):
 class TypeBase(object):
     """ Base class for all type objects """
 
+    __slots__ = ('_protobuf_type', '_python_type', '_string',
+                 '_encoder', '_decoder', '_array_decoder')
+
     def __init__(self, protobuf_type, python_type, string):
         self._protobuf_type = protobuf_type
         self._python_type = python_type
         self._string = string
+        self._encoder = None
+        self._decoder = None
+        self._array_decoder = None
 
     @property
     def protobuf_type(self):
@@ -269,6 +299,38 @@ class TypeBase(object):
         """ Get the python type """
         return self._python_type
 
+    @property
+    def encoder(self):
+        """ Get a function that encodes values of the type. It is
+            compiled when first used, and reused from then on. """
+        if self._encoder is None:
+            # pylint: disable=cyclic-import
+            from krpc.encoder import Encoder
+            self._encoder = Encoder.compile(self)
+        return self._encoder
+
+    @property
+    def decoder(self):
+        """ Get a function that decodes values of the type. It is
+            compiled when first used, and reused from then on. """
+        if self._decoder is None:
+            # pylint: disable=cyclic-import
+            from krpc.decoder import Decoder
+            self._decoder = Decoder.compile(self)
+        return self._decoder
+
+    @property
+    def array_decoder(self):
+        """ Get a function that decodes values of the type into NumPy
+            arrays, or None if the type is not a collection of numbers
+            that can be. See krpc.arrays.compile_decoder. """
+        if self._array_decoder is None:
+            # pylint: disable=cyclic-import
+            from krpc.arrays import compile_decoder
+            # False marks a type that cannot be decoded into arrays
+            self._array_decoder = compile_decoder(self) or False
+        return self._array_decoder or None
+
     def __str__(self):
         return '<type: ' + str(self._string) + '>'
 
@@ -276,6 +338,8 @@ class TypeBase(object):
 class ValueType(TypeBase):
     """ A protocol buffer value type """
 
+    __slots__ = ()
+
     def __init__(self, protobuf_type):
         if protobuf_type.code not in VALUE_TYPES:
             raise ValueError('Not a value type')
@@ -285,9 +349,12 @@ class ValueType(TypeBase):
 
 
 class ClassType(TypeBase):
-    """ A class type, represented by a uint64 identifier """
+    """ A class type, represented by a uint64 identifier. If objects is
+        a dictionary, instances of the class are interned in it. """
 
-    def __init__(self, protobuf_type, doc):
+    __slots__ = ()
+
+    def __init__(self, protobuf_type, doc, objects=None):
         if protobuf_type.code != KRPC.Type.CLASS:
             raise ValueError('Not a class type')
         if not protobuf_type.service:
@@ -295,7 +362,7 @@ class ClassType(TypeBase):
         if not protobuf_type.name:
             raise ValueError('Class type has no class name')
         typ = _create_class_type(
-            protobuf_type.service, protobuf_type.name, doc)
+            protobuf_type.service, protobuf_type.name, doc, objects)
         string = 'Class(%s.%s)' % (protobuf_type.service, protobuf_type.name)
         super(ClassType, self).__init__(protobuf_type, typ, string)
 
@@ -303,6 +370,8 @@ class ClassType(TypeBase):
 class EnumerationType(TypeBase):
     """ An enumeration type, represented by an sint32 value """
 
+    __slots__ = ('_service_name', '_enum_name', '_doc')
+
     def __init__(self, protobuf_type, doc):
         if protobuf_type.code != KRPC.Type.ENUMERATION:
             raise ValueError('Not an enum type')
@@ -328,6 +397,8 @@ class EnumerationType(TypeBase):
 class TupleType(TypeBase):
     """ A tuple collection type """
 
+    __slots__ = ('value_types',)
+
     def __init__(self, protobuf_type, types):
         if protobuf_type.code != KRPC.Type.TUPLE:
             raise ValueError('Not a tuple type')
@@ -341,6 +412,8 @@ class TupleType(TypeBase):
 class ListType(TypeBase):
     """ A list collection type """
 
+    __slots__ = ('value_type',)
+
     def __init__(self, protobuf_type, types):
         if protobuf_type.code != KRPC.Type.LIST:
             raise ValueError('Not a list type')
@@ -354,6 +427,8 @@ class ListType(TypeBase):
 class SetType(TypeBase):
     """ A set collection type """
 
+    __slots__ = ('value_type',)
+
     def __init__(self, protobuf_type, types):
         if protobuf_type.code != KRPC.Type.SET:
             raise ValueError('Not a set type')
@@ -367,6 +442,8 @@ class SetType(TypeBase):
 class DictionaryType(TypeBase):
     """ A dictionary collection type """
 
+    __slots__ = ('key_type', 'value_type')
+
     def __init__(self, protobuf_type, types):
         if protobuf_type.code != KRPC.Type.DICTIONARY:
             raise ValueError('Not a dictionary type')
@@ -382,6 +459,8 @@ class DictionaryType(TypeBase):
 class MessageType(TypeBase):
     """ A protocol buffer message type """
 
+    __slots__ = ()
+
     def __init__(self, protobuf_type):
         if protobuf_type.code not in MESSAGE_TYPES:
             raise ValueError('Not a message type')
@@ -389,12 +468,79 @@ class MessageType(TypeBase):
         super(MessageType, self).__init__(protobuf_type, typ, typ.__name__)
 
 
+class _DynamicTypeMeta(type):
+    """ Metaclass for dynamic types. Members of a dynamic type can be added
+        lazily, the first time they are accessed on the class. """
+
+    def __getattr__(cls, name):
+        if not name.startswith('_') and cls._materialize(name):
+            return type.__getattribute__(cls, name)
+        raise AttributeError(
+            'type object \'%s\' has no attribute \'%s\'' %
+            (cls.__name__, name))
+
+    def __dir__(cls):
+        names = set()
+        for base in cls.__mro__:
+            names.update(base.__dict__.keys())
+        names.update(cls._lazy_members())
+        return sorted(names)
+
+
 class DynamicType(object):
+    """ Base class for types whose members are created at runtime. Members
+        can be added immediately, or registered in the _members dictionary,
+        which maps member names to functions that add them when called. """
+
+    __metaclass__ = _DynamicTypeMeta
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        if not name.startswith('_') and type(self)._materialize(name):
+            return getattr(self, name)
+        raise AttributeError(
+            '\'%s\' object has no attribute \'%s\'' %
+            (type(self).__name__, name))
+
+    def __setattr__(self, name, value):
+        # Add the member first if it is a lazily added property,
+        # so that its setter is called
+        if not name.startswith('_'):
+            getattr(type(self), name, None)
+        super(DynamicType, self).__setattr__(name, value)
+
+    def __dir__(self):
+        return sorted(set(dir(type(self))) |
+                      set(getattr(self, '__dict__', {}).keys()))
+
+    @classmethod
+    def _lazy_members(cls):
+        """ Get the dictionary of members that can be added lazily """
+        if '_members' not in cls.__dict__:
+            cls._build_members()
+        return cls.__dict__.get('_members', {})
+
+    @classmethod
+    def _build_members(cls):
+        """ Populate the _members dictionary """
+        cls._members = {}
+
+    @classmethod
+    def _materialize(cls, name):
+        """ Add the named member, if it can be added lazily.
+            Returns true if the member was added. """
+        add_member = cls._lazy_members().get(name)
+        if add_member is None:
+            return False
+        add_member()
+        return True
+
     @classmethod
     def _add_method(cls, name, func, doc=None):
         """ Add a method """
         func.__name__ = name
-        func.__doc__ = doc
+        func.__doc__ = _docstring(doc)
         setattr(cls, name, func)
         return getattr(cls, name)
 
@@ -402,7 +548,7 @@ class DynamicType(object):
     def _add_static_method(cls, name, func, doc=None):
         """ Add a static method """
         func.__name__ = name
-        func.__doc__ = doc
+        func.__doc__ = _docstring(doc)
         func = staticmethod(func)
         setattr(cls, name, func)
         return getattr(cls, name)
@@ -412,18 +558,49 @@ class DynamicType(object):
         """ Add a property """
         if getter is None and setter is None:
             raise ValueError('Either getter or setter must be provided')
-        prop = property(getter, setter, doc=doc)
+        prop = _Property(getter, setter, doc=doc)
         setattr(cls, name, prop)
         return getattr(cls, name)
 
 
 class ClassBase(DynamicType):
-    """ Base class for service-defined class types """
+    """ Base class for service-defined class types. Instances only store
+        their object id. If the class has an _objects dictionary, there is
+        at most one instance for each object id, so remote objects with the
+        same id are identical. """
+
+    __slots__ = ('_object_id', '__weakref__')
 
     _client = None
+    _objects = None
+
+    def __new__(cls, object_id):
+        objects = cls._objects
+        if objects is not None:
+            obj = objects.get(object_id)
+            if obj is not None and type(obj) is cls:
+                return obj
+        obj = super(ClassBase, cls).__new__(cls)
+        obj._object_id = object_id
+        if objects is not None:
+            obj = objects.setdefault(object_id, obj)
+            if type(obj) is not cls:
+                # The id is in use by an object of another class
+                obj = super(ClassBase, cls).__new__(cls)
+                obj._object_id = object_id
+        return obj
+
+    def __reduce__(self):
+        return (type(self), (self._object_id,))
 
-    def __init__(self, object_id):
-        self._object_id = object_id
+    @classmethod
+    def _build_members(cls):
+        # Members of a class are registered by the service that defines it
+        service_type = cls.__dict__.get('_service_type')
+        if service_type is not None:
+            service_type._build_members()
+        if '_members' not in cls.__dict__:
+            cls._members = {}
 
     def __eq__(self, other):
         return isinstance(other, ClassBase) and \
@@ -461,19 +638,26 @@ class ClassBase(DynamicType):
             (self._service_name, self._class_name, self._object_id)
 
 
-def _create_class_type(service_name, class_name, doc):
+def _is_client_independent(protobuf_type):
+    """ Whether values of a type do not contain remote objects """
+    return protobuf_type.code != KRPC.Type.CLASS and \
+        all(_is_client_independent(x) for x in protobuf_type.types)
+
+
+def _create_class_type(service_name, class_name, doc, objects=None):
     return type(str(class_name), (ClassBase,),
                 {'_service_name': service_name,
                  '_class_name': class_name,
+                 '_objects': objects,
+                 '__slots__': (),
                  '__doc__': doc})
 
 
 def _create_enum_type(enum_name, values, doc):
     typ = Enum(str(enum_name), dict((name, x['value'])
                                     for name, x in values.items()))
-    setattr(typ, '__doc__', doc)
-    for name in values.keys():
-        setattr(getattr(typ, name), '__doc__', values[name]['doc'])
+    setattr(typ, '__doc__', _EnumDocumentation(
+        doc, dict((name, x['doc']) for name, x in values.items())))
     return typ
 
 
@@ -497,3 +681,62 @@ class DefaultArgument(object):
 
     def __repr__(self):
         return self._value
+
+
+class Documentation(object):
+    """ A docstring that is generated the first time it is read. Can be
+        set as the __doc__ attribute of a class, and passed as the doc
+        argument when adding members to a DynamicType. """
+
+    def __init__(self, generate):
+        self._generate = generate
+        self._value = None
+
+    @property
+    def value(self):
+        """ The docstring """
+        if self._generate is not None:
+            self._value = self._generate()
+            self._generate = None
+        return self._value
+
+    def __get__(self, obj, objtype=None):
+        return self.value
+
+
+def _docstring(doc):
+    """ Get a docstring from either a string or a Documentation object """
+    if isinstance(doc, Documentation):
+        return doc.value
+    return doc
+
+
+class _Property(property):
+    """ A property whose docstring can be a Documentation object """
+
+    def __init__(self, fget=None, fset=None, doc=None):
+        super(_Property, self).__init__(fget, fset)
+        self._doc = doc
+
+    @property
+    def __doc__(self):
+        return _docstring(self._doc)
+
+    @__doc__.setter
+    def __doc__(self, value):
+        self._doc = value
+
+
+class _EnumDocumentation(object):
+    """ The docstrings of an enumeration type and its values. The docstring
+        of a value cannot be set on the value itself without generating
+        it, so this is set as the __doc__ attribute of the type. """
+
+    def __init__(self, doc, value_docs):
+        self._doc = doc
+        self._value_docs = value_docs
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return _docstring(self._doc)
+        return _docstring(self._value_docs.get(obj.name))
@@ -1,4 +1,5 @@
 from setuptools import setup
+from setuptools.command.build_py import build_py
 import sys
 import os
 import re
@@ -14,6 +15,18 @@ if os.getenv('BAZEL_BUILD') and hasattr(os, 'link'):
 if os.getenv('BAZEL_BUILD') and not os.path.exists(os.path.join(dirpath, 'VERSION.txt')):
     dirpath = os.getcwd()
 
+
+class BuildPy(build_py):
+    """ Leaves out the asyncio client when building for Python versions
+        older than 3.5, as they cannot compile its async functions """
+
+    def find_package_modules(self, package, package_dir):
+        modules = build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 5):
+            modules = [x for x in modules if x[:2] != ('krpc', 'aio')]
+        return modules
+
+
 install_requires = ['protobuf >= 3.6']
 if sys.version_info < (3, 4):
     install_requires.append('enum34 >= 0.9')
@@ -29,7 +42,9 @@ setup(
     description='Client library for kRPC, a Remote Procedure Call server for Kerbal Space Program',
     long_description=open(os.path.join(dirpath, 'README.txt')).read(),
     install_requires=install_requires,
+    extras_require={'numpy': ['numpy']},
     test_suite='krpc.test',
+    cmdclass={'build_py': BuildPy},
     use_2to3=True,
     classifiers=[
         'Development Status :: 5 - Production/Stable',
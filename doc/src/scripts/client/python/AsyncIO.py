@@ -0,0 +1,16 @@
+import asyncio
+import krpc.aio
+
+
+async def main():
+    conn = await krpc.aio.connect()
+    vessel = await conn.space_center.active_vessel
+    flight = await vessel.flight()
+    altitude = await conn.add_stream(getattr, flight, 'mean_altitude')
+    async for value in altitude:
+        print(value)
+        if value > 1000:
+            break
+    await conn.close()
+
+asyncio.get_event_loop().run_until_complete(main())
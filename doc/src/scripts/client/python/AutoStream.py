@@ -0,0 +1,11 @@
+import krpc
+conn = krpc.connect(auto_stream=10)
+vessel = conn.space_center.active_vessel
+flight = vessel.flight()
+
+# After the first few calls, the altitude is read from a stream
+while flight.mean_altitude < 10000:
+    pass
+
+for call in conn.auto_streams.promoted:
+    print(call.service, call.procedure, call.reads)
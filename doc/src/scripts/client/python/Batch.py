@@ -0,0 +1,7 @@
+import krpc
+conn = krpc.connect()
+vessel = conn.space_center.active_vessel
+with conn.batch() as batch:
+    titles = [batch.add(getattr, part, 'title') for part in vessel.parts.all]
+for title in titles:
+    print(title.result())
@@ -0,0 +1,10 @@
+import krpc
+conn = krpc.connect(cache={'SpaceCenter.Vessel_get_Name': 60})
+vessel = conn.space_center.active_vessel
+body = vessel.orbit.body
+
+for _ in range(100):
+    # Only the first call for each of these is sent to the server
+    print(vessel.name, body.name, body.equatorial_radius)
+
+print('Hits:', conn.cache.hits, 'Misses:', conn.cache.misses)
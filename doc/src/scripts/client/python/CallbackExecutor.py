@@ -0,0 +1,20 @@
+import time
+import krpc
+conn = krpc.connect(callback_executor=2)
+vessel = conn.space_center.active_vessel
+flight = vessel.flight()
+
+
+def check_altitude(altitude):
+    # Takes longer than the time between stream updates
+    time.sleep(0.5)
+    print('Altitude is', altitude)
+
+
+altitude = conn.add_stream(getattr, flight, 'mean_altitude')
+callback = altitude.add_callback(check_altitude, policy='latest')
+altitude.start()
+
+while True:
+    time.sleep(5)
+    print('Skipped', callback.dropped, 'values')
@@ -0,0 +1,19 @@
+import krpc
+from krpc.expression import Expression
+conn = krpc.connect()
+vessel = conn.space_center.active_vessel
+flight = vessel.flight()
+resources = vessel.resources
+
+# Build an expression that is evaluated by the server
+altitude = Expression.call(flight, 'mean_altitude')
+fuel = Expression.call(resources.amount, 'LiquidFuel')
+expr = (altitude > 70000) | (fuel < 10)
+
+# Create an event from the expression
+event = conn.add_event(expr)
+
+# Wait on the event
+with event.condition:
+    event.wait()
+    print('Reached space or ran out of fuel')
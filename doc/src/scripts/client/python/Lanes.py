@@ -0,0 +1,17 @@
+import threading
+import krpc
+conn = krpc.connect(lanes={'control': 1, 'bulk': 1})
+vessel = conn.space_center.active_vessel
+
+
+def scrape_telemetry():
+    with conn.lane('bulk'):
+        for part in vessel.parts.all:
+            print(part.title, [module.name for module in part.modules])
+
+
+thread = threading.Thread(target=scrape_telemetry)
+thread.start()
+with conn.lane('control'):
+    vessel.control.throttle = 1
+thread.join()
@@ -0,0 +1,19 @@
+import numpy
+import krpc
+conn = krpc.connect()
+vessel = conn.space_center.active_vessel
+frame = vessel.orbit.body.reference_frame
+
+# Decode a single result into an array
+position = conn.call_array((vessel.position, frame))
+print(numpy.linalg.norm(position))
+
+# Decode the values of a stream into arrays
+velocity = conn.add_stream(vessel.velocity, frame)
+velocity.numpy_arrays = True
+
+# Reuse the same array for each result
+bounds = numpy.zeros((2, 3))
+for _ in range(10):
+    conn.call_array((vessel.bounding_box, frame), out=bounds)
+    print(bounds[1] - bounds[0], velocity())
@@ -0,0 +1,17 @@
+import time
+import krpc
+from krpc.recorder import Replay
+
+conn = krpc.connect()
+vessel = conn.space_center.active_vessel
+flight = vessel.flight()
+altitude = conn.add_stream(getattr, flight, 'mean_altitude')
+altitude.start()
+with conn.record_streams('flight.rec'):
+    time.sleep(10)
+
+with Replay('flight.rec') as replay:
+    print(replay.streams)
+    altitude = replay.stream(replay.streams[0].id)
+    while replay.step() is not None:
+        print(altitude())
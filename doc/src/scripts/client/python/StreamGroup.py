@@ -0,0 +1,15 @@
+import krpc
+conn = krpc.connect()
+vessel = conn.space_center.active_vessel
+flight = vessel.flight(vessel.orbit.body.reference_frame)
+with conn.stream_group([
+        (getattr, conn.space_center, 'ut'),
+        (getattr, flight, 'mean_altitude'),
+        (getattr, flight, 'velocity')],
+        names=['ut', 'altitude', 'velocity']) as state:
+    while True:
+        with state.condition:
+            state.wait()
+        snapshot = state()
+        print(snapshot.sequence, snapshot.ut,
+              snapshot.altitude, snapshot.velocity)
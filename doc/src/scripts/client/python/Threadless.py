@@ -0,0 +1,13 @@
+import select
+import krpc
+conn = krpc.connect(stream_thread=False)
+vessel = conn.space_center.active_vessel
+altitude = conn.add_stream(getattr, vessel.flight(), 'mean_altitude')
+altitude.start(wait=False)
+
+while True:
+    readable, _, _ = select.select([conn], [], [], 0.1)
+    if readable:
+        conn.poll_streams()
+    if altitude.sequence > 0:
+        print(altitude())
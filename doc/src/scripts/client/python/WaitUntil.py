@@ -0,0 +1,9 @@
+import krpc
+conn = krpc.connect()
+vessel = conn.space_center.active_vessel
+flight = vessel.flight(vessel.orbit.body.reference_frame)
+altitude = conn.add_stream(getattr, flight, 'mean_altitude')
+vertical_speed = conn.add_stream(getattr, flight, 'vertical_speed')
+
+conn.wait_until(lambda: altitude() > 10000 and vertical_speed() < 0)
+print('Descending through 10km')